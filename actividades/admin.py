@@ -1,10 +1,25 @@
 # Importar módulos necesarios de Django
 from django.contrib import admin  # Funcionalidades del admin
-from .models import Actividad  # Modelo de Actividad
+from .models import Actividad, ActividadPrecio  # Modelos de actividades
+
+# Historial de precios (solo lectura: lo mantiene actividades.historial)
+class ActividadPrecioInline(admin.TabularInline):
+    model = ActividadPrecio
+    fields = ['precio', 'vigente_desde', 'vigente_hasta']
+    readonly_fields = fields
+    ordering = ['-vigente_desde']
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 # Registrar y configurar la administración de Actividades
 @admin.register(Actividad)
 class ActividadAdmin(admin.ModelAdmin):
+    # Historial de precios en la página de la actividad
+    inlines = [ActividadPrecioInline]
+
     # Campos a mostrar en la lista de actividades
     list_display = [
         'codigo',     # Código único de la actividad
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ActividadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'actividades'
+
+    def ready(self):
+        # Registrar las señales de la aplicación
+        from . import signals  # noqa: F401
@@ -1,6 +1,7 @@
 # Importar módulos necesarios de Django
 from django import forms  # Funcionalidades de formularios
 from .models import Actividad  # Modelo de Actividad
+from .precios import MODOS, PORCENTAJE, seleccionar  # Cambio masivo de precios
 
 # Formulario para crear/editar actividades
 class ActividadForm(forms.ModelForm):
@@ -29,3 +30,49 @@ class ActividadForm(forms.ModelForm):
                 'class': 'form-check-input'  # Estilo Bootstrap para checkbox
             }),
         }
+
+# Formulario del cambio masivo de precios (actividades.precios)
+class CambioPreciosForm(forms.Form):
+    prefijo = forms.CharField(
+        label='Prefijo de código', required=False, max_length=50,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+    )
+    codigos = forms.CharField(
+        label='Códigos', required=False,
+        help_text='Separados por comas, espacios o saltos de línea',
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+    )
+    solo_activas = forms.BooleanField(
+        label='Solo actividades activas', required=False, initial=True,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+    modo = forms.ChoiceField(
+        label='Cambio', choices=MODOS,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    valor = forms.DecimalField(
+        label='Valor', max_digits=10, decimal_places=2,
+        help_text='Negativo para bajar el precio',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+    propagar = forms.BooleanField(
+        label='Actualizar también las ofertas sin facturar este mes', required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
+
+    def clean_codigos(self):
+        # Lista de códigos sin repetir
+        return sorted(set(self.cleaned_data['codigos'].replace(',', ' ').split()))
+
+    def clean(self):
+        datos = super().clean()
+        # Sin filtro se cambiaría todo el catálogo: pedirlo de forma explícita
+        if not datos.get('prefijo') and not datos.get('codigos'):
+            raise forms.ValidationError('Indique un prefijo de código o una lista de códigos.')
+        if datos.get('modo') == PORCENTAJE and datos.get('valor') is not None and datos['valor'] <= -100:
+            self.add_error('valor', 'Un porcentaje de -100 o menos dejaría los precios en cero.')
+        return datos
+
+    def actividades(self):
+        """Actividades elegidas en el formulario (ya validado)"""
+        return seleccionar(self.cleaned_data['prefijo'], self.cleaned_data['codigos'], self.cleaned_data['solo_activas'])
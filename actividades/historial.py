@@ -0,0 +1,96 @@
+# Historial de precios de las actividades (ActividadPrecio)
+#
+# Cada cambio de Actividad.precio cierra el período vigente (vigente_hasta = día del
+# cambio) y abre otro desde ese día; si el precio cambia varias veces el mismo día
+# queda el último. Los períodos son semiabiertos [vigente_desde, vigente_hasta), así
+# que el precio en una fecha es el del período con el mayor vigente_desde <= fecha:
+# una sola búsqueda en el índice (actividad, vigente_desde) por actividad.
+from django.db.models import Exists, F, OuterRef, Subquery  # Expresiones SQL
+from django.utils import timezone  # Fecha local
+
+from .models import Actividad, ActividadPrecio  # Modelos de actividades
+
+# Períodos que se insertan en cada sentencia
+LOTE = 2000
+
+
+def registrar_precio(actividad, fecha=None):
+    """Registra el precio actual de una actividad si cambió (después de guardarla)"""
+    fecha = fecha or timezone.localdate()
+    vigente = ActividadPrecio.objects.filter(actividad=actividad, vigente_hasta__isnull=True).first()
+    if vigente is not None and vigente.precio == actividad.precio:
+        return
+    if vigente is not None and vigente.vigente_desde >= fecha:
+        # Otro cambio el mismo día: se corrige el período abierto hoy
+        ActividadPrecio.objects.filter(pk=vigente.pk).update(precio=actividad.precio)
+        return
+    if vigente is not None:
+        ActividadPrecio.objects.filter(pk=vigente.pk).update(vigente_hasta=fecha)
+    ActividadPrecio.objects.create(actividad=actividad, precio=actividad.precio, vigente_desde=fecha)
+
+
+def registrar_precios(actividades, fecha=None):
+    """Registra los precios actuales de las actividades del queryset que cambiaron
+
+    Para operaciones masivas (cambio de precios, importación, datos de prueba): son
+    cuatro sentencias sea cual sea la cantidad de actividades.
+    """
+    fecha = fecha or timezone.localdate()
+    precio_actual = Subquery(Actividad.objects.filter(pk=OuterRef('actividad_id')).values('precio')[:1])
+    distintos = ActividadPrecio.objects.filter(
+        actividad__in=actividades.values('pk'), vigente_hasta__isnull=True,
+    ).exclude(precio=precio_actual)
+    # Cambios del mismo día: se corrige el período abierto hoy
+    distintos.filter(vigente_desde__gte=fecha).update(precio=precio_actual)
+    # Cambios posteriores: se cierra el período vigente
+    distintos.filter(vigente_desde__lt=fecha).update(vigente_hasta=fecha)
+    # Actividades sin período abierto (nuevas o recién cerradas): se abre uno desde hoy
+    abiertos = ActividadPrecio.objects.filter(actividad=OuterRef('pk'), vigente_hasta__isnull=True)
+    ActividadPrecio.objects.bulk_create(
+        [
+            ActividadPrecio(actividad_id=actividad_id, precio=precio, vigente_desde=fecha)
+            for actividad_id, precio in actividades.filter(~Exists(abiertos)).values_list('pk', 'precio')
+        ],
+        batch_size=LOTE,
+    )
+
+
+def precio_actual(actividad_id):
+    """Precio actual de una actividad (None si no existe)
+
+    Se lee siempre de la base de datos: con él se escriben ítems de facturas y
+    ofertas, y una caché por proceso podría tener un precio ya cambiado.
+    """
+    return Actividad.objects.filter(pk=actividad_id).values_list('precio', flat=True).first()
+
+
+def precio_en(actividad, fecha):
+    """Precio de la actividad vigente en la fecha (None si no hay registro)"""
+    return (
+        ActividadPrecio.objects.filter(actividad=actividad, vigente_desde__lte=fecha)
+        .order_by('-vigente_desde').values_list('precio', flat=True).first()
+    )
+
+
+def precio_vigente(actividad, fecha):
+    """Subconsulta con el precio de `actividad` vigente en `fecha`
+
+    Ambos pueden ser valores o referencias a la consulta exterior (OuterRef), por
+    ejemplo para anotar los ítems con la tarifa del día de su factura:
+    precio_vigente(OuterRef('actividad_id'), OuterRef('factura__fecha_factura')).
+    """
+    return Subquery(
+        ActividadPrecio.objects.filter(actividad=actividad, vigente_desde__lte=fecha)
+        .order_by('-vigente_desde').values('precio')[:1]
+    )
+
+
+def fuera_de_tarifa(items, campo_fecha):
+    """Ítems cuyo precio no coincide con la tarifa vigente en la fecha de su documento
+
+    `campo_fecha` es la ruta a la fecha del documento desde el ítem (por ejemplo
+    'factura__fecha_factura'). Los ítems anteriores al historial no se incluyen.
+    """
+    return items.annotate(
+        tarifa=precio_vigente(OuterRef('actividad_id'), OuterRef(campo_fecha)),
+    ).filter(tarifa__isnull=False).exclude(precio=F('tarifa'))
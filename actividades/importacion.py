@@ -0,0 +1,18 @@
+# Importación del catálogo de actividades desde CSV (core.importacion)
+from core import cache  # Grupos de caché de las actividades
+from core.importacion import Importacion  # Importación por lotes
+from .historial import registrar_precios  # Historial de precios
+from .models import Actividad  # Modelo de actividades
+
+# Columnas del archivo: (encabezado, campo)
+COLUMNAS_ACTIVIDADES = (
+    ('Código', 'codigo'),
+    ('Actividad', 'actividad'),
+    ('Precio', 'precio'),
+    ('Activo', 'activo'),
+)
+
+# Las actividades se identifican por su código; los precios nuevos pasan al historial
+IMPORTACION_ACTIVIDADES = Importacion(
+    Actividad, 'codigo', COLUMNAS_ACTIVIDADES, invalidar=(cache.ACTIVIDADES,), al_guardar=registrar_precios,
+)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actividades', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actividad',
+            index=models.Index(fields=['activo', 'codigo'], name='actividades_activo_d3195f_idx'),
+        ),
+    ]
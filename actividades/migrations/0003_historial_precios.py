@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:17
+#
+# Historial de precios de las actividades. El precio actual de cada actividad se
+# registra como vigente desde el día de la migración: los anteriores no se conocen.
+
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def registrar_precios_actuales(apps, schema_editor):
+    Actividad = apps.get_model('actividades', 'Actividad')
+    ActividadPrecio = apps.get_model('actividades', 'ActividadPrecio')
+    hoy = timezone.localdate()
+    ActividadPrecio.objects.bulk_create(
+        [
+            ActividadPrecio(actividad_id=actividad_id, precio=precio, vigente_desde=hoy)
+            for actividad_id, precio in Actividad.objects.values_list('pk', 'precio')
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('actividades', '0002_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActividadPrecio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('vigente_desde', models.DateField()),
+                ('vigente_hasta', models.DateField(blank=True, null=True)),
+                ('actividad', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='precios', to='actividades.actividad')),
+            ],
+            options={
+                'verbose_name': 'Precio de Actividad',
+                'verbose_name_plural': 'Historial de Precios',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='actividadprecio',
+            constraint=models.UniqueConstraint(fields=('actividad', 'vigente_desde'), name='actividad_precio_desde_unico'),
+        ),
+        migrations.RunPython(registrar_precios_actuales, migrations.RunPython.noop),
+    ]
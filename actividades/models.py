@@ -11,6 +11,35 @@ class Actividad(models.Model):
     # Indica si la actividad está disponible para usar
     activo = models.BooleanField(default=True)
 
+    class Meta:
+        # Actividades activas ordenadas por código (autocompletado de los formularios)
+        indexes = [models.Index(fields=['activo', 'codigo'])]
+
     # Representación en texto de la actividad (código - descripción)
     def __str__(self):
         return f"{self.codigo} - {self.actividad}"
+
+
+class ActividadPrecio(models.Model):
+    # Precio de una actividad durante un período [vigente_desde, vigente_hasta)
+    # (sin índice propio: lo cubre el de la restricción única, que empieza por actividad)
+    actividad = models.ForeignKey(Actividad, related_name='precios', on_delete=models.CASCADE, db_index=False)
+    # Precio vigente en el período
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    # Primer día en que rige el precio
+    vigente_desde = models.DateField()
+    # Día en que deja de regir (vacío si es el precio actual)
+    vigente_hasta = models.DateField(null=True, blank=True)
+
+    class Meta:
+        # Historial de precios (se mantiene en actividades.historial)
+        verbose_name = 'Precio de Actividad'  # Nombre en singular
+        verbose_name_plural = 'Historial de Precios'  # Nombre en plural
+        constraints = [
+            # Un precio por actividad y día; el índice sirve a las consultas por fecha
+            models.UniqueConstraint(fields=['actividad', 'vigente_desde'], name='actividad_precio_desde_unico'),
+        ]
+
+    # Representación en texto del precio (actividad, precio y vigencia)
+    def __str__(self):
+        return f"{self.actividad_id}: {self.precio} desde {self.vigente_desde}"
@@ -0,0 +1,97 @@
+# Cambio masivo de precios del catálogo de actividades
+#
+# Las actividades se eligen por prefijo de código o por una lista de códigos y su
+# precio cambia en un porcentaje o en un importe fijo. El precio nuevo se calcula en
+# la base de datos y se escribe con una sola sentencia UPDATE, en una transacción.
+# Opcionalmente se lleva el precio nuevo a los ítems de las ofertas abiertas (sin
+# factura en el mes actual) con otra sentencia UPDATE, que recalcula sus importes y
+# los totales de las ofertas (core.totales.ItemDocumentoQuerySet). Los precios
+# anteriores quedan en el historial (actividades.historial).
+from datetime import date  # Mes actual
+from decimal import Decimal  # Importes exactos
+
+from django.db import models, transaction  # Tipos de campo y transacción del cambio
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value  # Expresiones SQL
+from django.db.models.functions import Greatest, Round  # Redondeo y mínimo del precio
+
+from core import cache  # Caché de la lista de actividades
+from ofertas.facturacion import facturas_del_mes  # Facturas del mes generadas desde ofertas
+from ofertas.models import OfertaItem  # Ítems de las ofertas
+from .historial import registrar_precios  # Historial de precios
+from .models import Actividad  # Modelo de actividades
+
+# Tipos de cambio de precio
+PORCENTAJE = 'porcentaje'
+IMPORTE = 'importe'
+MODOS = (
+    (PORCENTAJE, 'Porcentaje (%)'),
+    (IMPORTE, 'Importe fijo (CUP)'),
+)
+# Actividades que se muestran en la vista previa
+FILAS_VISTA_PREVIA = 50
+
+
+def seleccionar(prefijo='', codigos=(), solo_activas=False):
+    """Actividades cuyo código empieza por `prefijo` o está en `codigos`"""
+    filtro = Q()
+    if prefijo:
+        filtro |= Q(codigo__startswith=prefijo)
+    if codigos:
+        filtro |= Q(codigo__in=codigos)
+    actividades = Actividad.objects.filter(filtro)
+    if solo_activas:
+        actividades = actividades.filter(activo=True)
+    return actividades
+
+
+def precio_nuevo(modo, valor):
+    """Expresión SQL del precio nuevo (redondeado a centavos y nunca negativo)"""
+    precio = Actividad._meta.get_field('precio')
+    if modo == PORCENTAJE:
+        nuevo = F('precio') * Value(1 + valor / 100, output_field=models.DecimalField())
+    else:
+        nuevo = F('precio') + Value(valor, output_field=models.DecimalField())
+    return Greatest(Round(nuevo, 2, output_field=precio), Value(Decimal('0.00'), output_field=precio))
+
+
+def items_abiertos(actividades):
+    """Ítems de las actividades indicadas en ofertas que todavía no se facturaron este mes
+
+    Las ofertas ya facturadas en el mes conservan el precio de esa factura; las demás
+    (también las que se facturan cada mes) se facturarán con el precio nuevo.
+    """
+    return OfertaItem.objects.filter(actividad__in=actividades.values('pk')).exclude(
+        oferta__in=facturas_del_mes(date.today()).values('oferta_id')
+    )
+
+
+def vista_previa(actividades, modo, valor):
+    """Primeras actividades con su precio actual y el nuevo, y cuántas filas cambiarían"""
+    filas = list(
+        actividades.annotate(nuevo=precio_nuevo(modo, valor)).order_by('codigo')
+        .values_list('codigo', 'actividad', 'precio', 'nuevo')[:FILAS_VISTA_PREVIA]
+    )
+    resumen = items_abiertos(actividades).aggregate(items=Count('pk'), ofertas=Count('oferta', distinct=True))
+    return {
+        'filas': filas,  # (código, actividad, precio, precio nuevo)
+        'actividades': actividades.count(),  # Actividades que cambian
+        **resumen,  # Ítems y ofertas abiertas que cambiarían al propagar
+    }
+
+
+def aplicar(actividades, modo, valor, propagar=False):
+    """Cambia el precio de las actividades y, si se pide, el de sus ítems en ofertas abiertas
+
+    Devuelve (actividades cambiadas, ítems de oferta cambiados).
+    """
+    with transaction.atomic():
+        cambiadas = actividades.update(precio=precio_nuevo(modo, valor))
+        registrar_precios(actividades)
+        items = 0
+        if propagar:
+            items = items_abiertos(actividades).update(
+                precio=Subquery(Actividad.objects.filter(pk=OuterRef('actividad_id')).values('precio')[:1])
+            )
+        # update() no envía señales: descartar la lista de actividades en caché
+        cache.invalidar_al_confirmar(cache.ACTIVIDADES)
+    return cambiadas, items
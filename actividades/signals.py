@@ -0,0 +1,21 @@
+# Señales de la aplicación de actividades
+from django.db.models.signals import post_delete, post_save  # Señales de modelos
+from django.dispatch import receiver  # Decorador para conectar señales
+
+from core import cache  # Caché de datos de referencia y agregados
+from .historial import registrar_precio  # Historial de precios
+from .models import Actividad  # Modelo de actividades
+
+
+@receiver(post_save, sender=Actividad)
+@receiver(post_delete, sender=Actividad)
+def invalidar_actividades(sender, **kwargs):
+    """Descarta la lista de actividades activas guardada en caché"""
+    cache.invalidar_al_confirmar(cache.ACTIVIDADES)
+
+
+@receiver(post_save, sender=Actividad)
+def registrar_historial_precio(sender, instance, raw=False, **kwargs):
+    """Lleva al historial el precio de la actividad si cambió"""
+    if not raw:
+        registrar_precio(instance)
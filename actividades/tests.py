@@ -1,3 +1,144 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F, Sum
+from django.urls import reverse
+
+from core.pruebas import ConsultasTestCase
+from facturas.models import FacturaItem
+from ofertas import facturacion
+from ofertas.models import Oferta, OfertaItem
+from .models import Actividad, ActividadPrecio
+from . import historial, precios
+
+
+def ultima_actividad():
+    return [Actividad.objects.latest('pk').pk]
+
+
+class ConsultasActividadesTests(ConsultasTestCase):
+    vistas = (
+        'lista_actividades',
+        'crear_actividad',
+        'editar_actividad',
+        'autocompletar_actividades',
+        'importar_actividades',
+        'cambiar_precios',
+    )
+
+    def test_lista_actividades(self):
+        self.assertConsultas(3, 'lista_actividades')
+
+    def test_lista_actividades_busqueda(self):
+        self.assertConsultas(3, 'lista_actividades', datos={'q': 'prueba'})
+
+    def test_crear_actividad(self):
+        self.assertConsultas(2, 'crear_actividad')
+
+    def test_editar_actividad(self):
+        self.assertConsultas(4, 'editar_actividad', args=ultima_actividad)
+
+    def test_editar_actividad_post(self):
+        def datos():
+            actividad = Actividad.objects.latest('pk')
+            return {'codigo': actividad.codigo, 'actividad': actividad.actividad, 'precio': '10.00', 'activo': 'on'}
+
+        self.assertConsultas(8, 'editar_actividad', args=ultima_actividad, datos=datos, metodo='post', estado=302)
+
+    def test_autocompletar_actividades(self):
+        self.assertConsultas(3, 'autocompletar_actividades', datos={'q': 'P'})
+
+    def test_autocompletar_actividades_requiere_permiso(self):
+        usuario = User.objects.create_user('vendedor')
+        self.client.force_login(usuario)
+        # Sin permiso de lectura se redirige al dashboard, sin resultados
+        self.assertEqual(self.client.get(reverse('autocompletar_actividades'), {'q': 'P'}).status_code, 302)
+        usuario.user_permissions.add(Permission.objects.get(codename='view_actividad'))
+        respuesta = self.client.get(reverse('autocompletar_actividades'), {'q': 'P'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['resultados'])
+
+    def test_importar_actividades(self):
+        self.assertConsultas(2, 'importar_actividades')
+
+    def test_importar_actividades_post(self):
+        def datos():
+            filas = ['codigo,actividad,precio', 'IMP-1,Importada,"12,50"', f'{Actividad.objects.latest("pk").codigo},Cambiada,3']
+            return {'archivo': SimpleUploadedFile('actividades.csv', '\n'.join(filas).encode('cp1252'), 'text/csv'),
+                    'codificacion': 'cp1252'}
+
+        self.assertConsultas(10, 'importar_actividades', datos=datos, metodo='post')
+
+    def test_cambiar_precios(self):
+        self.assertConsultas(2, 'cambiar_precios')
+
+    def test_cambiar_precios_vista_previa(self):
+        datos = {'prefijo': 'P', 'solo_activas': 'on', 'modo': 'porcentaje', 'valor': '10', 'vista_previa': '1'}
+        self.assertConsultas(5, 'cambiar_precios', datos=datos, metodo='post')
+
+    def test_cambiar_precios_aplicar(self):
+        datos = {'prefijo': 'P', 'modo': 'importe', 'valor': '-1.50', 'propagar': 'on', 'aplicar': '1'}
+        self.assertConsultas(12, 'cambiar_precios', datos=datos, metodo='post', estado=302)
+
+    def test_aplicar_propaga_a_ofertas_abiertas(self):
+        actividad = Actividad.objects.filter(ofertaitem__oferta__factura__isnull=True).earliest('pk')
+        Actividad.objects.filter(pk=actividad.pk).update(precio=Decimal('10.05'))
+        # Una oferta ya facturada este mes conserva el precio de su factura
+        facturada = Oferta.objects.filter(items__actividad=actividad).earliest('pk')
+        facturacion.facturar_oferta(facturada, User.objects.get(username='pruebas'))
+        abierta = Oferta.objects.exclude(pk=facturada.pk).earliest('pk')
+        OfertaItem.objects.create(oferta=abierta, actividad=actividad, cantidad=3, precio=actividad.precio)
+        antes = list(OfertaItem.objects.filter(oferta=facturada).values_list('precio', flat=True))
+
+        cambiadas, items = precios.aplicar(precios.seleccionar(codigos=[actividad.codigo]), precios.PORCENTAJE, Decimal('10'), True)
+
+        actividad.refresh_from_db()
+        self.assertEqual((cambiadas, actividad.precio), (1, Decimal('11.06')))
+        abiertos = OfertaItem.objects.filter(actividad=actividad).exclude(oferta=facturada)
+        self.assertTrue(abiertos.exists())
+        self.assertEqual(items, abiertos.count())
+        self.assertFalse(abiertos.exclude(precio=Decimal('11.06'), importe=F('cantidad') * Decimal('11.06')).exists())
+        self.assertEqual(list(OfertaItem.objects.filter(oferta=facturada).values_list('precio', flat=True)), antes)
+        for oferta in Oferta.objects.annotate(suma=Sum('items__importe')):
+            self.assertEqual(oferta.total, oferta.suma or 0)
+
+    def test_precio_nunca_negativo(self):
+        precios.aplicar(precios.seleccionar(prefijo='P'), precios.IMPORTE, Decimal('-1000000'))
+        self.assertFalse(Actividad.objects.filter(precio__lt=0).exists())
+        self.assertTrue(Actividad.objects.filter(precio=0).exists())
+
+    def test_historial_de_precios(self):
+        actividad = Actividad.objects.latest('pk')
+        inicial = actividad.precio
+        desde = ActividadPrecio.objects.get(actividad=actividad).vigente_desde
+        manana = date.today() + timedelta(days=1)
+
+        actividad.precio = Decimal('20.00')
+        actividad.save()  # Cambio de hoy
+        actividad.precio = Decimal('21.00')
+        actividad.save()  # Otro cambio el mismo día: corrige el período de hoy
+        actividad.precio = Decimal('25.00')
+        actividad.save(update_fields=['precio'])
+        historial.registrar_precio(actividad, manana)  # Sin cambio: no agrega períodos
+        Actividad.objects.filter(pk=actividad.pk).update(precio=Decimal('30.00'))
+        historial.registrar_precios(Actividad.objects.filter(pk=actividad.pk), manana)
+
+        periodos = list(actividad.precios.order_by('vigente_desde').values_list('precio', 'vigente_desde', 'vigente_hasta'))
+        self.assertEqual(periodos, [
+            (inicial, desde, date.today()),
+            (Decimal('25.00'), date.today(), manana),
+            (Decimal('30.00'), manana, None),
+        ])
+        self.assertIsNone(historial.precio_en(actividad, desde - timedelta(days=1)))
+        self.assertEqual(historial.precio_en(actividad, desde), inicial)
+        self.assertEqual(historial.precio_en(actividad, date.today()), Decimal('25.00'))
+        self.assertEqual(historial.precio_en(actividad, manana + timedelta(days=400)), Decimal('30.00'))
+
+    def test_items_fuera_de_tarifa(self):
+        items = FacturaItem.objects.filter(factura__fecha_factura__isnull=False)
+        self.assertFalse(historial.fuera_de_tarifa(items, 'factura__fecha_factura').exists())
+        item = items.earliest('pk')
+        FacturaItem.objects.filter(pk=item.pk).update(precio=F('precio') + 1)
+        self.assertEqual(list(historial.fuera_de_tarifa(items, 'factura__fecha_factura').values_list('pk', flat=True)), [item.pk])
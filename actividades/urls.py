@@ -12,4 +12,13 @@ urlpatterns = [
     
     # Editar una actividad existente
     path('<int:actividad_id>/editar/', views.editar_actividad, name='editar_actividad'),
+    
+    # Cambiar de una vez el precio de varias actividades
+    path('precios/', views.cambiar_precios, name='cambiar_precios'),
+    
+    # Importar actividades desde CSV
+    path('importar/', views.importar_actividades, name='importar_actividades'),
+    
+    # Autocompletado JSON para los formularios
+    path('autocompletar/', views.autocompletar_actividades, name='autocompletar_actividades'),
 ]
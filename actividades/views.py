@@ -2,9 +2,16 @@
 from django.shortcuts import render, get_object_or_404, redirect  # Funciones útiles de Django
 from django.contrib.auth.decorators import login_required, permission_required  # Protección de vistas
 from django.contrib import messages  # Sistema de mensajes
-from django.db import models  # Operaciones de base de datos
+from core import autocompletar, busqueda  # Autocompletado y búsqueda de texto indexada
+from core.importacion import respuesta_importar  # Importación masiva desde CSV
+from core.paginacion import paginar  # Paginación por cursor
+from .importacion import IMPORTACION_ACTIVIDADES  # Importación de actividades desde CSV
 from .models import Actividad  # Modelo de Actividad
-from .forms import ActividadForm  # Formulario de Actividad
+from .forms import ActividadForm, CambioPreciosForm  # Formularios de actividades
+from . import precios  # Cambio masivo de precios
+
+# Períodos del historial de precios que se muestran al editar una actividad
+HISTORIAL_VISIBLE = 10
 
 @login_required
 @permission_required('actividades.view_actividad', raise_exception=True)
@@ -17,17 +24,15 @@ def lista_actividades(request):
     query = request.GET.get('q', '')
     
     if query:
-        # Filtrar actividades que coincidan con la búsqueda
-        actividades = Actividad.objects.filter(
-            models.Q(codigo__icontains=query) |       # Buscar en código
-            models.Q(actividad__icontains=query)      # Buscar en descripción
-        ).order_by('-id')  # Ordenar por ID descendente
+        # Búsqueda indexada (core.busqueda), paginada del más al menos relevante
+        pagina = paginar(request, busqueda.buscar(Actividad.objects.all(), query), 'relevancia')
     else:
-        # Si no hay búsqueda, mostrar todas las actividades
-        actividades = Actividad.objects.all().order_by('-id')
-        
+        # Sin búsqueda: todos, paginados por cursor en orden descendente de ID
+        pagina = paginar(request, Actividad.objects.all())
+
     return render(request, 'actividades/lista_actividades.html', {
-        'actividades': actividades,  # Lista de actividades filtrada
+        'actividades': pagina,  # Página actual de actividades
+        'pagina': pagina,  # Cursores de navegación entre páginas
         'query': query  # Término de búsqueda para mostrar en el formulario
     })
 
@@ -78,5 +83,65 @@ def editar_actividad(request, actividad_id):
         
     return render(request, 'actividades/editar_actividad.html', {
         'form': form,            # Formulario con datos de la actividad
-        'actividad': actividad   # Datos de la actividad para la plantilla
+        'actividad': actividad,  # Datos de la actividad para la plantilla
+        'precios': actividad.precios.order_by('-vigente_desde')[:HISTORIAL_VISIBLE],  # Últimos precios
+    })
+
+@login_required
+@permission_required('actividades.change_actividad', raise_exception=True)
+def cambiar_precios(request):
+    """Vista para cambiar de una vez el precio de varias actividades
+
+    Con el botón de vista previa muestra los precios nuevos sin guardar; al aplicar,
+    el cambio se hace con una sola sentencia UPDATE (ver actividades.precios).
+    """
+    form = CambioPreciosForm(request.POST or None)
+    vista_previa = None
+    if request.method == 'POST' and form.is_valid():
+        datos = form.cleaned_data
+        if datos['propagar'] and not request.user.has_perm('ofertas.change_oferta'):
+            form.add_error('propagar', 'No tiene permiso para modificar ofertas.')
+        elif 'aplicar' in request.POST:
+            cambiadas, items = precios.aplicar(form.actividades(), datos['modo'], datos['valor'], datos['propagar'])
+            mensaje = f'Precio cambiado en {cambiadas} actividades'
+            if datos['propagar']:
+                mensaje += f' y {items} ítems de ofertas sin facturar'
+            messages.success(request, f'{mensaje}.')
+            return redirect('lista_actividades')
+        else:
+            vista_previa = precios.vista_previa(form.actividades(), datos['modo'], datos['valor'])
+
+    return render(request, 'actividades/cambiar_precios.html', {
+        'form': form,  # Filtro y cambio de precio
+        'vista_previa': vista_previa,  # Precios nuevos (si se pidió la vista previa)
     })
+
+@login_required
+@permission_required(['actividades.add_actividad', 'actividades.change_actividad'], raise_exception=True)
+def importar_actividades(request):
+    """Vista para importar actividades desde un CSV
+
+    Crea las actividades nuevas y actualiza las existentes (por código) en lotes;
+    las filas con errores se pueden descargar en un informe para corregirlas.
+    """
+    return respuesta_importar(request, IMPORTACION_ACTIVIDADES, 'Actividades', 'lista_actividades')
+
+@login_required
+@permission_required('actividades.view_actividad', raise_exception=True)
+def autocompletar_actividades(request):
+    """Endpoint JSON de autocompletado de actividades activas
+
+    Lo usan los selectores de actividad de facturas y ofertas. Busca por el inicio
+    del código o de la descripción (parámetro `q`) y devuelve también el precio.
+    """
+    return autocompletar.respuesta(
+        request,
+        Actividad.objects.filter(activo=True).only('pk', 'codigo', 'actividad', 'precio'),
+        campos=['codigo', 'actividad'],
+        orden='codigo',
+        resultado=lambda actividad: {
+            'id': actividad.pk,
+            'texto': str(actividad),
+            'precio': str(actividad.precio),
+        },
+    )
@@ -0,0 +1,39 @@
+# Exportación del listado de clientes a CSV/XLSX (core.descargas)
+from core import busqueda  # Búsqueda de texto indexada
+from .models import Cliente  # Modelo de clientes
+
+# Columnas de la exportación: (encabezado, campo)
+COLUMNAS_CLIENTES = (
+    ('Nombre', 'nombre'),
+    ('Número de contrato', 'numero_contrato'),
+    ('Fecha de contrato', 'fecha_contrato'),
+    ('Vencimiento del contrato', 'fecha_vencimiento_contrato'),
+    ('Código REEUP', 'codigo_reeup'),
+    ('NIT', 'codigo_nit'),
+    ('Cuenta CUP', 'cuenta_bancaria_cup'),
+    ('Dirección postal', 'direccion_postal'),
+    ('Correo electrónico', 'correo_electronico'),
+    ('Teléfonos', 'telefonos'),
+    ('Director', 'nombre_director'),
+    ('CI del director', 'ci_director'),
+    ('Económico', 'nombre_economico'),
+    ('CI del económico', 'ci_economico'),
+    ('Autorizado 1', 'nombre_autorizado1'),
+    ('CI del autorizado 1', 'ci_autorizado1'),
+    ('Autorizado 2', 'nombre_autorizado2'),
+    ('CI del autorizado 2', 'ci_autorizado2'),
+    ('Autorizado 3', 'nombre_autorizado3'),
+    ('CI del autorizado 3', 'ci_autorizado3'),
+    ('Activo', 'activo'),
+    ('Cliente VERSAT', 'clienteversat'),
+    ('Cuenta VERSAT', 'cuentaversat'),
+)
+
+
+def filtrar_clientes(datos):
+    """Clientes que coinciden con la búsqueda `q` del listado (todos, sin límite de resultados)"""
+    clientes = Cliente.objects.all()
+    query = datos.get('q', '').strip()
+    if query:
+        clientes = clientes.filter(pk__in=busqueda.coincidencias(Cliente, query))
+    return clientes
@@ -0,0 +1,7 @@
+# Importación de clientes desde CSV (core.importacion)
+from core.importacion import Importacion  # Importación por lotes
+from .exportacion import COLUMNAS_CLIENTES  # Las mismas columnas de la exportación
+from .models import Cliente  # Modelo de clientes
+
+# Los clientes se identifican por su número de contrato
+IMPORTACION_CLIENTES = Importacion(Cliente, 'numero_contrato', COLUMNAS_CLIENTES)
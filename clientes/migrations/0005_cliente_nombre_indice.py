@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_cliente_clienteversat_cliente_cuentaversat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre', 'id'], name='clientes_cl_nombre_802266_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0005_cliente_nombre_indice'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='clientes_cl_nombre_802266_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['activo', 'nombre', 'id'], name='clientes_cl_activo_c44f8c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['numero_contrato'], name='clientes_cl_numero__5583c0_idx'),
+        ),
+    ]
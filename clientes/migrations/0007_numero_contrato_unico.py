@@ -0,0 +1,72 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:10
+#
+# El número de contrato pasa a ser único: es la clave con la que la importación
+# masiva (core.importacion) decide si crea o actualiza un cliente. Los números
+# repetidos se renombran antes con el sufijo -<id>, salvo el del cliente más antiguo.
+#
+# En SQLite cambiar la columna reconstruye la tabla y se pierden sus triggers, así
+# que se restaura el índice de búsqueda al aplicarla y al revertirla.
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def renombrar_repetidos(apps, schema_editor):
+    Cliente = apps.get_model('clientes', 'Cliente')
+    repetidos = (
+        Cliente.objects.values('numero_contrato').annotate(cantidad=Count('id'))
+        .filter(cantidad__gt=1).values_list('numero_contrato', flat=True)
+    )
+    for numero in list(repetidos):
+        for cliente in Cliente.objects.filter(numero_contrato=numero).order_by('id')[1:]:
+            sufijo = f'-{cliente.pk}'
+            cliente.numero_contrato = numero[:50 - len(sufijo)] + sufijo
+            cliente.save(update_fields=['numero_contrato'])
+
+
+# Índice de búsqueda de la tabla (copia fija del SQL de core.busqueda.sentencias_sqlite:
+# las migraciones no deben depender del código actual de la aplicación)
+BUSQUEDA_SQLITE = [
+    'DROP TRIGGER IF EXISTS fts_clientes_cliente_ai',
+    'DROP TRIGGER IF EXISTS fts_clientes_cliente_au',
+    'DROP TRIGGER IF EXISTS fts_clientes_cliente_ad',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS fts_clientes_cliente USING fts5(texto, tokenize='trigram')",
+    'DELETE FROM fts_clientes_cliente',
+    "INSERT INTO fts_clientes_cliente (rowid, texto) SELECT id, coalesce(nombre, '') || ' | ' || coalesce(numero_contrato, '') FROM clientes_cliente",
+    "CREATE TRIGGER fts_clientes_cliente_ai AFTER INSERT ON clientes_cliente BEGIN "
+    "INSERT INTO fts_clientes_cliente (rowid, texto) VALUES (new.id, coalesce(new.nombre, '') || ' | ' || coalesce(new.numero_contrato, '')); END",
+    "CREATE TRIGGER fts_clientes_cliente_au AFTER UPDATE ON clientes_cliente BEGIN "
+    "DELETE FROM fts_clientes_cliente WHERE rowid = old.id; "
+    "INSERT INTO fts_clientes_cliente (rowid, texto) VALUES (new.id, coalesce(new.nombre, '') || ' | ' || coalesce(new.numero_contrato, '')); END",
+    "CREATE TRIGGER fts_clientes_cliente_ad AFTER DELETE ON clientes_cliente BEGIN "
+    "DELETE FROM fts_clientes_cliente WHERE rowid = old.id; END",
+]
+
+
+def restaurar_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sentencia in BUSQUEDA_SQLITE:
+            schema_editor.execute(sentencia)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0006_indices_consultas'),
+        ('core', '0004_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restaurar_busqueda),
+        migrations.RunPython(renombrar_repetidos, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='cliente',
+            name='clientes_cl_numero__5583c0_idx',
+        ),
+        migrations.AlterField(
+            model_name='cliente',
+            name='numero_contrato',
+            field=models.CharField(max_length=50, unique=True),
+        ),
+        migrations.RunPython(restaurar_busqueda, migrations.RunPython.noop),
+    ]
@@ -5,7 +5,7 @@ from django.contrib.auth.models import User  # Para la relación con usuarios
 class Cliente(models.Model):
     # Datos básicos del cliente
     nombre = models.CharField(max_length=255)  # Nombre o razón social del cliente
-    numero_contrato = models.CharField(max_length=50)  # Número del contrato con el cliente
+    numero_contrato = models.CharField(max_length=50, unique=True)  # Número del contrato con el cliente (clave de la importación)
     fecha_contrato = models.DateField()  # Fecha en que se firmó el contrato
     
     # Datos fiscales y bancarios
@@ -43,6 +43,12 @@ class Cliente(models.Model):
     clienteversat = models.CharField(max_length=255, blank=True, null=True)  # Código del cliente en VERSAT
     cuentaversat = models.IntegerField(blank=True, null=True)  # Número de cuenta en VERSAT
 
+    class Meta:
+        indexes = [
+            # Clientes activos en orden alfabético (autocompletado y conteo del dashboard)
+            models.Index(fields=['activo', 'nombre', 'id']),
+        ]
+
     # Representación en texto del cliente
     def __str__(self):
         return self.nombre
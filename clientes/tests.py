@@ -1,3 +1,104 @@
-from django.test import TestCase
+from django.contrib.auth.models import Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
 
-# Create your tests here.
+from core.pruebas import ConsultasTestCase
+from .models import Cliente
+
+
+def ultimo_cliente():
+    return [Cliente.objects.latest('pk').pk]
+
+
+def csv_clientes():
+    """CSV con un cliente nuevo, uno existente y una fila con errores"""
+    existente = Cliente.objects.earliest('pk')
+    filas = [
+        'Nombre;Número de contrato;Fecha de contrato;Código REEUP;NIT;Cuenta CUP;Dirección postal;'
+        'Correo electrónico;Teléfonos;Director;CI del director;Económico;CI del económico;Activo',
+        'Cliente importado;IMP-00001;01/02/2025;1;2;3;Calle 1;imp@ejemplo.cu;555;Dir;1;Eco;2;sí',
+        f'Renombrado;{existente.numero_contrato};2025-02-01;1;2;3;Calle 2;ren@ejemplo.cu;555;Dir;1;Eco;2;no',
+        'Sin correo;IMP-00002;2025-02-30;1;2;3;Calle 3;malo;555;Dir;1;Eco;2;1',
+    ]
+    return {
+        'archivo': SimpleUploadedFile('clientes.csv', '\r\n'.join(filas).encode('utf-8'), 'text/csv'),
+        'codificacion': 'utf-8-sig',
+    }
+
+
+class ConsultasClientesTests(ConsultasTestCase):
+    vistas = (
+        'lista_clientes',
+        'exportar_clientes',
+        'crear_cliente',
+        'editar_cliente',
+        'ver_cliente',
+        'autocompletar_clientes',
+        'importar_clientes',
+    )
+
+    def test_lista_clientes(self):
+        self.assertConsultas(3, 'lista_clientes')
+
+    def test_lista_clientes_busqueda(self):
+        self.assertConsultas(3, 'lista_clientes', datos={'q': 'cliente'})
+
+    def test_crear_cliente(self):
+        self.assertConsultas(2, 'crear_cliente')
+
+    def test_editar_cliente(self):
+        self.assertConsultas(3, 'editar_cliente', args=ultimo_cliente)
+
+    def test_ver_cliente(self):
+        self.assertConsultas(3, 'ver_cliente', args=ultimo_cliente)
+
+    def test_autocompletar_clientes(self):
+        self.assertConsultas(3, 'autocompletar_clientes', datos={'q': 'cli'})
+
+    def test_autocompletar_clientes_prefijo_corto(self):
+        self.assertConsultas(3, 'autocompletar_clientes', datos={'q': 'c'})
+
+    def test_autocompletar_clientes_requiere_permiso(self):
+        usuario = User.objects.create_user('vendedor')
+        self.client.force_login(usuario)
+        # Sin permiso de lectura se redirige al dashboard, sin resultados
+        self.assertEqual(self.client.get(reverse('autocompletar_clientes'), {'q': 'cli'}).status_code, 302)
+        usuario.user_permissions.add(Permission.objects.get(codename='view_cliente'))
+        respuesta = self.client.get(reverse('autocompletar_clientes'), {'q': 'cli'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.json()['resultados'])
+
+    def test_exportar_clientes(self):
+        self.assertConsultas(3, 'exportar_clientes')
+
+    def test_exportar_clientes_busqueda_xlsx(self):
+        self.assertConsultas(3, 'exportar_clientes', datos={'q': 'cliente', 'formato': 'xlsx'})
+
+    def test_importar_clientes(self):
+        self.assertConsultas(2, 'importar_clientes')
+
+    def test_importar_clientes_post(self):
+        self.assertConsultas(6, 'importar_clientes', datos=csv_clientes, metodo='post')
+
+    def test_importar_clientes_crea_actualiza_e_informa(self):
+        existente = Cliente.objects.earliest('pk')
+        respuesta = self.client.post(reverse('importar_clientes'), csv_clientes())
+        resultado = respuesta.context['resultado']
+        self.assertEqual((resultado.creados, resultado.actualizados, resultado.con_errores), (1, 1, 1))
+        self.assertEqual(len(resultado.errores[0][1]), 2)  # Fecha y correo
+        existente.refresh_from_db()
+        self.assertEqual((existente.nombre, existente.activo), ('Renombrado', False))
+        self.assertTrue(Cliente.objects.filter(numero_contrato='IMP-00001', activo=True).exists())
+
+        informe = self.client.get(reverse('informe_importacion', args=[respuesta.context['token']]))
+        lineas = b''.join(informe.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(len(lineas), 2)
+        self.assertTrue(lineas[1].startswith('Sin correo;IMP-00002;'))
+
+    def test_exportacion_se_puede_importar(self):
+        exportado = self.client.get(reverse('exportar_clientes'))
+        archivo = SimpleUploadedFile('clientes.csv', b''.join(exportado.streaming_content), 'text/csv')
+        respuesta = self.client.post(reverse('importar_clientes'), {'archivo': archivo, 'codificacion': 'utf-8-sig'})
+        resultado = respuesta.context['resultado']
+        self.assertEqual((resultado.creados, resultado.con_errores), (0, 0))
+        self.assertEqual(resultado.actualizados, Cliente.objects.count())
@@ -7,6 +7,9 @@ urlpatterns = [
     # Lista de todos los clientes
     path('', views.lista_clientes, name='lista_clientes'),
     
+    # Descargar en CSV o XLSX los clientes (filtrados por la búsqueda)
+    path('exportar/', views.exportar_clientes, name='exportar_clientes'),
+    
     # Crear un nuevo cliente
     path('crear/', views.crear_cliente, name='crear_cliente'),
     
@@ -15,4 +18,10 @@ urlpatterns = [
     
     # Ver detalles de un cliente específico
     path('<int:cliente_id>/', views.ver_cliente, name='ver_cliente'),
+    
+    # Importar clientes desde CSV
+    path('importar/', views.importar_clientes, name='importar_clientes'),
+    
+    # Autocompletado JSON para los formularios
+    path('autocompletar/', views.autocompletar_clientes, name='autocompletar_clientes'),
 ]
@@ -2,7 +2,12 @@
 from django.shortcuts import render, get_object_or_404, redirect  # Funciones útiles de Django
 from django.contrib.auth.decorators import login_required, permission_required  # Protección de vistas
 from django.contrib import messages  # Sistema de mensajes
-from django.db import models  # Operaciones de base de datos
+from core import autocompletar, busqueda  # Autocompletado y búsqueda de texto indexada
+from core.descargas import formato_tabla, respuesta_tabla  # Tablas CSV/XLSX en flujo
+from core.importacion import respuesta_importar  # Importación masiva desde CSV
+from core.paginacion import paginar  # Paginación por cursor
+from .exportacion import COLUMNAS_CLIENTES, filtrar_clientes  # Exportación del listado
+from .importacion import IMPORTACION_CLIENTES  # Importación de clientes desde CSV
 from .models import Cliente  # Modelo de Cliente
 from .forms import ClienteForm  # Formulario de Cliente
 
@@ -17,20 +22,31 @@ def lista_clientes(request):
     query = request.GET.get('q', '')
     
     if query:
-        # Filtrar clientes que coincidan con la búsqueda
-        clientes = Cliente.objects.filter(
-            models.Q(nombre__icontains=query) |  # Buscar en nombre
-            models.Q(numero_contrato__icontains=query)  # Buscar en número de contrato
-        ).order_by('-id')  # Ordenar por ID descendente
+        # Búsqueda indexada (core.busqueda), paginada del más al menos relevante
+        pagina = paginar(request, busqueda.buscar(Cliente.objects.all(), query), 'relevancia')
     else:
-        # Si no hay búsqueda, mostrar todos los clientes
-        clientes = Cliente.objects.all().order_by('-id')
-        
+        # Sin búsqueda: todos, paginados por cursor en orden descendente de ID
+        pagina = paginar(request, Cliente.objects.all())
+
     return render(request, 'clientes/lista_clientes.html', {
-        'clientes': clientes,  # Lista de clientes filtrada
+        'clientes': pagina,  # Página actual de clientes
+        'pagina': pagina,  # Cursores de navegación entre páginas
         'query': query  # Término de búsqueda para mostrar en el formulario
     })
 
+@login_required
+@permission_required('clientes.view_cliente', raise_exception=True)
+def exportar_clientes(request):
+    """Vista para descargar en CSV o XLSX (`formato`) los clientes
+
+    Con búsqueda (`q`) incluye todos los clientes que coinciden, no solo la
+    página que muestra la lista.
+    """
+    return respuesta_tabla(
+        'clientes', COLUMNAS_CLIENTES, filtrar_clientes(request.GET), formato_tabla(request.GET),
+        orden=('nombre', 'pk'), hoja='Clientes',
+    )
+
 @login_required
 @permission_required('clientes.add_cliente', raise_exception=True)
 def crear_cliente(request):
@@ -126,3 +142,29 @@ def ver_cliente(request, cliente_id):
     return render(request, 'clientes/ver_cliente.html', {
         'cliente': cliente  # Datos del cliente para la plantilla
     })
+
+@login_required
+@permission_required(['clientes.add_cliente', 'clientes.change_cliente'], raise_exception=True)
+def importar_clientes(request):
+    """Vista para importar clientes desde un CSV
+
+    Crea los clientes nuevos y actualiza los existentes (por número de contrato) en lotes;
+    las filas con errores se pueden descargar en un informe para corregirlas.
+    """
+    return respuesta_importar(request, IMPORTACION_CLIENTES, 'Clientes', 'lista_clientes')
+
+@login_required
+@permission_required('clientes.view_cliente', raise_exception=True)
+def autocompletar_clientes(request):
+    """Endpoint JSON de autocompletado de clientes activos
+
+    Lo usan los selectores de cliente de facturas y ofertas. Busca por el inicio
+    del nombre o del número de contrato (parámetro `q`).
+    """
+    return autocompletar.respuesta(
+        request,
+        Cliente.objects.filter(activo=True).only('pk', 'nombre', 'numero_contrato'),
+        campos=['nombre', 'numero_contrato'],
+        orden='nombre',
+        resultado=lambda cliente: {'id': cliente.pk, 'texto': str(cliente)},
+    )
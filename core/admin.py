@@ -1,6 +1,6 @@
 # Importar módulos necesarios de Django
 from django.contrib import admin  # Funcionalidades del admin
-from .models import Empresa, AreaVenta, UserLog  # Modelos del núcleo
+from .models import Empresa, AreaVenta, UserLog, Secuencia  # Modelos del núcleo
 
 # Registrar y configurar la administración de Empresa
 @admin.register(Empresa)
@@ -36,3 +36,14 @@ class UserLogAdmin(admin.ModelAdmin):
         'timestamp',  # Fecha y hora
         'details'     # Detalles adicionales
     ]
+
+# Registrar y configurar la administración de Secuencias de numeración
+@admin.register(Secuencia)
+class SecuenciaAdmin(admin.ModelAdmin):
+    # Campos a mostrar en la lista de secuencias
+    list_display = [
+        'tipo',    # Tipo de documento
+        'anno',    # Año de la numeración
+        'ultimo'   # Último número entregado
+    ]
+    list_filter = ['tipo', 'anno']  # Filtrar por tipo y año
@@ -0,0 +1,85 @@
+# Autocompletado de clientes y actividades en los formularios
+#
+# Los <select> de cliente y actividad ya no incluyen todas las opciones: el widget
+# SelectAutocompletar muestra solo la opción elegida y el navegador pide las demás
+# a un endpoint JSON (templates/autocompletar_js.html) mientras el usuario escribe.
+# Cada respuesta trae una página de POR_PAGINA resultados en orden alfabético y un
+# cursor para pedir la siguiente. Los endpoints exigen el mismo permiso de lectura
+# que el listado del modelo.
+from django import forms  # Widgets de formularios
+from django.db.models import Q  # Expresiones de consulta
+from django.http import JsonResponse  # Respuestas JSON
+
+from . import busqueda  # Índices de texto (para los prefijos de 3 o más caracteres)
+from .paginacion import codificar, decodificar  # Cursores de paginación
+
+# Cantidad de resultados por página de autocompletado
+POR_PAGINA = 20
+
+
+class SelectAutocompletar(forms.Select):
+    """Select que solo renderiza la opción elegida y carga el resto por JSON
+
+    `url` es la URL del endpoint de autocompletado (puede ser reverse_lazy).
+    """
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocompletar'] = str(self.url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # Solo la opción vacía y las elegidas, sin recorrer el queryset completo
+        elegidos = [v for v in value if v not in (None, '')]
+        opciones = [self.create_option(name, '', '---------', not elegidos, 0)]
+        queryset = getattr(self.choices, 'queryset', None)
+        if elegidos and queryset is not None:
+            for indice, obj in enumerate(queryset.filter(pk__in=elegidos), start=1):
+                opciones.append(self.create_option(name, obj.pk, self.choices.field.label_from_instance(obj), True, indice))
+        return [(None, opciones, 0)]
+
+
+def filtrar_prefijo(queryset, texto, campos):
+    """Objetos con algún campo que empieza por el texto (sin distinguir mayúsculas)
+
+    Con 3 o más caracteres se acota primero con el índice de trigramas de
+    core.busqueda, que también contiene las coincidencias por prefijo.
+    """
+    texto = texto.strip()
+    if not texto:
+        return queryset
+    if len(texto) >= busqueda.MINIMO_TRIGRAMA:
+        queryset = queryset.filter(pk__in=busqueda.coincidencias(queryset.model, texto))
+    filtro = Q()
+    for campo in campos:
+        filtro |= Q(**{f'{campo}__istartswith': texto})
+    return queryset.filter(filtro)
+
+
+def respuesta(request, queryset, campos, orden, resultado):
+    """JSON con una página de resultados del autocompletado
+
+    `orden` es el campo por el que se ordena (ascendente, desempate por pk) y
+    `resultado(obj)` el diccionario que se envía por cada objeto. El parámetro
+    `despues` es el cursor devuelto como `siguiente` en la página anterior.
+    """
+    queryset = filtrar_prefijo(queryset, request.GET.get('q', ''), campos)
+
+    cursor = decodificar(request.GET.get('despues', ''))
+    if cursor:
+        valor, pk = cursor
+        queryset = queryset.filter(Q(**{f'{orden}__gt': valor}) | Q(**{orden: valor, 'pk__gt': pk}))
+
+    filas = list(queryset.order_by(orden, 'pk')[:POR_PAGINA + 1])
+    siguiente = None
+    if len(filas) > POR_PAGINA:
+        filas = filas[:POR_PAGINA]
+        siguiente = codificar([getattr(filas[-1], orden), filas[-1].pk])
+    return JsonResponse({
+        'resultados': [resultado(obj) for obj in filas],
+        'siguiente': siguiente,
+    })
@@ -0,0 +1,233 @@
+# Búsqueda de texto indexada para clientes, actividades, áreas de venta y facturas
+#
+# `icontains` obliga a recorrer la tabla entera. Según la base de datos se usa:
+# - SQLite: una tabla FTS5 con tokenizador de trigramas por modelo (fts_<tabla>),
+#   mantenida con triggers (migración core 0004). Cada fila usa como rowid el ID
+#   del objeto. Busca subcadenas igual que icontains.
+# - PostgreSQL: índices GIN con pg_trgm sobre UPPER(campo), que aceleran el mismo
+#   `UPPER(campo) LIKE UPPER('%texto%')` que genera icontains.
+# Los textos de menos de 3 caracteres (o una base sin estas extensiones) usan
+# icontains sin índice, como antes.
+#
+# La relevancia es una expresión sobre las columnas de cada fila (mayor es mejor):
+# similarity() de pg_trgm en PostgreSQL y, en las demás, coincidencia exacta, al
+# inicio o en cualquier parte del texto. Al no depender de una lista previa de
+# resultados, los listados paginan por (relevancia, id) con core.paginacion y se
+# puede llegar a todas las coincidencias.
+#
+# En SQLite, las operaciones de migración que reconstruyen una tabla (AlterField,
+# por ejemplo) borran sus triggers sin avisar y el índice deja de actualizarse. Toda
+# migración que reconstruya una tabla indexada debe volver a crearlos al aplicarse
+# y al revertirse, con una copia fija del SQL de sentencias_sqlite (ver clientes
+# 0007). core.tests lo comprueba migrando de nuevo, y el chequeo core.W001 y el
+# comando reconstruir_busqueda detectan y reparan los índices incompletos.
+from django.apps import apps  # Modelos indexados
+from django.db import connection  # Conexión a la base de datos
+from django.db.models import Case, F, FloatField, Func, Q, Value, When  # Expresiones SQL
+from django.db.models.expressions import RawSQL  # Subconsultas en SQL
+from django.db.models.functions import Greatest, Upper  # Funciones SQL
+
+from clientes.models import Cliente  # Modelo de clientes
+from .models import AreaVenta  # Modelo de áreas de venta
+
+# Longitud mínima del texto para usar el índice de trigramas
+MINIMO_TRIGRAMA = 3
+
+# Campos de texto indexados por modelo (etiqueta del modelo → campos)
+CAMPOS = {
+    'clientes.cliente': ['nombre', 'numero_contrato'],
+    'actividades.actividad': ['codigo', 'actividad'],
+    'core.areaventa': ['nombre'],
+    'facturas.factura': ['numero_factura'],
+}
+
+# Triggers que mantienen cada tabla FTS5: inserción, actualización y borrado
+TRIGGERS = ('ai', 'au', 'ad')
+
+_motores = {}  # Motor de búsqueda disponible por base de datos
+
+
+class Similitud(Func):
+    """similarity() de pg_trgm (0 a 1)"""
+    function = 'SIMILARITY'
+    output_field = FloatField()
+
+
+def tabla_fts(modelo):
+    """Nombre de la tabla FTS5 que indexa un modelo en SQLite"""
+    return f'fts_{modelo._meta.db_table}'
+
+
+def tablas_indexadas():
+    """Tablas indexadas y sus campos de texto: {tabla: [campos]}"""
+    return {apps.get_model(etiqueta)._meta.db_table: campos for etiqueta, campos in CAMPOS.items()}
+
+
+def _texto_sqlite(campos, prefijo=''):
+    return " || ' | ' || ".join(f"coalesce({prefijo}{campo}, '')" for campo in campos)
+
+
+def sentencias_sqlite(tabla, campos):
+    """SQL que crea (o vuelve a crear) la tabla FTS5 de `tabla`, la llena y crea sus triggers"""
+    fts = f'fts_{tabla}'
+    nuevo = _texto_sqlite(campos, 'new.')
+    return [
+        *[f'DROP TRIGGER IF EXISTS {fts}_{sufijo}' for sufijo in TRIGGERS],
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(texto, tokenize='trigram')",
+        f'DELETE FROM {fts}',
+        f'INSERT INTO {fts} (rowid, texto) SELECT id, {_texto_sqlite(campos)} FROM {tabla}',
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabla} BEGIN '
+        f'INSERT INTO {fts} (rowid, texto) VALUES (new.id, {nuevo}); END',
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE ON {tabla} BEGIN '
+        f'DELETE FROM {fts} WHERE rowid = old.id; '
+        f'INSERT INTO {fts} (rowid, texto) VALUES (new.id, {nuevo}); END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabla} BEGIN '
+        f'DELETE FROM {fts} WHERE rowid = old.id; END',
+    ]
+
+
+def indices_faltantes(conexion=None):
+    """Tablas indexadas a las que les falta la tabla FTS5 o algún trigger (solo SQLite)
+
+    Si la base todavía no tiene los índices (migración core 0004 sin aplicar) no
+    se informa nada: los crea la migración.
+    """
+    conexion = conexion or connection
+    if conexion.vendor != 'sqlite':
+        return []
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        nombres = {fila[0] for fila in cursor.fetchall()}
+    if 'fts_clientes_cliente' not in nombres:
+        return []
+    return [
+        tabla for tabla in tablas_indexadas()
+        if tabla in nombres and not {f'fts_{tabla}', *(f'fts_{tabla}_{sufijo}' for sufijo in TRIGGERS)} <= nombres
+    ]
+
+
+def reconstruir_indices(conexion=None, tablas=None):
+    """Vuelve a crear las tablas FTS5 y sus triggers y recarga su contenido (solo SQLite)
+
+    `tablas` limita la reconstrucción a esas tablas (por defecto, todas).
+    """
+    conexion = conexion or connection
+    if conexion.vendor != 'sqlite':
+        return
+    indexadas = tablas_indexadas()
+    with conexion.cursor() as cursor:
+        for tabla in tablas or indexadas:
+            for sentencia in sentencias_sqlite(tabla, indexadas[tabla]):
+                cursor.execute(sentencia)
+    _motores.clear()
+
+
+def motor():
+    """Motor de búsqueda disponible: 'fts5', 'trigramas' o 'basico'"""
+    clave = (connection.vendor, connection.settings_dict['NAME'])
+    if clave not in _motores:
+        disponible = 'basico'
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fts_clientes_cliente'")
+                if cursor.fetchone():
+                    disponible = 'fts5'
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                if cursor.fetchone():
+                    disponible = 'trigramas'
+        _motores[clave] = disponible
+    return _motores[clave]
+
+
+def _campos(modelo):
+    return CAMPOS[modelo._meta.label_lower]
+
+
+def _filtro_contiene(modelo, texto):
+    """Q con icontains sobre los campos indexados del modelo"""
+    return _filtro_campos(modelo, 'contains', texto)
+
+
+def _filtro_campos(modelo, busqueda, texto):
+    """Q con la búsqueda (exact, startswith...) sobre algún campo indexado del modelo"""
+    filtro = Q()
+    for campo in _campos(modelo):
+        filtro |= Q(**{f'{campo}__i{busqueda}': texto})
+    return filtro
+
+
+def _relevancia_posicion(modelo, texto):
+    """2 si algún campo es el texto, 1 si empieza por él y 0 si solo lo contiene"""
+    return Case(
+        When(_filtro_campos(modelo, 'exact', texto), then=Value(2.0)),
+        When(_filtro_campos(modelo, 'startswith', texto), then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def _frase(texto):
+    """Consulta FTS5 que busca el texto literal (como subcadena, con trigramas)"""
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def _usa_indice(texto):
+    return len(texto) >= MINIMO_TRIGRAMA and motor() != 'basico'
+
+
+def coincidencias(modelo, texto):
+    """Subconsulta con los IDs de los objetos del modelo que contienen el texto
+
+    Sirve para filtrar con `campo__in=` sin traer los IDs a Python.
+    """
+    if _usa_indice(texto) and motor() == 'fts5':
+        return RawSQL(f'SELECT rowid FROM {tabla_fts(modelo)} WHERE texto MATCH %s', [_frase(texto)])
+    return modelo.objects.filter(_filtro_contiene(modelo, texto)).values('pk')
+
+
+def _buscar_facturas(queryset, texto):
+    """Facturas cuyo número, cliente o área de venta contienen el texto
+
+    Primero se buscan los clientes y áreas que coinciden (en sus índices) y luego
+    las facturas por cliente_id / area_venta_id, sin unir las tablas para buscar.
+    """
+    por_numero = Q(pk__in=coincidencias(queryset.model, texto))
+    por_cliente = Q(cliente_id__in=coincidencias(Cliente, texto))
+    por_area = Q(area_venta_id__in=coincidencias(AreaVenta, texto))
+    return queryset.filter(por_numero | por_cliente | por_area).annotate(
+        relevancia=Case(
+            When(por_numero, then=Value(2.0)),
+            When(por_cliente, then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+def buscar(queryset, texto):
+    """Filtra el queryset por el texto y anota `relevancia` (mayor es mejor)
+
+    Es la API común de búsqueda de los listados. Para mostrar los resultados del
+    más al menos relevante, paginados: `paginar(request, buscar(qs, texto), 'relevancia')`.
+    """
+    texto = texto.strip()
+    modelo = queryset.model
+    if not texto:
+        return queryset.annotate(relevancia=Value(0.0, output_field=FloatField()))
+    if modelo._meta.label_lower == 'facturas.factura':
+        return _buscar_facturas(queryset, texto)
+
+    if _usa_indice(texto) and motor() == 'trigramas':
+        # PostgreSQL con pg_trgm: el filtro usa los índices GIN y se ordena por similitud
+        similitudes = [Similitud(Upper(F(campo)), Upper(Value(texto))) for campo in _campos(modelo)]
+        similitud = Greatest(*similitudes) if len(similitudes) > 1 else similitudes[0]
+        return queryset.filter(_filtro_contiene(modelo, texto)).annotate(relevancia=similitud)
+
+    if _usa_indice(texto):
+        # SQLite: candidatos del índice FTS5
+        queryset = queryset.filter(pk__in=coincidencias(modelo, texto))
+    else:
+        # Texto corto o base sin índices de texto: icontains
+        queryset = queryset.filter(_filtro_contiene(modelo, texto))
+    return queryset.annotate(relevancia=_relevancia_posicion(modelo, texto))
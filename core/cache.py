@@ -0,0 +1,88 @@
+# Caché de datos de referencia y de agregados del dashboard
+#
+# Cada entrada pertenece a un grupo ('empresa', 'estados', 'areas', 'actividades',
+# 'dashboard'). La clave incluye la versión actual del grupo, así que invalidar un
+# grupo es cambiar su versión: las entradas anteriores dejan de leerse y caducan
+# solas. Las señales de cada aplicación invalidan solo los grupos afectados, al
+# confirmarse la transacción (invalidar_al_confirmar): si se invalidara antes, una
+# petición simultánea podría leer los datos aún sin confirmar y guardarlos con la
+# versión nueva hasta que caduquen.
+#
+# La invalidación solo llega a los procesos que comparten el backend de la caché.
+# Con la caché por defecto (memoria local) cada proceso tiene la suya: un cambio
+# hecho en un worker de gunicorn no invalida las entradas de los demás, que siguen
+# mostrando los datos anteriores hasta que caducan (CACHE_TIEMPO). Con varios
+# procesos hay que configurar una caché compartida (CACHE_URL); el chequeo
+# core.W002 de `manage.py check --deploy` lo recuerda. Nada que se escriba en la
+# base de datos (precios, totales) debe salir de esta caché.
+import time  # Versiones únicas para los grupos
+
+from django.conf import settings  # Configuración del proyecto
+from django.core.cache import cache  # Caché configurada en CACHES
+from django.db import transaction  # Invalidación al confirmar
+
+from actividades.models import Actividad  # Modelo de actividades
+from facturas.models import Estado  # Estados de factura
+from .models import AreaVenta, Empresa  # Modelos del núcleo
+
+PREFIJO = 'facil'
+
+# Grupos de datos en caché
+EMPRESA = 'empresa'
+ESTADOS = 'estados'
+AREAS = 'areas'
+ACTIVIDADES = 'actividades'
+DASHBOARD = 'dashboard'
+
+
+def _clave_version(grupo):
+    return f'{PREFIJO}:version:{grupo}'
+
+
+def version(grupo):
+    """Versión actual de un grupo (se crea al primer uso)"""
+    return cache.get_or_set(_clave_version(grupo), time.time_ns(), None)
+
+
+def clave(grupo, *partes):
+    """Clave de caché de una entrada del grupo en su versión actual"""
+    sufijo = ':'.join(str(parte) for parte in partes)
+    return f'{PREFIJO}:{grupo}:{version(grupo)}:{sufijo}'
+
+
+def obtener(grupo, partes, calcular, tiempo=None):
+    """Devuelve el valor en caché o lo calcula con `calcular()` y lo guarda"""
+    if tiempo is None:
+        tiempo = getattr(settings, 'CACHE_TIEMPO', 300)
+    return cache.get_or_set(clave(grupo, *partes), calcular, tiempo)
+
+
+def invalidar(*grupos):
+    """Descarta todas las entradas de los grupos indicados"""
+    cache.set_many({_clave_version(grupo): time.time_ns() for grupo in grupos}, None)
+
+
+def invalidar_al_confirmar(*grupos):
+    """Invalida los grupos cuando se confirma la transacción en curso (o ya, si no hay)"""
+    transaction.on_commit(lambda: invalidar(*grupos))
+
+
+def empresa():
+    """Datos de la empresa (o None si no se han configurado)"""
+    return obtener(EMPRESA, ['actual'], lambda: Empresa.objects.first())
+
+
+def estados():
+    """Lista de estados de factura"""
+    return obtener(ESTADOS, ['todos'], lambda: list(Estado.objects.all()))
+
+
+def areas_venta():
+    """Lista de áreas de venta ordenadas por nombre"""
+    return obtener(AREAS, ['todas'], lambda: list(AreaVenta.objects.order_by('nombre')))
+
+
+def actividades_activas():
+    """Lista de actividades disponibles para usar en documentos"""
+    return obtener(ACTIVIDADES, ['activas'], lambda: list(Actividad.objects.filter(activo=True)))
+
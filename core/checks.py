@@ -0,0 +1,36 @@
+# Chequeos del sistema de la aplicación core
+from django.conf import settings  # Configuración del proyecto
+from django.core.checks import Tags, Warning, register  # Registro de chequeos
+from django.db import connections  # Conexiones a las bases de datos
+
+from . import busqueda  # Índices de búsqueda de texto
+
+
+@register(Tags.database)
+def indices_busqueda(app_configs, databases=None, **kwargs):
+    """Avisa si en SQLite falta alguna tabla FTS5 o trigger de la búsqueda"""
+    avisos = []
+    for alias in databases or ():
+        faltantes = busqueda.indices_faltantes(connections[alias])
+        if faltantes:
+            avisos.append(Warning(
+                f'El índice de búsqueda de {", ".join(faltantes)} está incompleto (base "{alias}"): '
+                'las búsquedas no encontrarán los registros nuevos o modificados.',
+                hint='Ejecute python manage.py reconstruir_busqueda.',
+                id='core.W001',
+            ))
+    return avisos
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartida(app_configs, **kwargs):
+    """Avisa en producción si la caché es local de cada proceso (ver core.cache)"""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        'La caché está en la memoria de cada proceso: con varios workers, los cambios '
+        'hechos en uno no invalidan la caché de los demás hasta que caduca (CACHE_TIEMPO).',
+        hint='Configure CACHE_URL con una caché compartida (rediscache://, filecache:// o dbcache://).',
+        id='core.W002',
+    )]
@@ -0,0 +1,167 @@
+# Generador de datos de prueba con volumen realista
+#
+# Inserta áreas, clientes, actividades, planes, facturas y ofertas con sus ítems
+# usando inserciones masivas. Sirve para revisar los planes de ejecución y medir
+# las consultas con una base del tamaño de producción (comandos explicar_consultas
+# y medir_rendimiento).
+# Los ítems se insertan con el manager de FacturaItem, que recalcula los totales
+# y mantiene VentaMensual igual que en el uso normal.
+import random  # Datos aleatorios reproducibles
+from datetime import datetime, timedelta  # Fechas de las facturas
+from decimal import Decimal  # Importes exactos
+
+from django.contrib.auth.models import User  # Usuario creador de las facturas
+from django.db import transaction  # Transacciones
+
+from actividades.historial import registrar_precios  # Historial de precios
+from actividades.models import Actividad  # Modelo de actividades
+from clientes.models import Cliente  # Modelo de clientes
+from facturas.models import Estado, Factura, FacturaItem  # Modelos de facturas
+from ofertas.models import Oferta, OfertaItem  # Modelos de ofertas
+from planes.models import Plan  # Modelo de planes
+from . import cache, periodos, secuencias  # Caché, periodos y numeración de documentos
+from .models import AreaVenta  # Modelo de áreas de venta
+
+# Códigos de los estados que se reparten entre las facturas generadas
+ESTADOS = (Estado.Codigo.NO_FIRMADA, Estado.Codigo.FIRMADA, Estado.Codigo.PAGADA)
+# Filas por cada inserción masiva
+LOTE = 1000
+
+
+def _usuario():
+    """Usuario al que se asignan las facturas generadas"""
+    usuario = User.objects.filter(is_superuser=True).order_by('pk').first()
+    if usuario is None:
+        usuario, _ = User.objects.get_or_create(username='datos_prueba')
+    return usuario
+
+
+def _cliente(prefijo, numero, fecha):
+    """Cliente de prueba con todos los campos obligatorios"""
+    return Cliente(
+        nombre=f'Cliente {prefijo} {numero:05d}',
+        numero_contrato=f'{prefijo}-{numero:05d}',
+        fecha_contrato=fecha,
+        codigo_reeup=f'{numero:08d}',
+        codigo_nit=f'{numero:011d}',
+        cuenta_bancaria_cup=f'{numero:016d}',
+        direccion_postal='Dirección de prueba',
+        correo_electronico=f'cliente{numero}@ejemplo.cu',
+        telefonos='00000000',
+        nombre_director='Director',
+        ci_director='00000000000',
+        nombre_economico='Económico',
+        ci_economico='00000000000',
+        activo=numero % 10 != 0,  # Uno de cada diez inactivo
+        clienteversat=f'V{numero:05d}',
+        cuentaversat=numero,
+    )
+
+
+def sembrar(facturas=20000, clientes=500, actividades=300, areas=8, items_por_factura=3, anno=None, semilla=0,
+            ofertas=0):
+    """Inserta un conjunto de datos de prueba y devuelve las filas creadas por modelo
+
+    Las facturas se reparten entre el año indicado (por defecto el actual) y el
+    anterior. `semilla` hace reproducibles los datos y distingue los códigos de
+    distintas ejecuciones sobre la misma base. Las ofertas (sin facturar) tienen
+    también `items_por_factura` ítems.
+    """
+    azar = random.Random(semilla)
+    anno = anno or datetime.now().year
+    prefijo = f'P{semilla}'
+    usuario = _usuario()
+    inicio = periodos.rango_anno(anno - 1)[0]
+    dias = (periodos.rango_anno(anno)[1] - inicio).days
+
+    with transaction.atomic():
+        estados = list(Estado.objects.filter(codigo__in=ESTADOS))
+        lista_areas = AreaVenta.objects.bulk_create(
+            [AreaVenta(nombre=f'Área {prefijo} {numero}', centrocosto=str(numero)) for numero in range(areas)]
+        )
+        lista_clientes = Cliente.objects.bulk_create(
+            [_cliente(prefijo, numero, inicio) for numero in range(clientes)], batch_size=LOTE
+        )
+        lista_actividades = Actividad.objects.bulk_create(
+            [
+                Actividad(
+                    codigo=f'{prefijo}-{numero:05d}',
+                    actividad=f'Actividad de prueba {numero}',
+                    precio=Decimal(azar.randint(100, 100000)) / 100,
+                )
+                for numero in range(actividades)
+            ],
+            batch_size=LOTE,
+        )
+        # Precios vigentes desde el inicio del período de las facturas
+        registrar_precios(Actividad.objects.filter(codigo__startswith=f'{prefijo}-'), fecha=inicio)
+        Plan.objects.bulk_create(
+            [
+                Plan(area_venta=area, anno=anno_plan, mes=mes, plan=Decimal(azar.randint(10000, 1000000)))
+                for area in lista_areas for anno_plan in (anno - 1, anno) for mes in range(1, 13)
+            ],
+            batch_size=LOTE,
+        )
+
+        # Fechas ordenadas para que los números sigan el orden de las fechas
+        fechas = sorted(inicio + timedelta(days=azar.randrange(dias)) for _ in range(facturas))
+        numeros = {
+            anno_factura: iter(secuencias.reservar_numeros(
+                secuencias.FACTURA, sum(1 for fecha in fechas if fecha.year == anno_factura), anno=anno_factura
+            ))
+            for anno_factura in {fecha.year for fecha in fechas}
+        }
+
+        items = 0
+        for desde in range(0, facturas, LOTE):
+            lote = Factura.objects.bulk_create([
+                Factura(
+                    numero_factura=next(numeros[fecha.year]),
+                    fecha_factura=fecha,
+                    area_venta=azar.choice(lista_areas),
+                    cliente=azar.choice(lista_clientes),
+                    estado=azar.choice(estados),
+                    created_by=usuario,
+                )
+                for fecha in fechas[desde:desde + LOTE]
+            ])
+            nuevos = [
+                FacturaItem(factura=factura, actividad=actividad, cantidad=azar.randint(1, 20), precio=actividad.precio)
+                for factura in lote
+                for actividad in azar.sample(lista_actividades, min(items_por_factura, len(lista_actividades)))
+            ]
+            FacturaItem.objects.bulk_create(nuevos)  # Recalcula totales y VentaMensual del lote
+            items += len(nuevos)
+
+        numeros = iter(secuencias.reservar_numeros(secuencias.OFERTA, ofertas)) if ofertas else None  # Fecha de hoy
+        items_ofertas = 0
+        for desde in range(0, ofertas, LOTE):
+            lote = Oferta.objects.bulk_create([
+                Oferta(
+                    numero_oferta=next(numeros),
+                    area_venta=azar.choice(lista_areas),
+                    cliente=azar.choice(lista_clientes),
+                    created_by=usuario,
+                )
+                for _ in range(min(LOTE, ofertas - desde))
+            ])
+            nuevos = [
+                OfertaItem(oferta=oferta, actividad=actividad, cantidad=azar.randint(1, 20), precio=actividad.precio)
+                for oferta in lote
+                for actividad in azar.sample(lista_actividades, min(items_por_factura, len(lista_actividades)))
+            ]
+            OfertaItem.objects.bulk_create(nuevos)  # Recalcula los totales del lote
+            items_ofertas += len(nuevos)
+
+    # Las inserciones masivas no envían post_save: descartar los datos en caché
+    cache.invalidar(cache.AREAS, cache.ACTIVIDADES, cache.ESTADOS, cache.DASHBOARD)
+    return {
+        'areas': len(lista_areas),
+        'clientes': len(lista_clientes),
+        'actividades': len(lista_actividades),
+        'planes': len(lista_areas) * 24,
+        'facturas': facturas,
+        'items': items,
+        'ofertas': ofertas,
+        'items_ofertas': items_ofertas,
+    }
@@ -0,0 +1,222 @@
+# Utilidades para descargas en flujo (streaming)
+#
+# Permiten enviar archivos grandes al cliente a medida que se generan, sin
+# construir la respuesta completa en memoria: ZIP, CSV y XLSX. Los CSV y XLSX
+# se escriben fila a fila a partir de tuplas (por ejemplo de values_list), así
+# que la memoria usada no depende de la cantidad de filas.
+import csv  # Archivos CSV
+import io  # Buffer de texto para el CSV
+import re  # Caracteres no permitidos en XML
+import zipfile  # Archivos ZIP
+from datetime import date, datetime  # Fechas de las celdas
+from decimal import Decimal  # Importes
+from xml.sax.saxutils import escape  # Escapado de texto XML
+
+from django.http import StreamingHttpResponse  # Respuestas en flujo
+
+# Filas por cada trozo enviado al cliente y por cada lectura de la base de datos
+FILAS_POR_BLOQUE = 2000
+# Formatos de exportación de tablas
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class _BufferSalida:
+    """Destino de escritura sin posicionamiento que acumula bytes hasta vaciarlo"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+def zip_en_flujo(archivos, compresion=zipfile.ZIP_DEFLATED):
+    """Genera un ZIP trozo a trozo a partir de pares (nombre, contenido)
+
+    `contenido` puede ser bytes, str, una ruta de archivo (pathlib.Path) o un
+    iterable de bytes, que se comprime y envía trozo a trozo. Cada archivo se
+    envía en cuanto se agrega, así que en memoria solo hay uno a la vez (o un
+    trozo, si es iterable).
+    """
+    buffer = _BufferSalida()
+    with zipfile.ZipFile(buffer, 'w', compression=compresion) as archivo_zip:
+        for nombre, contenido in archivos:
+            if hasattr(contenido, 'open'):
+                archivo_zip.write(contenido, nombre)
+            elif isinstance(contenido, (bytes, str)):
+                archivo_zip.writestr(nombre, contenido)
+            else:
+                with archivo_zip.open(nombre, 'w', force_zip64=True) as destino:
+                    for trozo in contenido:
+                        destino.write(trozo)
+                        datos = buffer.vaciar()
+                        if datos:
+                            yield datos
+            datos = buffer.vaciar()
+            if datos:
+                yield datos
+    yield buffer.vaciar()  # Directorio central del ZIP
+
+
+def filas(queryset, campos, orden=('pk',)):
+    """Itera las tuplas de `campos` del queryset leyendo la base de datos por bloques"""
+    return queryset.order_by(*orden).values_list(*campos).iterator(chunk_size=FILAS_POR_BLOQUE)
+
+
+def csv_en_flujo(encabezados, filas):
+    """Genera un CSV (UTF-8 con BOM, para Excel) en trozos de FILAS_POR_BLOQUE filas"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    buffer.write('\ufeff')
+    escritor.writerow(encabezados)
+    for numero, fila in enumerate(filas, start=1):
+        escritor.writerow(['' if valor is None else valor for valor in fila])
+        if numero % FILAS_POR_BLOQUE == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+# Partes fijas del libro XLSX (una hoja, estilos 1 = fecha y 2 = encabezado en negrita)
+_XLSX_TIPOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_XLSX_RELACIONES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_XLSX_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{hoja}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_XLSX_RELACIONES_LIBRO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+_XLSX_ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '</styleSheet>'
+)
+# Caracteres de control que XML no admite
+_NO_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+# Día 0 de las fechas de Excel
+_EPOCA_EXCEL = date(1899, 12, 30)
+
+
+def _celda(valor, estilo=0):
+    """XML de una celda según el tipo del valor"""
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, bool):
+        return f'<c t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if isinstance(valor, date):
+        return f'<c s="1"><v>{(valor - _EPOCA_EXCEL).days}</v></c>'
+    texto = escape(_NO_XML.sub('', str(valor)))
+    atributo = f' s="{estilo}"' if estilo else ''
+    return f'<c t="inlineStr"{atributo}><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def _hoja_xlsx(encabezados, filas):
+    """XML de la hoja en trozos de FILAS_POR_BLOQUE filas"""
+    partes = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+        'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>',
+        '<row>' + ''.join(_celda(encabezado, estilo=2) for encabezado in encabezados) + '</row>',
+    ]
+    for numero, fila in enumerate(filas, start=1):
+        partes.append('<row>' + ''.join(_celda(valor) for valor in fila) + '</row>')
+        if numero % FILAS_POR_BLOQUE == 0:
+            yield ''.join(partes).encode('utf-8')
+            partes = []
+    partes.append('</sheetData></worksheet>')
+    yield ''.join(partes).encode('utf-8')
+
+
+def xlsx_en_flujo(encabezados, filas, hoja='Datos'):
+    """Genera un libro XLSX de una hoja, escrito fila a fila dentro de un ZIP en flujo"""
+    hoja = escape(re.sub(r'[\[\]:*?/\\]', '', hoja)[:31] or 'Datos', {'"': '&quot;'})
+    return zip_en_flujo([
+        ('[Content_Types].xml', _XLSX_TIPOS),
+        ('_rels/.rels', _XLSX_RELACIONES),
+        ('xl/workbook.xml', _XLSX_LIBRO.format(hoja=hoja)),
+        ('xl/_rels/workbook.xml.rels', _XLSX_RELACIONES_LIBRO),
+        ('xl/styles.xml', _XLSX_ESTILOS),
+        ('xl/worksheets/sheet1.xml', _hoja_xlsx(encabezados, filas)),
+    ])
+
+
+def formato_tabla(datos):
+    """Formato pedido en el parámetro `formato` (csv por defecto)"""
+    formato = datos.get('formato', 'csv')
+    return formato if formato in FORMATOS else 'csv'
+
+
+def respuesta_tabla(nombre, columnas, queryset, formato='csv', orden=('pk',), hoja='Datos'):
+    """Respuesta en flujo con las filas del queryset en CSV o XLSX
+
+    `columnas` son pares (encabezado, campo) y `nombre` es el nombre del archivo
+    sin extensión. Las filas se leen con values_list por bloques, sin crear modelos.
+    """
+    encabezados = [encabezado for encabezado, _ in columnas]
+    datos = filas(queryset, [campo for _, campo in columnas], orden)
+    if formato == 'xlsx':
+        contenido = xlsx_en_flujo(encabezados, datos, hoja)
+    else:
+        formato = 'csv'
+        contenido = csv_en_flujo(encabezados, datos)
+    response = StreamingHttpResponse(contenido, content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
@@ -0,0 +1,20 @@
+# Formularios comunes a varias aplicaciones
+from django import forms  # Funcionalidades de formularios
+
+from .importacion import CODIFICACIONES  # Codificaciones aceptadas en la importación
+
+
+# Formulario de subida de un CSV para importar (core.importacion)
+class ImportarCSVForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo CSV',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,text/csv'}),
+    )
+    codificacion = forms.ChoiceField(
+        label='Codificación', choices=CODIFICACIONES,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    solo_validar = forms.BooleanField(
+        label='Solo validar (no guardar)', required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
@@ -0,0 +1,281 @@
+# Importación masiva de tablas desde CSV
+#
+# El archivo se lee fila a fila (sin cargarlo entero en memoria) y se procesa en
+# lotes de FILAS_POR_LOTE. Cada fila se valida con los campos del modelo, sin
+# consultas, y las válidas de cada lote se guardan con un solo
+# bulk_create(update_conflicts=True): crea las nuevas y actualiza las existentes
+# por su clave única. Las filas con errores no se guardan; se escriben en un informe
+# CSV con la fila original y sus errores, listo para corregir y volver a importar.
+import csv  # Lectura y escritura de CSV
+import io  # Lectura de texto sobre el archivo subido
+import uuid  # Nombres de los informes de errores
+from datetime import datetime  # Fechas en formatos locales
+from itertools import chain  # Volver a unir la primera línea leída
+from pathlib import Path  # Rutas de los informes
+
+from django.conf import settings  # Configuración del proyecto
+from django.contrib import messages  # Sistema de mensajes
+from django.core.exceptions import ValidationError  # Errores de validación de campos
+from django.db import models, transaction  # Tipos de campo y transacción de la importación
+from django.shortcuts import render  # Página de importación
+
+from . import cache  # Invalidación de datos en caché
+
+# Filas validadas y guardadas en cada lote (una consulta de claves y un bulk_create)
+FILAS_POR_LOTE = 1000
+# Errores que se conservan para mostrar (el informe los tiene todos)
+ERRORES_VISIBLES = 50
+# Codificaciones aceptadas: (valor, descripción)
+CODIFICACIONES = (
+    ('utf-8-sig', 'UTF-8'),
+    ('cp1252', 'Windows (Excel en español)'),
+)
+
+# Valores aceptados en las columnas de sí/no
+VERDADEROS = {'1', 'true', 'verdadero', 'si', 'sí', 's', 'x', 'yes'}
+FALSOS = {'0', 'false', 'falso', 'no', 'n'}
+# Formatos de fecha aceptados además del ISO (AAAA-MM-DD)
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y')
+
+
+class ErrorImportacion(Exception):
+    """El archivo no se puede importar (codificación, encabezados o columnas obligatorias)"""
+
+
+class Resultado:
+    """Resumen de una importación"""
+
+    def __init__(self, encabezados):
+        self.encabezados = encabezados  # Encabezados del archivo
+        self.filas = 0  # Filas leídas (sin el encabezado)
+        self.creados = 0  # Objetos nuevos
+        self.actualizados = 0  # Objetos existentes actualizados
+        self.con_errores = 0  # Filas no importadas
+        self.errores = []  # Primeros errores: (línea, mensajes)
+        self.ignoradas = []  # Columnas del archivo que no se importan
+
+    @property
+    def importados(self):
+        return self.creados + self.actualizados
+
+
+class Importacion:
+    """Importación de un modelo desde CSV
+
+    `columnas` son pares (encabezado, campo) como los de las exportaciones, así que
+    un archivo exportado se puede volver a importar. En el archivo cada columna se
+    reconoce por su encabezado o por el nombre del campo. `clave` es el campo único
+    que decide si una fila crea un objeto o actualiza uno existente; si se repite
+    en el archivo, queda la última fila. bulk_create no envía señales: `invalidar`
+    son los grupos de caché que dependen del modelo y `al_guardar`, si se indica, se
+    llama tras guardar cada lote con el queryset de sus objetos.
+    """
+
+    def __init__(self, modelo, clave, columnas, invalidar=(), al_guardar=None):
+        self.modelo = modelo
+        self.clave = clave
+        self.columnas = columnas
+        self.invalidar = invalidar
+        self.al_guardar = al_guardar
+        self.campos = {campo: modelo._meta.get_field(campo) for _, campo in columnas}
+
+    def _columnas_del_archivo(self, encabezados):
+        """Campo de cada columna del archivo (None si no se importa)"""
+        nombres = {}
+        for encabezado, campo in self.columnas:
+            nombres[encabezado.strip().lower()] = campo
+            nombres[campo.lower()] = campo
+        campos = [nombres.get(encabezado.strip().lower()) for encabezado in encabezados]
+
+        repetidos = {campo for campo in campos if campo and campos.count(campo) > 1}
+        if repetidos:
+            raise ErrorImportacion(f'Columnas repetidas: {", ".join(sorted(repetidos))}')
+        if self.clave not in campos:
+            raise ErrorImportacion(f'Falta la columna {self.encabezado(self.clave)}')
+        faltan = [
+            self.encabezado(campo) for campo, field in self.campos.items()
+            if campo not in campos and not field.blank and not field.has_default()
+        ]
+        if faltan:
+            raise ErrorImportacion(f'Faltan columnas obligatorias: {", ".join(faltan)}')
+        return campos
+
+    def encabezado(self, campo):
+        """Encabezado de la columna de un campo"""
+        return next(encabezado for encabezado, nombre in self.columnas if nombre == campo)
+
+    def _valor(self, field, texto):
+        """Valor validado del campo a partir del texto de la celda"""
+        texto = texto.strip()
+        if not texto:
+            if field.null:
+                return None
+            if field.has_default():
+                return field.get_default()
+            if not field.blank:
+                raise ValidationError(field.error_messages['blank'])
+        elif isinstance(field, models.BooleanField):
+            if texto.lower() in VERDADEROS:
+                return True
+            if texto.lower() in FALSOS:
+                return False
+            raise ValidationError('Debe ser sí o no.')
+        elif isinstance(field, models.DateField):
+            for formato in FORMATOS_FECHA:
+                try:
+                    texto = datetime.strptime(texto, formato).date()
+                    break
+                except ValueError:
+                    pass
+        elif isinstance(field, models.DecimalField) and ',' in texto and '.' not in texto:
+            texto = texto.replace(',', '.')  # Coma decimal
+        return field.clean(texto, None)
+
+    def _fila(self, campos, celdas):
+        """Valores de los campos de la fila y errores encontrados"""
+        if len(celdas) > len(campos):
+            return None, [f'La fila tiene {len(celdas)} columnas y el encabezado {len(campos)}']
+        valores, errores = {}, []
+        for campo, texto in zip(campos, chain(celdas, [''] * (len(campos) - len(celdas)))):
+            if campo is None:
+                continue
+            try:
+                valores[campo] = self._valor(self.campos[campo], texto)
+            except ValidationError as error:
+                errores.append(f'{self.encabezado(campo)}: {" ".join(error.messages)}')
+        if not errores and valores[self.clave] in (None, ''):
+            errores.append(f'{self.encabezado(self.clave)}: no puede estar vacío.')
+        return valores, errores
+
+    def _guardar(self, lote, campos, solo_validar, resultado):
+        """Crea o actualiza los objetos del lote con un solo bulk_create"""
+        por_clave = {valores[self.clave]: valores for valores in lote}  # Queda la última fila
+        existentes = set(
+            self.modelo.objects.filter(**{f'{self.clave}__in': list(por_clave)})
+            .values_list(self.clave, flat=True)
+        )
+        resultado.actualizados += len(existentes)
+        resultado.creados += len(por_clave) - len(existentes)
+        if solo_validar:
+            return
+        actualizar = [campo for campo in campos if campo and campo != self.clave]
+        objetos = [self.modelo(**valores) for valores in por_clave.values()]
+        if actualizar:
+            self.modelo.objects.bulk_create(
+                objetos, update_conflicts=True, unique_fields=[self.clave], update_fields=actualizar,
+            )
+        else:
+            self.modelo.objects.bulk_create(objetos, ignore_conflicts=True)
+        if self.al_guardar:
+            self.al_guardar(self.modelo.objects.filter(**{f'{self.clave}__in': list(por_clave)}))
+
+    def importar(self, archivo, informe=None, codificacion='utf-8-sig', solo_validar=False):
+        """Importa el CSV de `archivo` (binario) y devuelve el Resultado
+
+        Las filas con errores se escriben en `informe` (archivo de texto), si se
+        indica. Todo ocurre en una transacción: si el archivo no se puede leer no se
+        guarda nada. Con `solo_validar` se valida y cuenta sin guardar.
+        """
+        texto = io.TextIOWrapper(archivo, encoding=codificacion, newline='')
+        try:
+            with transaction.atomic():
+                return self._importar(texto, informe, solo_validar)
+        except UnicodeDecodeError:
+            raise ErrorImportacion('El archivo no está en la codificación indicada')
+        except csv.Error as error:
+            raise ErrorImportacion(f'El archivo no es un CSV válido: {error}')
+        finally:
+            texto.detach()  # El archivo lo cierra quien lo abrió
+
+    def _importar(self, texto, informe, solo_validar):
+        primera = texto.readline()
+        if not primera.strip():
+            raise ErrorImportacion('El archivo está vacío')
+        try:
+            dialecto = csv.Sniffer().sniff(primera, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(chain([primera], texto), dialecto)
+        encabezados = next(lector)
+        campos = self._columnas_del_archivo(encabezados)
+
+        resultado = Resultado(encabezados)
+        resultado.ignoradas = [encabezado for encabezado, campo in zip(encabezados, campos) if campo is None]
+        escritor = csv.writer(informe, dialecto) if informe is not None else None
+        if escritor:
+            escritor.writerow(encabezados + ['Errores'])
+
+        lote = []
+        for celdas in lector:
+            if not any(celda.strip() for celda in celdas):
+                continue  # Filas vacías
+            resultado.filas += 1
+            valores, errores = self._fila(campos, celdas)
+            if errores:
+                resultado.con_errores += 1
+                if len(resultado.errores) < ERRORES_VISIBLES:
+                    resultado.errores.append((lector.line_num, errores))
+                if escritor:
+                    escritor.writerow(celdas + ['; '.join(errores)])
+                continue
+            lote.append(valores)
+            if len(lote) == FILAS_POR_LOTE:
+                self._guardar(lote, campos, solo_validar, resultado)
+                lote = []
+        if lote:
+            self._guardar(lote, campos, solo_validar, resultado)
+        if not solo_validar and self.invalidar:
+            cache.invalidar_al_confirmar(*self.invalidar)
+        return resultado
+
+
+def ruta_informe(usuario, token):
+    """Archivo del informe de errores de una importación del usuario"""
+    return Path(settings.MEDIA_ROOT) / 'importaciones' / str(usuario.pk) / f'{token.hex}.csv'
+
+
+def respuesta_importar(request, importacion, titulo, url_lista):
+    """Página de subida de un CSV para `importacion` y resultado de importarlo
+
+    El informe de errores se guarda en MEDIA_ROOT/importaciones/<usuario>/ (solo el
+    de la última importación del usuario) y se descarga con core.views.informe_importacion.
+    """
+    from .forms import ImportarCSVForm  # Formulario de subida
+
+    resultado = token = None
+    form = ImportarCSVForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        token = uuid.uuid4()
+        ruta = ruta_informe(request.user, token)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        for anterior in ruta.parent.glob('*.csv'):
+            anterior.unlink(missing_ok=True)
+        try:
+            with open(ruta, 'w', encoding='utf-8-sig', newline='') as informe:
+                resultado = importacion.importar(
+                    form.cleaned_data['archivo'], informe,
+                    form.cleaned_data['codificacion'], form.cleaned_data['solo_validar'],
+                )
+        except ErrorImportacion as error:
+            ruta.unlink(missing_ok=True)
+            form.add_error('archivo', str(error))
+        else:
+            if not resultado.con_errores:
+                ruta.unlink(missing_ok=True)
+                token = None
+            if form.cleaned_data['solo_validar']:
+                messages.info(request, f'Validación terminada: {resultado.importados} filas se pueden importar.')
+            else:
+                messages.success(
+                    request, f'{resultado.creados} creados y {resultado.actualizados} actualizados.'
+                )
+
+    return render(request, 'importar.html', {
+        'form': form,  # Formulario de subida
+        'titulo': titulo,  # Qué se importa
+        'columnas': importacion.columnas,  # Columnas aceptadas
+        'clave': importacion.encabezado(importacion.clave),  # Columna que identifica cada fila
+        'url_lista': url_lista,  # Volver a la lista
+        'resultado': resultado,  # Resumen de la importación (si se hizo)
+        'token': token,  # Informe de errores para descargar
+    })
@@ -0,0 +1,120 @@
+import re
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from core import cache, datos_prueba
+
+VISTAS = [
+    ('facturas:dashboard', {}),
+    ('facturas:lista_facturas', {}),
+    ('facturas:lista_facturas', {'estado': 'firmada'}),
+    ('facturas:lista_facturas', {'fecha_inicial': '{anno}-03-01', 'fecha_final': '{anno}-03-31'}),
+    ('facturas:lista_facturas', {'q': 'cliente'}),
+    ('facturas:tabla_areas_por_mes', {'mes': '3'}),
+]
+
+TABLAS_GRANDES = (
+    'facturas_factura',
+    'facturas_facturaitem',
+    'clientes_cliente',
+    'actividades_actividad',
+    'ofertas_oferta',
+    'ofertas_ofertaitem',
+)
+
+RECORRIDOS = {
+    'sqlite': re.compile(r'^SCAN (?:TABLE )?(\w+)$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Muestra el plan de ejecución (EXPLAIN) de las consultas del dashboard, el listado de '
+        'facturas y la tabla por áreas, opcionalmente sobre un conjunto de datos de prueba'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sembrar',
+            type=int,
+            default=0,
+            metavar='FACTURAS',
+            help='Genera antes esa cantidad de facturas de prueba (se descartan al terminar)',
+        )
+        parser.add_argument(
+            '--estricto',
+            action='store_true',
+            help='Termina con error si alguna consulta recorre completa una tabla grande',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['sembrar']:
+                filas = datos_prueba.sembrar(facturas=options['sembrar'])
+                self.stdout.write('Datos de prueba: ' + ', '.join(f'{n} {modelo}' for modelo, n in filas.items()))
+            self._analizar()
+            recorridos = []
+            for nombre, parametros in VISTAS:
+                recorridos += self._explicar_vista(nombre, parametros)
+            transaction.set_rollback(True)
+
+        if recorridos:
+            self.stdout.write(self.style.WARNING(
+                'Recorridos completos de tablas grandes: ' + ', '.join(sorted(set(recorridos)))
+            ))
+            if options['estricto']:
+                raise CommandError(f'{len(recorridos)} consultas recorren tablas grandes sin índice')
+        else:
+            self.stdout.write(self.style.SUCCESS('Ninguna consulta recorre completa una tabla grande'))
+
+    def _analizar(self):
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _peticion(self, nombre, parametros):
+        anno = datetime.now().year
+        parametros = {clave: valor.format(anno=anno) for clave, valor in parametros.items()}
+        peticion = RequestFactory().get(reverse(nombre), parametros)
+        peticion.user = User(username='explicar_consultas', is_active=True, is_superuser=True)
+        peticion.session = {}
+        return peticion
+
+    def _explicar_vista(self, nombre, parametros):
+        peticion = self._peticion(nombre, parametros)
+        vista = resolve(peticion.path).func
+        cache.invalidar(cache.EMPRESA, cache.ESTADOS, cache.AREAS, cache.ACTIVIDADES, cache.DASHBOARD)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = vista(peticion)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'== {nombre} {peticion.get_full_path()} ({respuesta.status_code}, {len(consultas)} consultas) =='
+        ))
+
+        recorridos = []
+        for numero, consulta in enumerate(consultas.captured_queries, start=1):
+            sql = consulta['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            self.stdout.write(f'[{numero}] {sql[:300]}')
+            for linea in self._plan(sql):
+                self.stdout.write(f'    {linea}')
+                encontrado = RECORRIDOS.get(connection.vendor)
+                encontrado = encontrado and encontrado.search(linea.strip())
+                if encontrado and encontrado.group(1) in TABLAS_GRANDES:
+                    recorridos.append(f'{nombre}[{numero}] {encontrado.group(1)}')
+        return recorridos
+
+    def _plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                return [fila[-1] for fila in cursor.fetchall()]
+            cursor.execute('EXPLAIN ' + sql)
+            return [' '.join(str(valor) for valor in fila) for fila in cursor.fetchall()]
@@ -0,0 +1,64 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from actividades.importacion import IMPORTACION_ACTIVIDADES
+from clientes.importacion import IMPORTACION_CLIENTES
+from core.importacion import CODIFICACIONES, ErrorImportacion
+
+IMPORTACIONES = {
+    'clientes': IMPORTACION_CLIENTES,
+    'actividades': IMPORTACION_ACTIVIDADES,
+}
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes o actividades desde un CSV: crea los nuevos y actualiza los existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tabla', choices=sorted(IMPORTACIONES), help='Qué se importa')
+        parser.add_argument('archivo', type=Path, help='Archivo CSV')
+        parser.add_argument(
+            '--errores',
+            type=Path,
+            help='Archivo donde escribir las filas con errores (por defecto <archivo>.errores.csv)',
+        )
+        parser.add_argument(
+            '--codificacion',
+            choices=[valor for valor, _ in CODIFICACIONES],
+            default=CODIFICACIONES[0][0],
+            help='Codificación del archivo',
+        )
+        parser.add_argument('--validar', action='store_true', help='Solo valida el archivo, sin guardar nada')
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        if not archivo.is_file():
+            raise CommandError(f'No existe el archivo {archivo}')
+        ruta_errores = options['errores'] or archivo.with_name(f'{archivo.stem}.errores.csv')
+
+        inicio = time.perf_counter()
+        try:
+            with open(archivo, 'rb') as entrada, open(ruta_errores, 'w', encoding='utf-8-sig', newline='') as informe:
+                resultado = IMPORTACIONES[options['tabla']].importar(
+                    entrada, informe, options['codificacion'], options['validar'],
+                )
+        except ErrorImportacion as error:
+            ruta_errores.unlink(missing_ok=True)
+            raise CommandError(str(error))
+        segundos = time.perf_counter() - inicio
+
+        if resultado.ignoradas:
+            self.stdout.write(f'Columnas ignoradas: {", ".join(resultado.ignoradas)}')
+        for linea, errores in resultado.errores[:10]:
+            self.stdout.write(f'Línea {linea}: {"; ".join(errores)}')
+        accion = 'Validadas' if options['validar'] else 'Importadas'
+        self.stdout.write(
+            f'{accion} {resultado.filas} filas en {segundos:.1f} s: {resultado.creados} nuevos, '
+            f'{resultado.actualizados} actualizados, {resultado.con_errores} con errores'
+        )
+        if resultado.con_errores:
+            raise CommandError(f'{resultado.con_errores} filas no se importaron; ver {ruta_errores}')
+        ruta_errores.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS('Importación terminada sin errores'))
@@ -0,0 +1,220 @@
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import busqueda, cache, datos_prueba, pdf
+from facturas.models import Factura
+from ofertas.models import Oferta
+
+TAMANOS = {
+    'pequeno': {'facturas': 2000, 'clientes': 500, 'actividades': 200, 'areas': 8, 'ofertas': 200},
+    'mediano': {'facturas': 50000, 'clientes': 5000, 'actividades': 1000, 'areas': 30, 'ofertas': 5000},
+    'grande': {
+        'facturas': 250000, 'clientes': 10000, 'actividades': 2000, 'areas': 100,
+        'items_por_factura': 4, 'ofertas': 20000,
+    },
+}
+
+PRUEBAS = [
+    ('dashboard', 'facturas:dashboard', None, {}, 12, 1500),
+    ('tabla_areas_por_mes', 'facturas:tabla_areas_por_mes', None, {'mes': '3'}, 6, 500),
+    ('lista_facturas', 'facturas:lista_facturas', None, {}, 6, 500),
+    ('lista_facturas_filtrada', 'facturas:lista_facturas', None, {'estado': 'firmada', 'q': 'cliente'}, 8, 500),
+    ('factura_pdf', 'facturas:factura_pdf', 'factura', {}, 7, 5000),
+    ('oferta_pdf', 'ofertas:oferta_pdf', 'oferta', {}, 10, 5000),
+    ('exportar_factura_obl', 'facturas:exportar_factura_obl', 'factura', {}, 5, 200),
+    ('facturar_oferta', 'ofertas:facturar_oferta', 'oferta', {}, 30, 500),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide consultas y tiempos de las vistas principales sobre un conjunto de datos de prueba, '
+        'comprueba sus presupuestos y guarda los resultados en JSON para compararlos entre commits'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamano',
+            choices=sorted(TAMANOS),
+            help='Genera antes un conjunto de datos de prueba de ese tamaño (se descarta al terminar)',
+        )
+        for opcion in ('facturas', 'clientes', 'actividades', 'areas', 'items-por-factura', 'ofertas'):
+            parser.add_argument(f'--{opcion}', type=int, help='Cambia ese valor del tamaño elegido')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Veces que se ejecuta cada vista')
+        parser.add_argument('--salida', metavar='ARCHIVO', help='Guarda los resultados en un archivo JSON')
+        parser.add_argument(
+            '--comparar',
+            metavar='ARCHIVO',
+            help='Compara con los resultados JSON de una ejecución anterior',
+        )
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=25,
+            help='Porcentaje de aumento del tiempo que se admite al comparar (por defecto 25)',
+        )
+        parser.add_argument(
+            '--sin-tiempos',
+            action='store_true',
+            help='No comprueba los presupuestos de tiempo (solo los de consultas)',
+        )
+
+    def handle(self, *args, **options):
+        tamano = dict(TAMANOS.get(options['tamano'], {}))
+        for campo in ('facturas', 'clientes', 'actividades', 'areas', 'items_por_factura', 'ofertas'):
+            if options[campo] is not None:
+                tamano[campo] = options[campo]
+        repeticiones = max(options['repeticiones'], 1)
+
+        datos, resultados = self._ejecutar(tamano, repeticiones, options['sin_tiempos'])
+
+        informe = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': self._commit(),
+            'base_datos': connection.vendor,
+            'tamano': tamano,
+            'datos': datos,
+            'repeticiones': repeticiones,
+            'resultados': resultados,
+        }
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Resultados guardados en {options["salida"]}')
+
+        fallos = [f'{r["nombre"]}: {motivo}' for r in resultados for motivo in r['fallos']]
+        if options['comparar']:
+            fallos += self._comparar(informe, options['comparar'], options['tolerancia'])
+        if fallos:
+            for fallo in fallos:
+                self.stdout.write(self.style.ERROR(fallo))
+            raise CommandError(f'{len(fallos)} presupuestos o comparaciones no se cumplen')
+        self.stdout.write(self.style.SUCCESS('Todas las vistas cumplen sus presupuestos'))
+
+    def _ejecutar(self, tamano, repeticiones, sin_tiempos):
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, METRICAS_ACTIVAS=False, ALLOWED_HOSTS=['testserver'],
+        ), transaction.atomic():
+            datos = {}
+            if tamano:
+                self.stdout.write('Generando datos de prueba...')
+                datos = datos_prueba.sembrar(**tamano)
+                self.stdout.write('Datos de prueba: ' + ', '.join(f'{n} {modelo}' for modelo, n in datos.items()))
+            if connection.vendor in ('sqlite', 'postgresql'):
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            busqueda.motor()  # Se detecta una vez por proceso: no contarlo en ninguna repetición
+            cliente = Client()
+            cliente.force_login(User.objects.create(username='medir_rendimiento', is_superuser=True, is_staff=True))
+            objetos = {
+                'factura': Factura.objects.order_by('-num_items', '-pk').first(),
+                'oferta': Oferta.objects.filter(factura__isnull=True, num_items__gt=0).order_by('-num_items', '-pk').first(),
+            }
+            resultados = [self._medir(cliente, prueba, objetos, repeticiones, sin_tiempos) for prueba in PRUEBAS]
+            transaction.set_rollback(True)
+        return datos, resultados
+
+    def _medir(self, cliente, prueba, objetos, repeticiones, sin_tiempos):
+        nombre, url, objetivo, parametros, max_consultas, max_ms = prueba
+        resultado = {'nombre': nombre, 'max_consultas': max_consultas, 'max_ms': max_ms, 'fallos': []}
+        objeto = objetos.get(objetivo)
+        if objetivo and objeto is None:
+            resultado['fallos'].append(f'no hay ninguna {objetivo} con ítems para medir')
+            self.stdout.write(self.style.WARNING(f'{nombre}: omitida, no hay ninguna {objetivo} con ítems'))
+            return resultado
+
+        ruta = reverse(url, args=[objeto.pk] if objeto else [])
+        tiempos = []
+        consultas = []
+        estados = []
+        for _ in range(repeticiones):
+            cache.invalidar(cache.EMPRESA, cache.ESTADOS, cache.AREAS, cache.ACTIVIDADES, cache.DASHBOARD)
+            if objeto is not None:
+                pdf.invalidar(objetivo, objeto.pk)
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as capturadas:
+                    inicio = time.perf_counter()
+                    respuesta = cliente.get(ruta, parametros)
+                    if respuesta.streaming:
+                        b''.join(respuesta.streaming_content)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                transaction.set_rollback(True)
+            consultas.append(len(capturadas))
+            estados.append(respuesta.status_code)
+
+        resultado.update({
+            'ruta': ruta,
+            'parametros': parametros,
+            'estado': respuesta.status_code,
+            'consultas': consultas[0],
+            'ms_mediana': round(statistics.median(tiempos), 1),
+            'ms_min': round(min(tiempos), 1),
+            'ms_max': round(max(tiempos), 1),
+        })
+        if respuesta.status_code >= 400:
+            resultado['fallos'].append(f'respondió {respuesta.status_code}')
+        if len(set(estados)) > 1 or len(set(consultas)) > 1:
+            resultado['fallos'].append(
+                f'las repeticiones no siguen el mismo camino (estados {estados}, consultas {consultas})'
+            )
+        if resultado['consultas'] > max_consultas:
+            resultado['fallos'].append(f'{resultado["consultas"]} consultas (máximo {max_consultas})')
+        if not sin_tiempos and resultado['ms_mediana'] > max_ms:
+            resultado['fallos'].append(f'{resultado["ms_mediana"]} ms (máximo {max_ms} ms)')
+
+        estilo = self.style.ERROR if resultado['fallos'] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'{nombre:<25} {resultado["estado"]}  {resultado["consultas"]:>3} consultas  '
+            f'{resultado["ms_mediana"]:>8} ms (mín {resultado["ms_min"]}, máx {resultado["ms_max"]})'
+        ))
+        return resultado
+
+    def _comparar(self, informe, archivo, tolerancia):
+        try:
+            with open(archivo, encoding='utf-8') as entrada:
+                previo = json.load(entrada)
+            anteriores = {r['nombre']: r for r in previo['resultados']}
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f'No se pudo leer {archivo}: {e}')
+
+        fallos = []
+        self.stdout.write(self.style.MIGRATE_HEADING(f'== Comparación con {archivo} ({previo.get("commit")}) =='))
+        if previo.get('datos') != informe['datos']:
+            self.stdout.write(self.style.WARNING('Los datos de prueba no son los mismos: los tiempos no son comparables'))
+        for resultado in informe['resultados']:
+            anterior = anteriores.get(resultado['nombre'])
+            if not anterior or 'consultas' not in anterior or 'consultas' not in resultado:
+                continue
+            cambio = (resultado['ms_mediana'] - anterior['ms_mediana']) / max(anterior['ms_mediana'], 0.1) * 100
+            self.stdout.write(
+                f'{resultado["nombre"]:<25} consultas {anterior["consultas"]} -> {resultado["consultas"]}  '
+                f'ms {anterior["ms_mediana"]} -> {resultado["ms_mediana"]} ({cambio:+.0f}%)'
+            )
+            if resultado['consultas'] > anterior['consultas']:
+                fallos.append(
+                    f'{resultado["nombre"]}: {resultado["consultas"]} consultas (antes {anterior["consultas"]})'
+                )
+            if cambio > tolerancia:
+                fallos.append(f'{resultado["nombre"]}: {cambio:+.0f}% de tiempo (tolerancia {tolerancia:g}%)')
+        return fallos
+
+    def _commit(self):
+        try:
+            salida = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        return salida.stdout.strip() or None
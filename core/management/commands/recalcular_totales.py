@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.totales import documentos_con_diferencias, recalcular_totales
+from facturas.models import Factura
+from ofertas.models import Oferta
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los totales guardados de facturas y ofertas y detecta diferencias'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--comprobar',
+            action='store_true',
+            help='Solo informa de los documentos con diferencias, sin corregirlos',
+        )
+
+    def handle(self, *args, **options):
+        diferencias = 0
+        for modelo in (Factura, Oferta):
+            nombre = str(modelo._meta.verbose_name_plural).capitalize()
+            erroneos = documentos_con_diferencias(modelo)
+            cantidad = erroneos.count()
+            diferencias += cantidad
+
+            if options['comprobar']:
+                for documento in erroneos[:20]:
+                    self.stdout.write(
+                        f'{documento}: guardado {documento.total} ({documento.num_items} ítems), '
+                        f'real {documento.total_real} ({documento.num_items_real} ítems)'
+                    )
+                self.stdout.write(f'{nombre}: {cantidad} con diferencias')
+            else:
+                actualizados = recalcular_totales(modelo)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{nombre}: {actualizados} recalculadas ({cantidad} tenían diferencias)'
+                ))
+
+        if options['comprobar'] and diferencias:
+            raise CommandError(f'Se encontraron {diferencias} documentos con totales desactualizados')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.busqueda import indices_faltantes, reconstruir_indices, tablas_indexadas
+
+
+class Command(BaseCommand):
+    help = 'Vuelve a crear los índices de búsqueda de texto de SQLite (tablas FTS5 y triggers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help='Base de datos (por defecto "default")',
+        )
+        parser.add_argument(
+            '--comprobar',
+            action='store_true',
+            help='Solo informa de las tablas con el índice incompleto, sin repararlas',
+        )
+
+    def handle(self, *args, **options):
+        conexion = connections[options['database']]
+        if conexion.vendor != 'sqlite':
+            self.stdout.write('Solo SQLite usa triggers para la búsqueda: no hay nada que reconstruir.')
+            return
+
+        faltantes = indices_faltantes(conexion)
+        if options['comprobar']:
+            if faltantes:
+                self.stdout.write(f'Índices incompletos: {", ".join(faltantes)}')
+            else:
+                self.stdout.write('Los índices de búsqueda están completos.')
+            return
+
+        with transaction.atomic(using=conexion.alias):
+            reconstruir_indices(conexion)
+        self.stdout.write(self.style.SUCCESS(
+            f'Índices reconstruidos: {", ".join(tablas_indexadas())}'
+            + (f' (incompletos: {", ".join(faltantes)})' if faltantes else '')
+        ))
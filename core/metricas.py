@@ -0,0 +1,151 @@
+# Métricas por petición: consultas SQL, tiempo de base de datos, de plantillas y total
+#
+# MetricasMiddleware mide cada petición sin depender de DEBUG:
+# - cuenta las consultas y su duración con un execute_wrapper en cada conexión;
+# - suma el tiempo de render de las plantillas (motor PlantillasDjango);
+# - añade la cabecera Server-Timing (visible en las herramientas del navegador);
+# - escribe una línea JSON en el logger 'facil.metricas' por petición;
+# - si la vista supera el umbral de consultas, registra el SQL ejecutado (sin
+#   parámetros, para no volcar datos de clientes en los logs).
+# Las consultas hechas mientras se envía una respuesta en flujo (exportaciones)
+# ocurren después de que termina el middleware y no se cuentan.
+import json  # Logs estructurados
+import logging  # Registro de métricas
+import time  # Medición de tiempos
+from contextlib import ExitStack  # Varios execute_wrapper a la vez
+from contextvars import ContextVar  # Medición de la petición en curso
+
+from django.conf import settings  # Configuración del proyecto
+from django.db import connections  # Conexiones a las bases de datos
+from django.template.backends.django import DjangoTemplates  # Motor de plantillas de Django
+
+logger = logging.getLogger('facil.metricas')
+
+# Medición de la petición en curso (None fuera de una petición)
+_actual = ContextVar('metricas', default=None)
+
+
+class Medicion:
+    """Contadores de una petición"""
+
+    def __init__(self, sql_maximo):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.tiempo_plantillas = 0.0
+        self.sql = []  # Primeras sentencias ejecutadas con su duración
+        self.sql_maximo = sql_maximo
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: mide cada consulta de la conexión
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo_bd += duracion
+            if len(self.sql) < self.sql_maximo:
+                self.sql.append((sql, duracion))
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+def umbral_consultas(vista):
+    """Máximo de consultas permitido para una vista (0 = sin límite)"""
+    umbrales = getattr(settings, 'METRICAS_UMBRALES', {})
+    return umbrales.get(vista, getattr(settings, 'METRICAS_MAX_CONSULTAS', 0))
+
+
+class MetricasMiddleware:
+    """Mide consultas, tiempo de base de datos, de plantillas y total de cada petición"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICAS_ACTIVAS', True):
+            return self.get_response(request)
+
+        medicion = Medicion(getattr(settings, 'METRICAS_SQL_MAXIMO', 100))
+        token = _actual.set(medicion)
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion))
+                response = self.get_response(request)
+        finally:
+            _actual.reset(token)
+
+        total = medicion.total
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else ''
+        datos = {
+            'vista': vista,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'consultas': medicion.consultas,
+            'bd_ms': _ms(medicion.tiempo_bd),
+            'plantillas_ms': _ms(medicion.tiempo_plantillas),
+            'total_ms': _ms(total),
+        }
+        logger.info(json.dumps(datos, ensure_ascii=False), extra={'metricas': datos})
+
+        umbral = umbral_consultas(vista)
+        if umbral and medicion.consultas > umbral:
+            logger.warning(
+                'La vista %s hizo %s consultas (umbral %s):\n%s',
+                vista or request.path, medicion.consultas, umbral,
+                '\n'.join(f'{_ms(duracion)} ms  {sql}' for sql, duracion in medicion.sql),
+                extra={'metricas': datos},
+            )
+
+        if getattr(settings, 'METRICAS_SERVER_TIMING', True):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={datos["bd_ms"]};desc="{medicion.consultas} consultas"',
+                f'tpl;dur={datos["plantillas_ms"]}',
+                f'total;dur={datos["total_ms"]}',
+            ])
+        return response
+
+
+class PlantillaMedida:
+    """Plantilla que suma su tiempo de render a la medición de la petición"""
+
+    def __init__(self, plantilla):
+        self.plantilla = plantilla
+
+    def __getattr__(self, nombre):
+        return getattr(self.plantilla, nombre)
+
+    def render(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return self.plantilla.render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return self.plantilla.render(context, request)
+        finally:
+            medicion.tiempo_plantillas += time.perf_counter() - inicio
+
+
+class PlantillasDjango(DjangoTemplates):
+    """Motor de plantillas de Django que mide el tiempo de render
+
+    Solo se mide la plantilla principal (los include y extends se renderizan
+    dentro de ella). Las consultas que se ejecutan al renderizar (querysets
+    perezosos) cuentan tanto en el tiempo de base de datos como en el de plantillas.
+    """
+
+    def from_string(self, template_code):
+        return PlantillaMedida(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return PlantillaMedida(super().get_template(template_name))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_areaventa_centrocosto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Secuencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=20)),
+                ('anno', models.IntegerField()),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Secuencia',
+                'verbose_name_plural': 'Secuencias',
+                'unique_together': {('tipo', 'anno')},
+            },
+        ),
+    ]
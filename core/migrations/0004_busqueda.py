@@ -0,0 +1,77 @@
+# Índices de búsqueda de texto (ver core/busqueda.py)
+#
+# SQLite: una tabla FTS5 con trigramas por modelo, mantenida con triggers.
+# PostgreSQL: extensión pg_trgm e índices GIN sobre UPPER(campo).
+
+from django.db import migrations
+
+# Tabla → campos de texto indexados (igual que core.busqueda.CAMPOS)
+TABLAS = {
+    'clientes_cliente': ['nombre', 'numero_contrato'],
+    'actividades_actividad': ['codigo', 'actividad'],
+    'core_areaventa': ['nombre'],
+    'facturas_factura': ['numero_factura'],
+}
+
+
+def _texto(tabla, prefijo):
+    return " || ' | ' || ".join(f"coalesce({prefijo}{campo}, '')" for campo in TABLAS[tabla])
+
+
+def _sentencias_sqlite(tabla):
+    fts = f'fts_{tabla}'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(texto, tokenize='trigram')",
+        f"INSERT INTO {fts} (rowid, texto) SELECT id, {_texto(tabla, '')} FROM {tabla}",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN "
+        f"INSERT INTO {fts} (rowid, texto) VALUES (new.id, {_texto(tabla, 'new.')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tabla} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; "
+        f"INSERT INTO {fts} (rowid, texto) VALUES (new.id, {_texto(tabla, 'new.')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN "
+        f"DELETE FROM {fts} WHERE rowid = old.id; END",
+    ]
+
+
+def crear_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for tabla in TABLAS:
+            for sentencia in _sentencias_sqlite(tabla):
+                schema_editor.execute(sentencia)
+    elif vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for tabla, campos in TABLAS.items():
+            for campo in campos:
+                schema_editor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {tabla}_{campo}_trgm '
+                    f'ON {tabla} USING gin (UPPER({campo}::text) gin_trgm_ops)'
+                )
+
+
+def borrar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for tabla in TABLAS:
+            fts = f'fts_{tabla}'
+            for sufijo in ('ai', 'au', 'ad'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{sufijo}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+    elif vendor == 'postgresql':
+        for tabla, campos in TABLAS.items():
+            for campo in campos:
+                schema_editor.execute(f'DROP INDEX IF EXISTS {tabla}_{campo}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_secuencia'),
+        ('clientes', '0004_cliente_clienteversat_cliente_cuentaversat'),
+        ('actividades', '0001_initial'),
+        ('facturas', '0005_venta_mensual'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
@@ -48,3 +48,21 @@ class UserLog(models.Model):
     # Representación en texto del registro (usuario - acción - fecha)
     def __str__(self):
         return f"{self.user.username} - {self.action} - {self.timestamp}"
+
+class Secuencia(models.Model):
+    # Tipo de documento numerado (ej: "factura", "oferta")
+    tipo = models.CharField(max_length=20)
+    # Año al que pertenece la numeración
+    anno = models.IntegerField()
+    # Último número entregado en ese año
+    ultimo = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Un contador por tipo de documento y año
+        unique_together = ['tipo', 'anno']
+        verbose_name = 'Secuencia'
+        verbose_name_plural = 'Secuencias'
+
+    # Representación en texto de la secuencia (tipo año: último número)
+    def __str__(self):
+        return f"{self.tipo} {self.anno}: {self.ultimo}"
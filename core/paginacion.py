@@ -0,0 +1,176 @@
+# Paginación por clave (keyset / seek) para los listados
+#
+# En lugar de OFFSET, cada página se pide "después de" o "antes de" la última
+# fila vista, usando el orden descendente (campo, id). Así el costo de cada página
+# no depende de cuántas filas haya antes, y los cursores siguen siendo válidos
+# aunque se inserten registros nuevos. `codificar`/`decodificar` sirven también
+# para otros listados por cursor (core.autocompletar).
+import base64  # Codificación de cursores
+import json  # Serialización de cursores
+
+from django.db.models import F, Q  # Expresiones de consulta
+
+# Cantidad de filas por página en los listados
+POR_PAGINA = 50
+
+
+def codificar(valores):
+    """Convierte una lista de valores en un cursor seguro para URLs"""
+    texto = json.dumps(valores, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip('=')
+
+
+def decodificar(cursor):
+    """Convierte un cursor en la lista de valores original (o None si no es válido)"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(valores, list) or len(valores) != 2:
+        return None
+    return valores
+
+
+class PaginaKeyset:
+    """Página de resultados con cursores hacia la página siguiente y la anterior"""
+
+    def __init__(self, object_list, siguiente=None, anterior=None):
+        self.object_list = object_list
+        self.siguiente = siguiente  # Cursor de la página siguiente (o None)
+        self.anterior = anterior  # Cursor de la página anterior (o None)
+        self.url_siguiente = None
+        self.url_anterior = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def tiene_otras_paginas(self):
+        return bool(self.siguiente or self.anterior)
+
+
+class KeysetPaginator:
+    """Pagina un queryset en orden descendente por (campo, pk)
+
+    `campo` puede ser None para ordenar solo por pk, y también una anotación del
+    queryset (por ejemplo la `relevancia` de core.busqueda). Los valores nulos del
+    campo se ubican al final del listado.
+    """
+
+    def __init__(self, queryset, campo=None, por_pagina=POR_PAGINA):
+        self.queryset = queryset
+        self.campo = campo
+        self.por_pagina = por_pagina
+
+    def _clave(self, obj):
+        valor = getattr(obj, self.campo) if self.campo else None
+        return codificar([valor, obj.pk])
+
+    def _campo(self):
+        """Campo del modelo (o de la anotación) por el que se ordena"""
+        anotacion = self.queryset.query.annotations.get(self.campo)
+        if anotacion is not None:
+            return anotacion.output_field
+        return self.queryset.model._meta.get_field(self.campo)
+
+    def _valores(self, cursor):
+        """Devuelve (valor, pk) del cursor con los tipos de Python correctos"""
+        valores = decodificar(cursor) if cursor else None
+        if valores is None:
+            return None
+        valor, pk = valores
+        modelo = self.queryset.model
+        try:
+            pk = modelo._meta.pk.to_python(pk)
+            if self.campo and valor is not None:
+                valor = self._campo().to_python(valor)
+        except Exception:
+            return None
+        return valor, pk
+
+    def _despues(self, valor, pk):
+        """Filas que van después de (valor, pk) en el orden del listado"""
+        if not self.campo:
+            return Q(pk__lt=pk)
+        campo = self.campo
+        if valor is None:
+            return Q(**{f'{campo}__isnull': True, 'pk__lt': pk})
+        return (
+            Q(**{f'{campo}__lt': valor})
+            | Q(**{campo: valor, 'pk__lt': pk})
+            | Q(**{f'{campo}__isnull': True})
+        )
+
+    def _antes(self, valor, pk):
+        """Filas que van antes de (valor, pk) en el orden del listado"""
+        if not self.campo:
+            return Q(pk__gt=pk)
+        campo = self.campo
+        if valor is None:
+            return Q(**{f'{campo}__isnull': False}) | Q(**{f'{campo}__isnull': True, 'pk__gt': pk})
+        return Q(**{f'{campo}__gt': valor}) | Q(**{campo: valor, 'pk__gt': pk})
+
+    def _orden(self, descendente=True):
+        if descendente:
+            orden = [F(self.campo).desc(nulls_last=True)] if self.campo else []
+            return orden + [F('pk').desc()]
+        orden = [F(self.campo).asc(nulls_first=True)] if self.campo else []
+        return orden + [F('pk').asc()]
+
+    def pagina(self, despues=None, antes=None):
+        """Obtiene la página que sigue al cursor `despues` o precede al cursor `antes`"""
+        posicion_antes = self._valores(antes)
+        posicion_despues = None if posicion_antes else self._valores(despues)
+
+        if posicion_antes:
+            # Recorrer hacia atrás en orden inverso y luego voltear la página
+            filas = list(
+                self.queryset.filter(self._antes(*posicion_antes))
+                .order_by(*self._orden(descendente=False))[:self.por_pagina + 1]
+            )
+            hay_mas = len(filas) > self.por_pagina
+            filas = filas[:self.por_pagina][::-1]
+            anterior = self._clave(filas[0]) if hay_mas and filas else None
+            siguiente = self._clave(filas[-1]) if filas else None
+            return PaginaKeyset(filas, siguiente=siguiente, anterior=anterior)
+
+        queryset = self.queryset
+        if posicion_despues:
+            queryset = queryset.filter(self._despues(*posicion_despues))
+        filas = list(queryset.order_by(*self._orden())[:self.por_pagina + 1])
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+        siguiente = self._clave(filas[-1]) if hay_mas else None
+        anterior = self._clave(filas[0]) if posicion_despues and filas else None
+        return PaginaKeyset(filas, siguiente=siguiente, anterior=anterior)
+
+
+def paginar(request, queryset, campo=None, por_pagina=POR_PAGINA):
+    """Pagina un queryset según los cursores `despues`/`antes` de la petición
+
+    Las URLs de la página siguiente y la anterior conservan el resto de los
+    parámetros GET (filtros de búsqueda).
+    """
+    pagina = KeysetPaginator(queryset, campo, por_pagina).pagina(
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+    )
+
+    parametros = request.GET.copy()
+    parametros.pop('despues', None)
+    parametros.pop('antes', None)
+    if pagina.siguiente:
+        parametros['despues'] = pagina.siguiente
+        pagina.url_siguiente = '?' + parametros.urlencode()
+        del parametros['despues']
+    if pagina.anterior:
+        parametros['antes'] = pagina.anterior
+        pagina.url_anterior = '?' + parametros.urlencode()
+    return pagina
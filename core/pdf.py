@@ -0,0 +1,212 @@
+# Generación de PDFs en segundo plano con caché en disco
+#
+# La plantilla HTML se renderiza en la petición (es barato), pero la conversión a
+# PDF con xhtml2pdf se hace en un grupo de procesos (o hilos) para no ocupar el
+# worker de gunicorn. Cada PDF se guarda en MEDIA_ROOT/pdf/<tipo>/<id>/ con el
+# hash del HTML como nombre: si cambian los ítems, la empresa o la plantilla,
+# cambia el HTML y por lo tanto el archivo. Los PDFs ya generados se sirven
+# directamente desde el disco. La petición espera poco (PDF_ESPERA) y, si el PDF no
+# está listo, responde con una página que se recarga hasta que lo esté. Si el grupo
+# de trabajadores se rompe (un proceso muere), se crea otro en la siguiente petición.
+import hashlib  # Hash del contenido
+import os  # Operaciones del sistema de archivos
+import shutil  # Borrado de directorios
+import tempfile  # Archivos temporales para escrituras atómicas
+import threading  # Bloqueo del grupo de trabajadores
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError  # Trabajadores
+from functools import partial  # Funciones con argumentos fijos
+from pathlib import Path  # Manejo de rutas
+from urllib.parse import urlsplit  # Análisis de URLs
+
+from django.conf import settings  # Configuración del proyecto
+from django.http import FileResponse, HttpResponse  # Respuestas HTTP
+from django.template.loader import render_to_string  # Renderizado de plantillas
+
+# Importación condicional para generación de PDFs
+try:
+    from xhtml2pdf import pisa  # Para generar PDFs
+except ImportError:
+    pisa = None
+
+_ejecutor = None  # Grupo de trabajadores (se crea al primer uso)
+_pendientes = {}  # Trabajos en curso por ruta de destino
+_bloqueo = threading.Lock()
+
+
+class ErrorPDF(Exception):
+    """Error al convertir el HTML en PDF"""
+
+
+def disponible():
+    """Indica si la generación de PDFs está disponible (xhtml2pdf instalado)"""
+    return pisa is not None
+
+
+def directorio_cache():
+    """Directorio raíz de la caché de PDFs"""
+    return Path(settings.MEDIA_ROOT) / 'pdf'
+
+
+def _resolver_recurso(media_url, media_root, static_url, static_root, uri, rel):
+    """Convierte URLs de media/static en rutas locales para xhtml2pdf"""
+    ruta = urlsplit(uri).path  # Quitar esquema y host de URLs absolutas
+    for url, raiz in ((media_url, media_root), (static_url, static_root)):
+        url = '/' + url.lstrip('/')
+        if raiz and ruta.startswith(url):
+            local = os.path.join(raiz, ruta[len(url):])
+            if os.path.isfile(local):
+                return local
+    return uri
+
+
+def _generar(html, destino, resolver):
+    """Convierte el HTML en PDF y lo guarda en `destino` (se ejecuta en un trabajador)"""
+    destino = Path(destino)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+
+    # Escribir en un temporal y renombrar para no servir nunca un PDF a medias
+    descriptor, temporal = tempfile.mkstemp(dir=destino.parent, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            try:
+                estado = pisa.CreatePDF(html, dest=archivo, link_callback=resolver)
+            except Exception as e:
+                raise ErrorPDF(f'xhtml2pdf falló: {e}') from None
+        if estado.err:
+            raise ErrorPDF(f'xhtml2pdf reportó {estado.err} errores')
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+    # Eliminar versiones anteriores del mismo documento
+    for anterior in destino.parent.glob('*.pdf'):
+        if anterior != destino:
+            anterior.unlink(missing_ok=True)
+    return str(destino)
+
+
+def _reiniciar_ejecutor(roto):
+    """Descarta el grupo de trabajadores `roto` para que el siguiente uso cree otro"""
+    global _ejecutor
+    with _bloqueo:
+        if _ejecutor is roto:
+            _ejecutor = None
+    roto.shutdown(wait=False, cancel_futures=True)
+
+
+def _obtener_ejecutor():
+    global _ejecutor
+    with _bloqueo:
+        if _ejecutor is None:
+            trabajadores = getattr(settings, 'PDF_TRABAJADORES', 2)
+            if getattr(settings, 'PDF_EJECUTOR', 'process') == 'thread':
+                _ejecutor = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix='pdf')
+            else:
+                _ejecutor = ProcessPoolExecutor(max_workers=trabajadores)
+        return _ejecutor
+
+
+def _resolver():
+    return partial(
+        _resolver_recurso,
+        settings.MEDIA_URL, str(settings.MEDIA_ROOT),
+        settings.STATIC_URL, str(settings.STATIC_ROOT or ''),
+    )
+
+
+def ruta_pdf(tipo, documento_id, html):
+    """Ruta del PDF en caché para el documento y contenido HTML indicados"""
+    clave = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    return directorio_cache() / tipo / str(documento_id) / f'{clave}.pdf'
+
+
+def solicitar(tipo, documento_id, html):
+    """Encola la generación del PDF si no está en caché
+
+    Devuelve (ruta, future); `future` es None si el PDF ya existe.
+    """
+    destino = ruta_pdf(tipo, documento_id, html)
+    if destino.exists():
+        return destino, None
+
+    with _bloqueo:
+        future = _pendientes.get(destino)
+    if future is None:
+        ejecutor = _obtener_ejecutor()
+        try:
+            future = ejecutor.submit(_generar, html, str(destino), _resolver())
+        except BrokenExecutor:
+            # El grupo se rompió en una petición anterior: crear otro y reintentar
+            _reiniciar_ejecutor(ejecutor)
+            future = _obtener_ejecutor().submit(_generar, html, str(destino), _resolver())
+        with _bloqueo:
+            _pendientes[destino] = future
+        future.add_done_callback(lambda _f, d=destino: _pendientes.pop(d, None))
+    return destino, future
+
+
+def obtener(tipo, documento_id, html, espera=None):
+    """Devuelve la ruta del PDF, esperando como máximo `espera` segundos
+
+    Devuelve None si el PDF sigue generándose al terminar la espera o si el grupo
+    de trabajadores se rompió. Lanza ErrorPDF si la conversión falla.
+    """
+    if espera is None:
+        espera = getattr(settings, 'PDF_ESPERA', 1.5)
+    destino, future = solicitar(tipo, documento_id, html)
+    if future is None:
+        return destino
+    try:
+        return Path(future.result(timeout=espera))
+    except TimeoutError:
+        return None
+    except BrokenExecutor:
+        return None  # La siguiente petición lo encarga a un grupo nuevo (ver solicitar)
+    except ErrorPDF:
+        raise
+    except Exception as e:
+        raise ErrorPDF(f'No se pudo generar el PDF: {e}') from e
+
+
+def invalidar(tipo, documento_id=None):
+    """Elimina los PDFs en caché de un documento (o de todos los del tipo)"""
+    directorio = directorio_cache() / tipo
+    if documento_id is not None:
+        directorio = directorio / str(documento_id)
+    shutil.rmtree(directorio, ignore_errors=True)
+
+
+def invalidar_todo():
+    """Elimina todos los PDFs en caché (por ejemplo, al cambiar los datos de la empresa)"""
+    shutil.rmtree(directorio_cache(), ignore_errors=True)
+
+
+def respuesta_pdf(request, tipo, documento_id, html, nombre_archivo):
+    """Respuesta HTTP con el PDF del documento
+
+    Sirve el PDF desde la caché si existe; si no (o si se elimina antes de
+    abrirlo), lo genera en segundo plano y, si tarda más de lo previsto, devuelve
+    una página que se recarga sola. Sin xhtml2pdf instalado se devuelve el HTML
+    para imprimirlo desde el navegador.
+    """
+    if not disponible():
+        return HttpResponse(html)
+
+    # Un segundo intento si el PDF se invalida entre obtener su ruta y abrirlo
+    for _ in range(2):
+        try:
+            ruta = obtener(tipo, documento_id, html)
+        except ErrorPDF:
+            return HttpResponse('Hubo un error al generar el PDF <pre>' + html + '</pre>')
+        if ruta is None:
+            break
+        try:
+            archivo = open(ruta, 'rb')
+        except FileNotFoundError:
+            continue  # Otra petición lo eliminó: volver a generarlo
+        return FileResponse(archivo, content_type='application/pdf', filename=nombre_archivo)
+
+    # El PDF sigue generándose: pedir al navegador que vuelva a intentarlo
+    contenido = render_to_string('generando_pdf.html', {'nombre_archivo': nombre_archivo}, request)
+    return HttpResponse(contenido, status=202)
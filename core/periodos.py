@@ -0,0 +1,41 @@
+# Periodos (año, mes, acumulado hasta un mes) como rangos de fechas semiabiertos
+#
+# Filtrar con `fecha__year=` o `fecha__month=` aplica una función a la columna
+# (EXTRACT / strftime) y la base de datos no puede usar el índice sobre la fecha.
+# Un rango `fecha >= desde AND fecha < hasta` selecciona las mismas filas con un
+# recorrido por rango del índice. El límite superior es el primer día del
+# periodo siguiente, así no hace falta calcular el último día del mes.
+from datetime import date  # Límites de los periodos
+
+from django.db.models import Q  # Expresiones de consulta
+
+
+def rango_anno(anno):
+    """Rango [1 de enero, 1 de enero del año siguiente)"""
+    return date(anno, 1, 1), date(anno + 1, 1, 1)
+
+
+def rango_mes(anno, mes):
+    """Rango [día 1 del mes, día 1 del mes siguiente)"""
+    siguiente = date(anno + 1, 1, 1) if mes == 12 else date(anno, mes + 1, 1)
+    return date(anno, mes, 1), siguiente
+
+
+def rango_acumulado(anno, mes):
+    """Rango [1 de enero, día 1 del mes siguiente al indicado)"""
+    return date(anno, 1, 1), rango_mes(anno, mes)[1]
+
+
+def rango(anno, mes=None, acumulado=False):
+    """Rango del año, del mes o acumulado de enero al mes"""
+    if mes is None:
+        return rango_anno(anno)
+    if acumulado:
+        return rango_acumulado(anno, mes)
+    return rango_mes(anno, mes)
+
+
+def filtro(campo, anno, mes=None, acumulado=False):
+    """Q que limita el campo de fecha al periodo (ver `rango`)"""
+    desde, hasta = rango(anno, mes, acumulado)
+    return Q(**{f'{campo}__gte': desde, f'{campo}__lt': hasta})
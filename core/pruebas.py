@@ -0,0 +1,85 @@
+# Base de las pruebas de consultas por vista
+#
+# ConsultasTestCase siembra un conjunto pequeño de datos (core.datos_prueba), mide
+# las consultas SQL de una vista, siembra más filas y documentos con más ítems y
+# vuelve a medirla. La cantidad de consultas debe ser la misma en las dos medidas
+# y coincidir con la fijada en la prueba: una consulta por fila o por ítem (N+1)
+# hace fallar la prueba en cuanto aparece.
+import shutil  # Borrado del directorio de media temporal
+import tempfile  # Directorio de media temporal para los PDFs
+
+from django.contrib.auth.models import User  # Usuario de las pruebas
+from django.db import connection  # Conexión cuyas consultas se cuentan
+from django.test import TestCase, override_settings  # Base de las pruebas
+from django.test.utils import CaptureQueriesContext  # Captura de consultas
+from django.urls import reverse  # URLs de las vistas
+
+from . import busqueda, cache, datos_prueba  # Búsqueda, caché y datos de prueba
+
+# Tamaño de los datos iniciales y de los que se agregan al crecer
+PEQUENO = {'facturas': 6, 'clientes': 6, 'actividades': 8, 'areas': 2, 'items_por_factura': 2, 'ofertas': 3}
+GRANDE = {'facturas': 30, 'clientes': 20, 'actividades': 20, 'areas': 5, 'items_por_factura': 5, 'ofertas': 10}
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class ConsultasTestCase(TestCase):
+    """Pruebas que fijan la cantidad de consultas de cada vista
+
+    `vistas` enumera los nombres de URL que cubre la clase; core.tests comprueba
+    que todas las URL del proyecto estén cubiertas por alguna.
+    """
+    vistas = ()
+
+    @classmethod
+    def setUpClass(cls):
+        # PDFs generados por las pruebas fuera de MEDIA_ROOT
+        cls._media = tempfile.mkdtemp(prefix='facil-pruebas-')
+        cls.addClassCleanup(shutil.rmtree, cls._media, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=cls._media, PDF_EJECUTOR='thread')
+        media.enable()
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('pruebas', 'pruebas@ejemplo.cu', 'pruebas')
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        busqueda.motor()  # Se detecta una vez por proceso: no contarlo en ninguna prueba
+
+    def crecer(self):
+        """Agrega más filas y documentos con más ítems que los iniciales"""
+        self.semilla = getattr(self, 'semilla', 1) + 1  # Códigos distintos en cada llamada
+        datos_prueba.sembrar(semilla=self.semilla, **GRANDE)
+
+    def medir(self, nombre, args=(), datos=None, metodo='get'):
+        """Respuesta de la vista y consultas que ejecutó (con la caché vacía)
+
+        `args` y `datos` pueden ser funciones que devuelven los argumentos de la URL
+        y los parámetros, para elegir los objetos después de sembrar los datos.
+        """
+        ruta = reverse(nombre, args=args() if callable(args) else args)
+        datos = datos() if callable(datos) else (datos or {})
+        cache.invalidar(cache.EMPRESA, cache.ESTADOS, cache.AREAS, cache.ACTIVIDADES, cache.DASHBOARD)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(ruta, datos)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)  # Las respuestas en flujo consultan al enviarse
+        return respuesta, consultas
+
+    def assertConsultas(self, esperadas, nombre, args=(), datos=None, metodo='get', estado=200):
+        """Comprueba que la vista ejecuta `esperadas` consultas con pocos y con más datos"""
+        respuesta = None
+        for etapa in ('con los datos iniciales', 'con más datos'):
+            if respuesta is not None:
+                self.crecer()
+            respuesta, consultas = self.medir(nombre, args, datos, metodo)
+            self.assertEqual(respuesta.status_code, estado, f'{nombre} {etapa}')
+            if len(consultas) != esperadas:
+                self.fail(
+                    f'{nombre} {etapa}: {len(consultas)} consultas, se esperaban {esperadas}\n'
+                    + '\n'.join(f'{numero}. {consulta["sql"]}' for numero, consulta in enumerate(consultas, start=1))
+                )
+        return respuesta
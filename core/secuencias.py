@@ -0,0 +1,87 @@
+# Servicio central de numeración de documentos
+#
+# Cada tipo de documento tiene un contador por año (modelo Secuencia). Para
+# entregar números se incrementa la fila con un UPDATE atómico, que la bloquea
+# hasta el final de la transacción: dos peticiones concurrentes nunca reciben el
+# mismo número y el costo no depende de cuántos documentos existan.
+from datetime import datetime  # Año actual
+
+from django.apps import apps  # Acceso perezoso a los modelos de otras apps
+from django.db import IntegrityError, transaction  # Transacciones
+from django.db.models import F  # Expresiones de actualización
+
+from .models import Secuencia  # Contadores por tipo y año
+
+FACTURA = 'factura'
+OFERTA = 'oferta'
+
+# Configuración de cada tipo: (modelo, campo del número, formato del número)
+TIPOS = {
+    FACTURA: ('facturas.Factura', 'numero_factura', '{anno}-{numero:04d}'),  # AAAA-NNNN
+    OFERTA: ('ofertas.Oferta', 'numero_oferta', '{anno}{numero:05d}'),  # AAAANNNNN
+}
+
+
+def formatear(tipo, anno, numero):
+    """Devuelve el número de documento con el formato del tipo indicado"""
+    return TIPOS[tipo][2].format(anno=anno, numero=numero)
+
+
+def _ultimo_existente(tipo, anno):
+    """Mayor número ya usado por documentos del tipo y año (para crear el contador)"""
+    modelo, campo, _ = TIPOS[tipo]
+    prefijo = str(anno)
+    numeros = apps.get_model(modelo).objects.filter(
+        **{f'{campo}__startswith': prefijo}
+    ).values_list(campo, flat=True)
+
+    ultimo = 0
+    for numero in numeros:
+        try:
+            ultimo = max(ultimo, int(numero[len(prefijo):].lstrip('-')))
+        except ValueError:
+            continue  # Ignorar números con otro formato
+    return ultimo
+
+
+def _asegurar_contador(tipo, anno):
+    """Crea el contador del tipo y año si todavía no existe"""
+    if Secuencia.objects.filter(tipo=tipo, anno=anno).exists():
+        return
+    try:
+        with transaction.atomic():
+            Secuencia.objects.create(tipo=tipo, anno=anno, ultimo=_ultimo_existente(tipo, anno))
+    except IntegrityError:
+        pass  # Otro proceso lo creó al mismo tiempo
+
+
+def reservar(tipo, cantidad=1, anno=None):
+    """Reserva `cantidad` números consecutivos y devuelve el rango de enteros
+
+    Si se llama dentro de una transacción, el contador queda bloqueado hasta que
+    esta termine; si la transacción se revierte, los números vuelven a quedar libres.
+    """
+    if tipo not in TIPOS:
+        raise ValueError(f'Tipo de secuencia desconocido: {tipo}')
+    if cantidad < 1:
+        raise ValueError('La cantidad de números a reservar debe ser positiva')
+    anno = anno or datetime.now().year
+
+    _asegurar_contador(tipo, anno)
+    with transaction.atomic():
+        contador = Secuencia.objects.filter(tipo=tipo, anno=anno)
+        contador.update(ultimo=F('ultimo') + cantidad)  # Bloquea la fila
+        ultimo = contador.values_list('ultimo', flat=True).get()
+    return range(ultimo - cantidad + 1, ultimo + 1)
+
+
+def siguiente_numero(tipo, anno=None):
+    """Devuelve el siguiente número de documento ya formateado"""
+    anno = anno or datetime.now().year
+    return formatear(tipo, anno, reservar(tipo, 1, anno)[0])
+
+
+def reservar_numeros(tipo, cantidad, anno=None):
+    """Devuelve una lista de `cantidad` números de documento consecutivos y formateados"""
+    anno = anno or datetime.now().year
+    return [formatear(tipo, anno, numero) for numero in reservar(tipo, cantidad, anno)]
@@ -0,0 +1,27 @@
+# Señales de la aplicación core
+from django.db.models.signals import post_delete, post_save  # Señales de modelos
+from django.dispatch import receiver  # Decorador para conectar señales
+
+from . import cache, pdf  # Caché de datos y de PDFs
+from .models import AreaVenta, Empresa  # Modelos del núcleo
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def invalidar_pdfs_empresa(sender, instance, **kwargs):
+    """Los datos de la empresa aparecen en todos los PDFs: descartar la caché completa"""
+    pdf.invalidar_todo()
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def invalidar_empresa(sender, **kwargs):
+    """Descarta los datos de la empresa guardados en caché"""
+    cache.invalidar_al_confirmar(cache.EMPRESA)
+
+
+@receiver(post_save, sender=AreaVenta)
+@receiver(post_delete, sender=AreaVenta)
+def invalidar_areas(sender, **kwargs):
+    """Descarta la lista de áreas y los agregados del dashboard, que se agrupan por área"""
+    cache.invalidar_al_confirmar(cache.AREAS, cache.DASHBOARD)
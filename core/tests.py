@@ -1,3 +1,405 @@
-from django.test import TestCase
+import io
+import tempfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from pathlib import Path
+from unittest import mock, skipIf, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, QuerySet
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from actividades.models import Actividad
+from clientes.models import Cliente
+from facturas.models import Factura
+from ofertas.models import Oferta
+from . import busqueda, checks, datos_prueba, descargas, pdf, secuencias
+from .paginacion import KeysetPaginator, codificar
+from .importacion import ruta_informe
+from .models import Secuencia
+from .pruebas import GRANDE, PEQUENO, ConsultasTestCase
+
+
+def nombres_urls(patrones, espacio=''):
+    """Nombres (con su espacio de nombres) de todas las URL del proyecto"""
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            anidado = f'{espacio}{patron.namespace}:' if patron.namespace else espacio
+            yield from nombres_urls(patron.url_patterns, anidado)
+        elif isinstance(patron, URLPattern) and patron.name:
+            yield espacio + patron.name
+
+
+class CoberturaTests(TestCase):
+    def test_todas_las_urls_tienen_prueba_de_consultas(self):
+        for app in apps.get_app_configs():
+            try:
+                import_module(f'{app.name}.tests')
+            except ImportError:
+                pass
+        cubiertas = set()
+        pendientes = [ConsultasTestCase]
+        while pendientes:
+            clase = pendientes.pop()
+            cubiertas.update(clase.vistas)
+            pendientes.extend(clase.__subclasses__())
+
+        urls = {nombre for nombre in nombres_urls(get_resolver().url_patterns) if not nombre.startswith('admin:')}
+        self.assertEqual(urls - cubiertas, set(), 'URL sin prueba de consultas')
+        self.assertEqual(cubiertas - urls, set(), 'Pruebas de URL que no existen')
+
+
+class ConsultasCoreTests(ConsultasTestCase):
+    vistas = (
+        'login',
+        'logout',
+        'clear_permission_message',
+        'informe_importacion',
+    )
+
+    def test_login(self):
+        self.client.logout()
+        self.assertConsultas(0, 'login')
+
+    def test_logout(self):
+        respuesta, consultas = self.medir('logout', metodo='post')
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(len(consultas), 4)
+
+    def test_clear_permission_message(self):
+        self.assertConsultas(1, 'clear_permission_message', metodo='post')
+
+    def test_informe_importacion(self):
+        token = uuid.uuid4()
+        ruta = ruta_informe(self.usuario, token)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_text('Código,Errores\r\n', encoding='utf-8-sig')
+        self.assertConsultas(2, 'informe_importacion', args=[token])
+
+    def test_permiso_denegado_redirige_al_dashboard(self):
+        self.client.force_login(User.objects.create_user('sin_permisos'))
+        respuesta = self.client.get(reverse('facturas:lista_facturas'))
+        self.assertRedirects(respuesta, reverse('facturas:dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['permission_message'], 'No tienes permisos para realizar esta acción.')
+
+    def test_admin(self):
+        esperadas = {
+            'facturas_factura': 7,
+            'ofertas_oferta': 8,
+            'clientes_cliente': 5,
+            'actividades_actividad': 5,
+            'planes_plan': 7,
+        }
+        for modelo, consultas in esperadas.items():
+            with self.subTest(modelo=modelo):
+                self.assertConsultas(consultas, f'admin:{modelo}_changelist')
+
+
+class MetricasTests(ConsultasTestCase):
+    @override_settings(METRICAS_ACTIVAS=True)
+    def test_cabecera_server_timing(self):
+        with self.assertLogs('facil.metricas', 'INFO') as registro:
+            respuesta = self.client.get(reverse('facturas:dashboard'))
+        self.assertRegex(respuesta['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn('"vista": "facturas:dashboard"', registro.output[0])
+
+    @override_settings(METRICAS_ACTIVAS=True, METRICAS_UMBRALES={'facturas:dashboard': 1})
+    def test_registra_el_sql_sobre_el_umbral(self):
+        with self.assertLogs('facil.metricas', 'WARNING') as registro:
+            self.client.get(reverse('facturas:dashboard'))
+        self.assertIn('La vista facturas:dashboard hizo', registro.output[0])
+        self.assertIn('SELECT', registro.output[0])
+
+
+class ChequeosTests(SimpleTestCase):
+    def test_cache_local_en_produccion(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        compartida = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp'}}
+        with override_settings(CACHES=local):
+            self.assertEqual([aviso.id for aviso in checks.cache_compartida(None)], ['core.W002'])
+        with override_settings(CACHES=compartida):
+            self.assertEqual(checks.cache_compartida(None), [])
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class PdfTests(SimpleTestCase):
+    def test_pdf_eliminado_antes_de_abrirlo_se_regenera(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            generado = Path(directorio) / 'nuevo.pdf'
+            generado.write_bytes(b'%PDF-1.4')
+            # La primera ruta se invalidó (señal de otra petición) antes de abrirla
+            rutas = [Path(directorio) / 'invalidado.pdf', generado]
+            with mock.patch.object(pdf, 'disponible', return_value=True), \
+                    mock.patch.object(pdf, 'obtener', side_effect=rutas) as obtener:
+                respuesta = pdf.respuesta_pdf(None, 'factura', 1, '<p>Factura</p>', 'factura.pdf')
+                contenido = b''.join(respuesta.streaming_content)
+                respuesta.close()
+        self.assertEqual(obtener.call_count, 2)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        self.assertEqual(contenido, b'%PDF-1.4')
+
+
+    def respuesta_con_resultado(self, error):
+        """Respuesta de respuesta_pdf cuando el trabajador termina con `error`"""
+        future = Future()
+        future.set_exception(error)
+        with mock.patch.object(pdf, 'disponible', return_value=True), \
+                mock.patch.object(pdf, 'solicitar', return_value=(Path('/no/existe.pdf'), future)):
+            return pdf.respuesta_pdf(RequestFactory().get('/'), 'factura', 1, '<p>Factura</p>', 'factura.pdf')
+
+    def test_grupo_roto_responde_la_pagina_de_espera(self):
+        respuesta = self.respuesta_con_resultado(BrokenProcessPool('Un proceso terminó de forma abrupta'))
+        self.assertEqual(respuesta.status_code, 202)
+
+    def test_error_del_trabajador_no_es_un_500(self):
+        respuesta = self.respuesta_con_resultado(OSError('Disco lleno'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, 'Hubo un error al generar el PDF')
+
+    @skipUnless(pdf.disponible(), 'Requiere xhtml2pdf')
+    def test_grupo_roto_se_reemplaza(self):
+        roto = mock.Mock(submit=mock.Mock(side_effect=BrokenProcessPool('Un proceso terminó de forma abrupta')))
+        with tempfile.TemporaryDirectory() as directorio, \
+                override_settings(MEDIA_ROOT=directorio, PDF_EJECUTOR='thread'), \
+                mock.patch.object(pdf, '_ejecutor', roto):
+            ruta = pdf.obtener('factura', 1, '<p>Factura</p>', espera=30)
+            nuevo = pdf._ejecutor
+            self.assertTrue(ruta.exists())
+        nuevo.shutdown()
+        roto.shutdown.assert_called_once()
+        self.assertIsNot(nuevo, roto)
+
+
+class DescargasTests(SimpleTestCase):
+    filas = [
+        ('F-1', date(2025, 3, 1), Decimal('10.50'), True, None),
+        ('<Ñandú & "Co">\x01', date(2025, 3, 2), Decimal('0'), False, ''),
+    ]
+
+    def test_csv(self):
+        contenido = b''.join(descargas.csv_en_flujo(['Número', 'Fecha', 'Total', 'Activo', 'Nota'], self.filas))
+        self.assertTrue(contenido.startswith('\ufeffNúmero,Fecha'.encode('utf-8')))
+        self.assertIn(b'F-1,2025-03-01,10.50,True,', contenido)
+
+    def test_xlsx(self):
+        contenido = b''.join(descargas.xlsx_en_flujo(['Número', 'Fecha', 'Total', 'Activo', 'Nota'], self.filas, 'Facturas'))
+        with zipfile.ZipFile(io.BytesIO(contenido)) as libro:
+            self.assertIsNone(libro.testzip())
+            for nombre in libro.namelist():
+                ElementTree.fromstring(libro.read(nombre))
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(hoja.count('<row>'), 3)
+        self.assertIn('<c s="1"><v>45717</v></c>', hoja)
+        self.assertIn('&lt;Ñandú &amp; "Co"&gt;</t>', hoja)
+
+
+class BusquedaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Actividad.objects.bulk_create(
+            [Actividad(codigo=f'LOTE-{numero:03d}', actividad='Servicio', precio=Decimal('1.00')) for numero in range(130)]
+            + [
+                Actividad(codigo='XLOTE', actividad='Contiene', precio=Decimal('1.00')),
+                Actividad(codigo='LOTE', actividad='Exacta', precio=Decimal('1.00')),
+                Actividad(codigo='OTRA', actividad='No coincide', precio=Decimal('1.00')),
+            ]
+        )
+
+    def test_ordena_por_relevancia(self):
+        codigos = list(busqueda.buscar(Actividad.objects.all(), 'lote').order_by('-relevancia', '-pk').values_list('codigo', flat=True))
+        self.assertEqual(len(codigos), 132)
+        self.assertEqual(codigos[0], 'LOTE')  # Exacta
+        self.assertEqual(codigos[1], 'LOTE-129')  # Al inicio, la más nueva primero
+        self.assertEqual(codigos[-1], 'XLOTE')  # Solo contiene el texto
+
+    def test_paginas_recorren_todas_las_coincidencias(self):
+        paginador = KeysetPaginator(busqueda.buscar(Actividad.objects.all(), 'lote'), 'relevancia', por_pagina=50)
+        paginas, cursor = [], None
+        while True:
+            pagina = paginador.pagina(despues=cursor)
+            paginas.append([actividad.codigo for actividad in pagina])
+            cursor = pagina.siguiente
+            if not cursor:
+                break
+        codigos = [codigo for pagina in paginas for codigo in pagina]
+        self.assertEqual([len(pagina) for pagina in paginas], [50, 50, 32])
+        self.assertEqual(codigos, list(
+            busqueda.buscar(Actividad.objects.all(), 'lote').order_by('-relevancia', '-pk').values_list('codigo', flat=True)
+        ))
+        # Hacia atrás desde la última página
+        anterior = paginador.pagina(antes=pagina.anterior)
+        self.assertEqual([actividad.codigo for actividad in anterior], paginas[1])
+
+    def test_texto_corto_sin_indice(self):
+        relevancias = dict(busqueda.buscar(Actividad.objects.all(), 'xl').values_list('codigo', 'relevancia'))
+        self.assertEqual(relevancias, {'XLOTE': 1.0})
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class PaginacionTests(TestCase):
+    """Cursores de KeysetPaginator con valores repetidos y nulos al final"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **GRANDE)
+        ids = list(Factura.objects.order_by('pk').values_list('pk', flat=True))
+        Factura.objects.filter(pk__in=ids[::4]).update(fecha_factura=None)
+        Factura.objects.filter(pk__in=ids[1::4]).update(fecha_factura=date(2025, 3, 1))
+
+    def recorrer(self, paginador):
+        """Ids de todas las páginas hacia adelante y luego hacia atrás"""
+        adelante, pagina = [], paginador.pagina()
+        while True:
+            adelante.append([factura.pk for factura in pagina])
+            if not pagina.siguiente:
+                break
+            pagina = paginador.pagina(despues=pagina.siguiente)
+        atras = [[factura.pk for factura in pagina]]
+        while pagina.anterior:
+            pagina = paginador.pagina(antes=pagina.anterior)
+            atras.insert(0, [factura.pk for factura in pagina])
+        return adelante, atras
+
+    def test_nulos_al_final(self):
+        esperado = list(
+            Factura.objects.order_by(F('fecha_factura').desc(nulls_last=True), '-pk').values_list('pk', flat=True)
+        )
+        adelante, atras = self.recorrer(KeysetPaginator(Factura.objects.all(), 'fecha_factura', por_pagina=4))
+        self.assertEqual([pk for pagina in adelante for pk in pagina], esperado)
+        self.assertEqual(atras, adelante)
+        self.assertTrue(all(len(pagina) == 4 for pagina in adelante[:-1]))
+
+    def test_solo_por_pk(self):
+        esperado = list(Factura.objects.order_by('-pk').values_list('pk', flat=True))
+        adelante, atras = self.recorrer(KeysetPaginator(Factura.objects.all(), por_pagina=7))
+        self.assertEqual([pk for pagina in adelante for pk in pagina], esperado)
+        self.assertEqual(atras, adelante)
+
+    def test_cursor_invalido_vuelve_al_principio(self):
+        paginador = KeysetPaginator(Factura.objects.all(), 'fecha_factura', por_pagina=4)
+        primera = [factura.pk for factura in paginador.pagina()]
+        for cursor in ('basura', codificar(['no es fecha', 1]), codificar([1, 2, 3])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual([factura.pk for factura in paginador.pagina(despues=cursor)], primera)
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class SecuenciasTests(TestCase):
+    """Contadores de numeración sembrados desde los documentos existentes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+        numeros = ['2031-0007', '2031-0012', '2031-XYZ', '2030-0099']  # Otro formato y otro año se ignoran
+        for factura, numero in zip(Factura.objects.order_by('pk'), numeros):
+            Factura.objects.filter(pk=factura.pk).update(numero_factura=numero)
+        Oferta.objects.filter(pk=Oferta.objects.earliest('pk').pk).update(numero_oferta='203100041')
+
+    def test_contador_parte_del_ultimo_existente(self):
+        self.assertFalse(Secuencia.objects.filter(anno=2031).exists())
+        self.assertEqual(secuencias.siguiente_numero(secuencias.FACTURA, 2031), '2031-0013')
+        self.assertEqual(secuencias.siguiente_numero(secuencias.OFERTA, 2031), '203100042')
+        self.assertEqual(secuencias.siguiente_numero(secuencias.FACTURA, 2032), '2032-0001')
+        self.assertEqual(
+            secuencias.reservar_numeros(secuencias.FACTURA, 3, 2031), ['2031-0014', '2031-0015', '2031-0016'],
+        )
+        self.assertEqual(Secuencia.objects.get(tipo=secuencias.FACTURA, anno=2031).ultimo, 16)
+
+    def test_numeros_de_una_transaccion_revertida_quedan_libres(self):
+        self.assertEqual(secuencias.siguiente_numero(secuencias.FACTURA, 2031), '2031-0013')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            secuencias.reservar(secuencias.FACTURA, 5, 2031)
+            raise IntegrityError('Error al guardar los documentos')
+        self.assertEqual(secuencias.siguiente_numero(secuencias.FACTURA, 2031), '2031-0014')
+
+    def test_contador_creado_al_mismo_tiempo(self):
+        # Otro proceso crea el contador entre la comprobación y el INSERT
+        Secuencia.objects.create(tipo=secuencias.FACTURA, anno=2031, ultimo=50)
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.assertEqual(secuencias.siguiente_numero(secuencias.FACTURA, 2031), '2031-0051')
+        self.assertEqual(Secuencia.objects.filter(tipo=secuencias.FACTURA, anno=2031).count(), 1)
+
+    def test_argumentos_invalidos(self):
+        with self.assertRaises(ValueError):
+            secuencias.reservar('presupuesto')
+        with self.assertRaises(ValueError):
+            secuencias.reservar(secuencias.FACTURA, 0)
+
+
+@skipIf(connection.vendor == 'sqlite', 'SQLite no admite escrituras concurrentes')
+class SecuenciasConcurrentesTests(TransactionTestCase):
+    def test_hilos_no_repiten_numeros(self):
+        def reservar(resultados):
+            try:
+                for _ in range(10):
+                    with transaction.atomic():
+                        resultados.extend(secuencias.reservar(secuencias.FACTURA, 2, 2031))
+            finally:
+                connection.close()
+
+        resultados = []
+        hilos = [threading.Thread(target=reservar, args=(resultados,)) for _ in range(5)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(sorted(resultados), list(range(1, 101)))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Solo SQLite mantiene la búsqueda con triggers')
+class MigracionesBusquedaTests(TransactionTestCase):
+    serialized_rollback = True  # Restaura los datos de las migraciones para las demás pruebas
+
+    def test_migraciones_que_reconstruyen_tablas_conservan_los_triggers(self):
+        salida = io.StringIO()
+        # Revertir y volver a aplicar las migraciones que reconstruyen tablas indexadas
+        call_command('migrate', 'clientes', '0006', stdout=salida)
+        call_command('migrate', 'facturas', '0006', stdout=salida)
+        self.assertEqual(busqueda.indices_faltantes(), [])
+        call_command('migrate', stdout=salida)
+        self.assertEqual(busqueda.indices_faltantes(), [])
+        # Los triggers mantienen el índice de las tablas reconstruidas
+        cliente = datos_prueba._cliente('ZQX', 1, date(2025, 1, 1))
+        cliente.save()
+        self.assertEqual(list(busqueda.buscar(Cliente.objects.all(), 'ZQX-00001')), [cliente])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Solo SQLite mantiene la búsqueda con triggers')
+class IndicesBusquedaTests(TestCase):
+    def buscar(self, texto):
+        return list(busqueda.buscar(Actividad.objects.all(), texto).values_list('codigo', flat=True))
+
+    def test_indices_completos_tras_migrar(self):
+        # Ninguna migración que reconstruye una tabla indexada debe perder sus triggers
+        self.assertEqual(busqueda.indices_faltantes(), [])
+
+    def test_reconstruir_repara_triggers_perdidos(self):
+        # Lo que hace una migración que reconstruye la tabla en SQLite
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER fts_actividades_actividad_ai')
+        self.assertIn('actividades_actividad', busqueda.indices_faltantes())
+        self.assertEqual([aviso.id for aviso in checks.indices_busqueda(None, databases=['default'])], ['core.W001'])
+        Actividad.objects.create(codigo='ZQX-001', actividad='Sin indexar', precio=Decimal('1.00'))
+        self.assertEqual(self.buscar('ZQX-001'), [])
+
+        call_command('reconstruir_busqueda', stdout=io.StringIO())
+        self.assertEqual(busqueda.indices_faltantes(), [])
+        self.assertEqual(checks.indices_busqueda(None, databases=['default']), [])
+        self.assertEqual(self.buscar('ZQX-001'), ['ZQX-001'])
+        # Los triggers vuelven a mantener el índice
+        Actividad.objects.create(codigo='ZQX-002', actividad='Nueva', precio=Decimal('1.00'))
+        Actividad.objects.filter(codigo='ZQX-001').update(actividad='Renombrada')
+        self.assertEqual(self.buscar('ZQX-002'), ['ZQX-002'])
+        self.assertEqual(self.buscar('Renombrada'), ['ZQX-001'])
+        self.assertEqual(self.buscar('Sin indexar'), [])
@@ -0,0 +1,149 @@
+# Mantenimiento de los totales desnormalizados de documentos (facturas y ofertas)
+#
+# Factura y Oferta guardan `total` y `num_items` para que listados y reportes no
+# tengan que sumar sus ítems. Este módulo los recalcula con una sola sentencia
+# UPDATE por lote de documentos afectados.
+from django.db import models  # Operaciones de base de datos
+from django.db.models import Count, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value  # Expresiones SQL
+from django.db.models.functions import Coalesce  # Valor por defecto en subconsultas
+from django.dispatch import Signal  # Señales propias
+
+# Se envía tras recalcular totales con el modelo de documento como `sender` y los
+# `ids` afectados (None si fueron todos). Las operaciones masivas sobre ítems no
+# disparan post_save, así que quien cachee totales debe escuchar esta señal.
+totales_recalculados = Signal()
+
+
+def _subconsulta(modelo_item, campo_documento, agregado, output_field):
+    """Subconsulta correlacionada con un agregado de los ítems de cada documento"""
+    return Coalesce(
+        Subquery(
+            modelo_item.objects.filter(**{f'{campo_documento}_id': OuterRef('pk')})
+            .order_by()
+            .values(f'{campo_documento}_id')
+            .annotate(valor=agregado)
+            .values('valor'),
+            output_field=output_field,
+        ),
+        Value(0, output_field=output_field),
+    )
+
+
+def expresiones_totales(modelo_documento):
+    """Expresiones (total, num_items) calculadas a partir de los ítems del documento"""
+    relacion = modelo_documento._meta.get_field('items')
+    modelo_item = relacion.related_model
+    campo_documento = relacion.field.name
+    total = _subconsulta(
+        modelo_item, campo_documento, Sum('importe'),
+        models.DecimalField(max_digits=12, decimal_places=2),
+    )
+    num_items = _subconsulta(modelo_item, campo_documento, Count('pk'), models.IntegerField())
+    return total, num_items
+
+
+def recalcular_totales(modelo_documento, ids=None):
+    """Recalcula `total` y `num_items` de los documentos indicados (o de todos)
+
+    Devuelve el número de documentos actualizados.
+    """
+    documentos = modelo_documento.objects.all()
+    if ids is not None:
+        ids = {pk for pk in ids if pk is not None}
+        if not ids:
+            return 0
+        documentos = documentos.filter(pk__in=ids)
+    total, num_items = expresiones_totales(modelo_documento)
+    actualizados = documentos.update(total=total, num_items=num_items)
+    totales_recalculados.send(sender=modelo_documento, ids=ids)
+    return actualizados
+
+
+def documentos_con_diferencias(modelo_documento):
+    """Documentos cuyo total o cantidad de ítems guardados no coincide con sus ítems"""
+    total, num_items = expresiones_totales(modelo_documento)
+    return modelo_documento.objects.annotate(
+        total_real=total, num_items_real=num_items
+    ).exclude(
+        total=models.F('total_real'), num_items=models.F('num_items_real')
+    )
+
+
+# Campos que se mantienen desde los ítems y nunca se escriben con save()
+CAMPOS_TOTALES = ('total', 'num_items')
+
+
+class DocumentoConTotalesMixin:
+    """Mixin para modelos de documento con totales desnormalizados
+
+    Al guardar un documento existente no se escriben `total` ni `num_items`: los
+    valores en memoria pueden estar desactualizados si se modificaron ítems
+    después de cargar el documento, y los sobrescribirían en la base de datos.
+    """
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in CAMPOS_TOTALES
+            ]
+        super().save(*args, **kwargs)
+
+
+class ItemDocumentoQuerySet(models.QuerySet):
+    """QuerySet de ítems que mantiene los totales del documento en operaciones masivas
+
+    Las subclases indican en `campo_documento` el nombre de la FK al documento.
+    Los `save()` y `delete()` individuales se cubren con señales en cada app.
+    """
+    campo_documento = None
+
+    def _recalcular(self, ids):
+        modelo_documento = self.model._meta.get_field(self.campo_documento).related_model
+        recalcular_totales(modelo_documento, ids)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # Calcular importes antes de insertar (bulk_create no llama a save())
+        objs = list(objs)
+        for obj in objs:
+            obj.importe = obj.cantidad * obj.precio
+        creados = super().bulk_create(objs, *args, **kwargs)
+        self._recalcular({getattr(obj, f'{self.campo_documento}_id') for obj in objs})
+        return creados
+
+    def copiar_de(self, items, **documento):
+        """Copia los ítems de otro documento con un solo INSERT
+
+        `items` es un queryset de ítems de origen; `documento` indica la FK del
+        destino (por ejemplo factura=factura). Se leen solo las columnas necesarias,
+        sin cargar las actividades.
+        """
+        filas = items.order_by('pk').values_list('actividad_id', 'cantidad', 'precio')
+        return self.bulk_create([
+            self.model(actividad_id=actividad_id, cantidad=cantidad, precio=precio, **documento)
+            for actividad_id, cantidad, precio in filas
+        ])
+
+    def update(self, **kwargs):
+        # Si cambia la cantidad o el precio, el importe se calcula en la misma sentencia
+        if ('cantidad' in kwargs or 'precio' in kwargs) and 'importe' not in kwargs:
+            importe = kwargs.get('cantidad', F('cantidad')) * kwargs.get('precio', F('precio'))
+            if hasattr(importe, 'resolve_expression'):
+                importe = ExpressionWrapper(importe, output_field=self.model._meta.get_field('importe'))
+            kwargs['importe'] = importe
+        ids = set(self.values_list(f'{self.campo_documento}_id', flat=True))
+        # Si los ítems pasan a otro documento, también cambian los totales del destino
+        for campo in (self.campo_documento, f'{self.campo_documento}_id'):
+            if campo not in kwargs:
+                continue
+            destino = kwargs[campo]
+            if hasattr(destino, 'resolve_expression'):
+                ids = None  # Destino calculado en la base de datos: se recalculan todos
+                break
+            ids.add(getattr(destino, 'pk', destino))
+        filas = super().update(**kwargs)
+        self._recalcular(ids)
+        return filas
+
+    update.alters_data = True
+
@@ -1,7 +1,10 @@
 
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+
+from .importacion import ruta_informe
 
 
 def permission_denied(request, exception=None):
@@ -15,7 +18,7 @@ def permission_denied(request, exception=None):
 	request.session['permission_message'] = msg
 	# También agregar un mensaje normal (opcional)
 	messages.error(request, msg, extra_tags='permission')
-	return redirect('dashboard')
+	return redirect('facturas:dashboard')
 
 
 def clear_permission_message(request):
@@ -28,4 +31,13 @@ def clear_permission_message(request):
 		return JsonResponse({'ok': True})
 	return JsonResponse({'ok': False}, status=405)
 
+
+@login_required
+def informe_importacion(request, token):
+	"""Descarga el informe CSV con las filas rechazadas de la última importación del usuario"""
+	ruta = ruta_informe(request.user, token)
+	if not ruta.is_file():
+		raise Http404('El informe ya no está disponible')
+	return FileResponse(open(ruta, 'rb'), as_attachment=True, filename='errores_importacion.csv', content_type='text/csv')
+
 # Create your views here.
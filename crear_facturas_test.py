@@ -6,7 +6,7 @@ Crea 3 facturas por mes desde enero de 2025 hasta diciembre.
 
 import os
 import django
-from datetime import datetime, timedelta
+from datetime import timedelta
 from decimal import Decimal
 import random
 
@@ -18,6 +18,7 @@ from facturas.models import Factura, FacturaItem, Estado
 from clientes.models import Cliente
 from actividades.models import Actividad
 from core.models import AreaVenta
+from core import periodos, secuencias
 
 def crear_facturas_test():
     """Crea 3 facturas por mes desde enero de 2025"""
@@ -26,7 +27,7 @@ def crear_facturas_test():
     clientes = list(Cliente.objects.filter(activo=True))
     actividades = list(Actividad.objects.filter(activo=True))
     areas_venta = list(AreaVenta.objects.all())
-    estado_firmada = Estado.objects.filter(nombre__iexact='firmada').first()
+    estado_firmada = Estado.objects.filter(codigo=Estado.Codigo.FIRMADA).first()
     
     if not estado_firmada:
         print("❌ Error: No existe estado 'FIRMADA'")
@@ -37,32 +38,25 @@ def crear_facturas_test():
         print(f"   Clientes: {len(clientes)}, Actividades: {len(actividades)}, Áreas: {len(areas_venta)}")
         return
     
-    # Obtener el número más alto existente
-    ultima_factura = Factura.objects.all().order_by('-numero_factura').first()
-    if ultima_factura:
-        ultimo_numero = int(ultima_factura.numero_factura.split('-')[1])
-    else:
-        ultimo_numero = 0
+    # Reservar de una vez los números de las 36 facturas (formato: AAAA-NNNN)
+    numeros = iter(secuencias.reservar_numeros(secuencias.FACTURA, 36, anno=2025))
     
     # Contador de facturas creadas
     facturas_creadas = 0
-    numero_secuencial = ultimo_numero + 1
     
     # Crear 3 facturas por mes (enero a diciembre)
     for mes in range(1, 13):
         for numero_factura_mes in range(1, 4):
-            # Calcular fecha aleatoria en el mes
-            dia = random.randint(1, 28)  # Usar hasta día 28 para evitar problemas con meses cortos
-            fecha = datetime(2025, mes, dia).date()
+            # Calcular fecha aleatoria en el mes [día 1, día 1 del mes siguiente)
+            desde, hasta = periodos.rango_mes(2025, mes)
+            fecha = desde + timedelta(days=random.randrange((hasta - desde).days))
             
             # Seleccionar datos aleatorios
             cliente = random.choice(clientes)
             area_venta = random.choice(areas_venta)
             
-            # Generar número de factura (formato: AAAA-NNNN)
-            year = 2025
-            numero = f"{year}-{numero_secuencial:04d}"
-            numero_secuencial += 1
+            # Tomar el siguiente número reservado
+            numero = next(numeros)
             
             # Crear factura
             factura = Factura.objects.create(
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metricas.MetricasMiddleware',  # Consultas y tiempos de cada petición (core.metricas)
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Para servir archivos estáticos
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -63,7 +64,7 @@ ROOT_URLCONF = 'facturacion.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.metricas.PlantillasDjango',  # DjangoTemplates que mide el tiempo de render
     'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,6 +93,16 @@ DATABASES = {
     )
 }
 
+# Caché de datos de referencia y del dashboard (core.cache)
+# Por defecto en memoria local, que solo sirve con un proceso: la invalidación no
+# llega a los demás workers de gunicorn. Con varios workers es obligatoria una caché
+# compartida: CACHE_URL=rediscache://host:6379/1, filecache:///ruta/cache o
+# dbcache://facil_cache (tras `manage.py createcachetable`).
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://facil'),
+}
+CACHE_TIEMPO = env.int('CACHE_TIEMPO', default=300)  # Segundos que se conserva cada entrada
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,6 +148,48 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'  # Para collectstatic
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Generación de PDFs en segundo plano (core.pdf); caché en MEDIA_ROOT/pdf
+PDF_EJECUTOR = env('PDF_EJECUTOR', default='process')  # 'process' o 'thread'
+PDF_TRABAJADORES = env.int('PDF_TRABAJADORES', default=2)  # Trabajadores en paralelo
+PDF_ESPERA = env.float('PDF_ESPERA', default=1.5)  # Segundos que espera la petición antes de responder 202
+
+# Métricas por petición (core.metricas): cabecera Server-Timing y logs en 'facil.metricas'
+METRICAS_ACTIVAS = env.bool('METRICAS_ACTIVAS', default=True)  # Medir cada petición
+METRICAS_SERVER_TIMING = env.bool('METRICAS_SERVER_TIMING', default=True)  # Añadir la cabecera Server-Timing
+METRICAS_MAX_CONSULTAS = env.int('METRICAS_MAX_CONSULTAS', default=50)  # Umbral para registrar el SQL (0 = nunca)
+METRICAS_SQL_MAXIMO = env.int('METRICAS_SQL_MAXIMO', default=100)  # Sentencias que se guardan por petición
+# Umbrales por vista (nombre de la URL) más estrictos que el general
+METRICAS_UMBRALES = {
+    'facturas:dashboard': env.int('METRICAS_MAX_CONSULTAS_DASHBOARD', default=20),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'facil.metricas': {
+            'handlers': ['console'],
+            'level': env('METRICAS_NIVEL_LOG', default='INFO'),  # WARNING: solo las vistas sobre el umbral
+            'propagate': False,
+        },
+    },
+}
+
+# Barra de depuración (solo en desarrollo): DEBUG=True, DEBUG_TOOLBAR=True y django-debug-toolbar instalado
+DEBUG_TOOLBAR = DEBUG and env.bool('DEBUG_TOOLBAR', default=False)
+if DEBUG_TOOLBAR:
+    try:
+        import debug_toolbar  # noqa: F401
+    except ImportError:
+        DEBUG_TOOLBAR = False
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE.insert(1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+    INTERNAL_IPS = env.list('INTERNAL_IPS', default=['127.0.0.1'])
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
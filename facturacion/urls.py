@@ -32,11 +32,18 @@ urlpatterns = [
 
      # Endpoint para limpiar mensajes de permiso en sesión (AJAX)
      path('_clear_permission_message/', core_views.clear_permission_message, name='clear_permission_message'),
+
+     # Informe de errores de la última importación CSV del usuario
+     path('importaciones/<uuid:token>/errores/', core_views.informe_importacion, name='informe_importacion'),
 ]
 
 # Configuración para servir archivos multimedia en desarrollo
 if settings.DEBUG:  # Solo en modo desarrollo
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
+# Barra de depuración (solo si está activada en settings)
+if getattr(settings, 'DEBUG_TOOLBAR', False):
+    urlpatterns += [path('__debug__/', include('debug_toolbar.urls'))]
+
 # Handler custom para errores 403 (PermissionDenied)
 handler403 = 'core.views.permission_denied'
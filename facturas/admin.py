@@ -1,6 +1,6 @@
 # Importar módulos necesarios de Django
 from django.contrib import admin  # Funcionalidades del admin
-from .models import Factura, FacturaItem, Estado  # Modelos a administrar
+from .models import Factura, FacturaItem, Estado, VentaMensual  # Modelos a administrar
 
 # Configuración para mostrar ítems dentro del formulario de factura
 class FacturaItemInline(admin.TabularInline):
@@ -53,4 +53,15 @@ class FacturaItemAdmin(admin.ModelAdmin):
 # Registrar y configurar la administración de Estados
 @admin.register(Estado)
 class EstadoAdmin(admin.ModelAdmin):
-    list_display = ['nombre']  # Mostrar solo el nombre del estado
+    list_display = ['nombre', 'codigo', 'cuenta_como_venta', 'pendiente_cobro']  # Nombre, código e indicadores
+    list_editable = ['cuenta_como_venta', 'pendiente_cobro']  # Indicadores editables desde la lista
+
+# Registrar el resumen mensual de ventas (solo lectura, se mantiene automáticamente)
+@admin.register(VentaMensual)
+class VentaMensualAdmin(admin.ModelAdmin):
+    list_display = ['anno', 'mes', 'area_venta', 'estado', 'total', 'cantidad']
+    list_filter = ['anno', 'area_venta', 'estado']
+    readonly_fields = ['area_venta', 'anno', 'mes', 'estado', 'total', 'cantidad']
+
+    def has_add_permission(self, request):
+        return False
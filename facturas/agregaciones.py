@@ -0,0 +1,164 @@
+# Motor de agregación plan vs. real para el dashboard y los reportes por área
+#
+# En lugar de lanzar varias consultas por cada área de venta, se obtiene toda la
+# matriz (área × mes × estado) leyendo el resumen VentaMensual (una fila por área,
+# mes y estado, sin recorrer las facturas) y Plan, y el pivote se hace en memoria.
+# El número de consultas es constante sin importar cuántas áreas existan.
+# La matriz y los conteos del dashboard se guardan en la caché (grupo 'dashboard')
+# hasta que cambia una factura, un ítem, un plan, un área o un estado.
+from collections import defaultdict  # Diccionarios con valor por defecto
+from decimal import Decimal  # Para cálculos precisos
+
+from django.db.models import Count, Sum  # Agregación de base de datos
+
+from core import cache  # Caché de datos de referencia y agregados
+from core.models import AreaVenta  # Modelo de áreas de venta
+from planes.models import Plan  # Modelo de planes
+from . import estados  # Estados de factura por código e indicador
+from .models import Factura, VentaMensual  # Facturas y su resumen mensual
+
+MESES = range(1, 13)
+
+
+def _porcentaje(real, plan):
+    """Devuelve real / plan * 100, o 0 si no hay plan"""
+    if plan > 0:
+        return (real / plan) * 100
+    return Decimal('0')
+
+
+class MatrizPlanReal:
+    """Matriz plan vs. real de un año, pivoteada por área, mes y estado"""
+
+    def __init__(self, anno, areas, plan, real, estados_venta):
+        self.anno = anno
+        self.areas = areas  # Lista de tuplas (id, nombre) ordenadas por nombre
+        self._plan = plan  # {area_id: {mes: Decimal}}
+        self._real = real  # {area_id: {mes: {estado_id: Decimal}}}
+        self._estados_venta = estados_venta  # IDs de los estados que cuentan como venta
+
+    def plan(self, area_id, desde=1, hasta=12):
+        """Suma del plan de un área entre los meses indicados (inclusive)"""
+        meses = self._plan.get(area_id, {})
+        return sum((meses.get(mes, Decimal('0')) for mes in range(desde, hasta + 1)), Decimal('0'))
+
+    def real(self, area_id, desde=1, hasta=12, estados=None, excluir=None):
+        """Suma de lo facturado por un área entre los meses indicados
+
+        `estados` limita la suma a esos IDs de estado; `excluir` descarta estados.
+        """
+        meses = self._real.get(area_id, {})
+        total = Decimal('0')
+        for mes in range(desde, hasta + 1):
+            for estado, importe in meses.get(mes, {}).items():
+                if estados is not None and estado not in estados:
+                    continue
+                if excluir is not None and estado in excluir:
+                    continue
+                total += importe
+        return total
+
+    def ventas(self, area_id, desde=1, hasta=12):
+        """Ventas de un área (lo facturado en estados que cuentan como venta)"""
+        return self.real(area_id, desde, hasta, estados=self._estados_venta)
+
+    def cobrado_por_mes(self, area_id=None):
+        """Lista de 12 importes vendidos (firmados o pagados), de un área o de todas"""
+        areas = [area_id] if area_id is not None else [area[0] for area in self.areas]
+        return [
+            sum((self.ventas(area, mes, mes) for area in areas), Decimal('0'))
+            for mes in MESES
+        ]
+
+    def tabla_areas(self, mes, real_anual_hasta=12):
+        """Filas de la tabla plan vs. real por área para el mes indicado
+
+        `real_anual_hasta` define el último mes sumado en la columna "Real Año".
+        La última fila contiene los totales y lleva `is_total=True`.
+        """
+        filas = []
+        totales = defaultdict(Decimal)
+        for area_id, nombre in self.areas:
+            fila = {
+                'area_venta__nombre': nombre,
+                'plan_mensual': self.plan(area_id, mes, mes),
+                'real_mes': self.ventas(area_id, mes, mes),
+                'plan_acumulado': self.plan(area_id, 1, mes),
+                'real_acumulado': self.ventas(area_id, 1, mes),
+                'plan_anual': self.plan(area_id),
+                'real_anual': self.ventas(area_id, 1, real_anual_hasta),
+            }
+            for clave, valor in fila.items():
+                if clave != 'area_venta__nombre':
+                    totales[clave] += valor
+            filas.append(fila)
+
+        filas.append(dict(totales, area_venta__nombre='TOTAL', is_total=True))
+
+        # Calcular porcentajes de cumplimiento de cada fila
+        for fila in filas:
+            fila['cumplimiento'] = _porcentaje(fila['real_mes'], fila['plan_mensual'])
+            fila['cumplimiento_acum'] = _porcentaje(fila['real_anual'], fila['plan_acumulado'])
+            fila['cumplimiento_anual'] = _porcentaje(fila['real_anual'], fila['plan_anual'])
+            fila.setdefault('is_total', False)
+        return filas
+
+
+def matriz_plan_real(anno):
+    """Construye la matriz plan vs. real de un año con tres consultas en total"""
+
+    # Áreas de venta ordenadas por nombre
+    areas = list(AreaVenta.objects.order_by('nombre').values_list('id', 'nombre'))
+
+    # Plan agrupado por área y mes
+    plan = defaultdict(dict)
+    planes = Plan.objects.filter(anno=anno).values('area_venta_id', 'mes').annotate(total=Sum('plan'))
+    for fila in planes:
+        plan[fila['area_venta_id']][fila['mes']] = fila['total'] or Decimal('0')
+
+    # Importes facturados por área, mes y estado (del resumen mensual, sin unir estados)
+    real = defaultdict(lambda: defaultdict(lambda: defaultdict(Decimal)))
+    importes = VentaMensual.objects.filter(anno=anno).values_list('area_venta_id', 'mes', 'estado_id', 'total')
+    for area_id, mes, estado_id, total in importes:
+        real[area_id][mes][estado_id] += total
+
+    # Diccionarios simples para poder guardar la matriz en la caché
+    real = {area: {mes: dict(estados) for mes, estados in meses.items()} for area, meses in real.items()}
+    return MatrizPlanReal(anno, areas, dict(plan), real, estados.ids_ventas())
+
+
+def matriz_en_cache(anno):
+    """Matriz plan vs. real de un año, tomada de la caché si está disponible"""
+    return cache.obtener(cache.DASHBOARD, ['matriz', anno], lambda: matriz_plan_real(anno))
+
+
+def resumen_facturas(anno, mes):
+    """Conteos de facturas del dashboard (del año, del mes y firmadas por cobrar)"""
+
+    # Facturas por mes del año (del resumen mensual)
+    por_mes = dict(
+        VentaMensual.objects.filter(anno=anno)
+        .values_list('mes')
+        .annotate(cantidad=Sum('cantidad'))
+        .order_by('mes')
+    )
+
+    # Facturas pendientes de cobro (firmadas): cantidad e importe
+    firmadas = Factura.objects.filter(estado_id__in=estados.ids_pendientes_cobro()).aggregate(
+        cantidad=Count('id'), total=Sum('total')
+    )
+
+    return {
+        'total_invoices': sum(por_mes.values()),  # Facturas del año
+        'invoices_this_month': por_mes.get(mes, 0),  # Facturas del mes
+        'invoices_per_month': [  # Facturas por mes para gráfico
+            {'fecha_factura__month': numero, 'count': cantidad} for numero, cantidad in por_mes.items()
+        ],
+        'signed_count': firmadas['cantidad'],
+        'signed_total': firmadas['total'] or Decimal('0'),
+    }
+
+
+def resumen_en_cache(anno, mes):
+    """Conteos de facturas del dashboard, tomados de la caché si están disponibles"""
+    return cache.obtener(cache.DASHBOARD, ['resumen', anno, mes], lambda: resumen_facturas(anno, mes))
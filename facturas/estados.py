@@ -0,0 +1,45 @@
+# Estados de factura resueltos por código y por indicador
+#
+# Los reportes no comparan nombres (`estado__nombre__iexact=...` obliga a unir la
+# tabla de estados y a aplicar UPPER()); filtran con `estado_id IN (...)` usando
+# los IDs que se resuelven aquí. Los estados se leen del grupo 'estados' de
+# core.cache, que las señales de la app invalidan al guardar o borrar un estado;
+# como toda entrada de la caché, caducan a los CACHE_TIEMPO segundos (ver core.cache
+# para el caso de varios procesos).
+from core import cache  # Caché de datos de referencia
+from .models import Estado  # Estados de factura
+
+
+def todos():
+    """Tupla con todos los estados de factura"""
+    return cache.obtener(cache.ESTADOS, ['por_id'], lambda: tuple(Estado.objects.order_by('pk')))
+
+
+def por_codigo(codigo):
+    """Estado con el código indicado (o None si no existe)"""
+    return next((estado for estado in todos() if estado.codigo == codigo), None)
+
+
+def id_de(codigo):
+    """ID del estado con el código indicado (o None si no existe)"""
+    estado = por_codigo(codigo)
+    return estado.pk if estado else None
+
+
+def buscar(valor):
+    """Estado por ID, código o nombre (sin distinguir mayúsculas); None si no existe"""
+    valor = str(valor).strip()
+    for estado in todos():
+        if valor == str(estado.pk) or valor == estado.codigo or valor.upper() == estado.nombre.upper():
+            return estado
+    return None
+
+
+def ids_ventas():
+    """IDs de los estados que cuentan como venta"""
+    return frozenset(estado.pk for estado in todos() if estado.cuenta_como_venta)
+
+
+def ids_pendientes_cobro():
+    """IDs de los estados pendientes de cobro"""
+    return frozenset(estado.pk for estado in todos() if estado.pendiente_cobro)
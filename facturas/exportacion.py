@@ -0,0 +1,222 @@
+# Exportaciones de facturas (PDF, VERSAT .obl y tablas CSV/XLSX, individuales o por lotes)
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, wait  # Trabajos en paralelo
+from pathlib import Path  # Manejo de rutas
+
+from django.conf import settings  # Configuración del proyecto
+from django.db.models import Prefetch  # Carga anticipada de relaciones
+from django.template.loader import get_template  # Para cargar plantillas
+
+from core import cache, pdf  # Caché de datos de referencia y generación de PDFs
+from core.descargas import zip_en_flujo  # ZIP generado en flujo
+from .models import Factura, FacturaItem  # Modelos de facturas
+
+# Cantidad máxima de facturas por lote de exportación
+LOTE_MAXIMO = 1000
+# Facturas que se cargan de la base de datos en cada consulta
+BLOQUE_CONSULTA = 100
+
+# Columnas de las exportaciones CSV/XLSX: (encabezado, campo)
+COLUMNAS_FACTURAS = (
+    ('Número', 'numero_factura'),
+    ('Fecha', 'fecha_factura'),
+    ('Cliente', 'cliente__nombre'),
+    ('Contrato', 'cliente__numero_contrato'),
+    ('Área de venta', 'area_venta__nombre'),
+    ('Estado', 'estado__nombre'),
+    ('Ítems', 'num_items'),
+    ('Total', 'total'),
+    ('Observaciones', 'observaciones'),
+)
+COLUMNAS_ITEMS = (
+    ('Factura', 'factura__numero_factura'),
+    ('Fecha', 'factura__fecha_factura'),
+    ('Cliente', 'factura__cliente__nombre'),
+    ('Área de venta', 'factura__area_venta__nombre'),
+    ('Estado', 'factura__estado__nombre'),
+    ('Código', 'actividad__codigo'),
+    ('Actividad', 'actividad__actividad'),
+    ('Cantidad', 'cantidad'),
+    ('Precio', 'precio'),
+    ('Importe', 'importe'),
+)
+
+
+def html_factura(factura, empresa, items=None):
+    """HTML de la factura listo para convertir en PDF
+
+    El mismo HTML produce la misma clave en la caché de PDFs, así que el PDF
+    generado en una exportación masiva se reutiliza en factura_pdf y viceversa.
+    """
+    if items is None:
+        items = factura.items.select_related('actividad')
+    context = {
+        'factura': factura,  # Factura actual
+        'items': items,  # Lista de ítems
+        'total': factura.total,  # Total guardado en la factura
+        'empresa': empresa,  # Datos de la empresa
+        'para_pdf': pdf.disponible(),  # Omitir estilos que xhtml2pdf no soporta
+    }
+    return get_template('facturas/factura_pdf.html').render(context)
+
+
+def nombre_pdf(factura):
+    """Nombre del archivo PDF de una factura"""
+    return f'factura_{factura.numero_factura}.pdf'
+
+
+def lote_facturas(facturas, despues_de=None, limite=LOTE_MAXIMO):
+    """IDs de las facturas del lote, en orden ascendente, y si quedan más después
+
+    `despues_de` es el último ID exportado en un lote anterior, para reanudar.
+    """
+    if despues_de:
+        facturas = facturas.filter(pk__gt=despues_de)
+    ids = list(facturas.order_by('pk').values_list('pk', flat=True)[:limite + 1])
+    return ids[:limite], len(ids) > limite
+
+
+def facturas_para_imprimir(ids):
+    """Itera las facturas indicadas con todo lo que necesita la plantilla
+
+    Se hacen tres consultas por cada bloque de BLOQUE_CONSULTA facturas.
+    """
+    items = FacturaItem.objects.select_related('actividad')
+    for inicio in range(0, len(ids), BLOQUE_CONSULTA):
+        bloque = ids[inicio:inicio + BLOQUE_CONSULTA]
+        yield from Factura.objects.filter(pk__in=bloque).select_related(
+            'cliente'
+        ).prefetch_related(Prefetch('items', queryset=items)).order_by('pk')
+
+
+def _encargar(factura_id, html):
+    """Trabajo con la ruta del PDF de la factura (ya terminado si estaba en caché)"""
+    ruta, future = pdf.solicitar('factura', factura_id, html)
+    if future is None:
+        future = Future()
+        future.set_result(str(ruta))
+    return future
+
+
+def _leer(ruta):
+    """Contenido del PDF, o None si se eliminó (pdf.invalidar) antes de leerlo"""
+    try:
+        return Path(ruta).read_bytes()
+    except FileNotFoundError:
+        return None
+
+
+def pdfs_facturas(facturas):
+    """Genera pares (nombre, contenido) con el PDF de cada factura
+
+    Los PDFs se convierten en paralelo en el grupo de trabajadores de core.pdf y
+    se entregan a medida que terminan. Los que ya están en caché se entregan
+    enseguida. Cada PDF se lee al entregarlo: si otra petición lo eliminó antes, se
+    vuelve a generar una vez. Si una conversión falla se entrega el HTML de la factura.
+    """
+    empresa = cache.empresa()
+    ventana = getattr(settings, 'PDF_TRABAJADORES', 2) * 4  # Trabajos en vuelo a la vez
+    pendientes = {}
+    facturas = iter(facturas)
+    agotado = False
+
+    while True:
+        # Llenar la ventana de trabajos en curso
+        while not agotado and len(pendientes) < ventana:
+            factura = next(facturas, None)
+            if factura is None:
+                agotado = True
+                break
+            html = html_factura(factura, empresa, factura.items.all())
+            nombre = nombre_pdf(factura)
+            if not pdf.disponible():
+                yield nombre.replace('.pdf', '.html'), html
+                continue
+            pendientes[_encargar(factura.id, html)] = (factura.id, nombre, html, True)
+
+        if not pendientes:
+            break
+
+        # Entregar los PDFs a medida que terminan
+        terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+        for future in terminados:
+            factura_id, nombre, html, reintentar = pendientes.pop(future)
+            try:
+                contenido = _leer(future.result())
+            except (pdf.ErrorPDF, BrokenExecutor):
+                contenido = html
+            if contenido is None and reintentar:
+                pendientes[_encargar(factura_id, html)] = (factura_id, nombre, html, False)
+            elif isinstance(contenido, bytes):
+                yield nombre, contenido
+            else:
+                yield nombre.replace('.pdf', '.html'), html
+
+
+# Campos que necesita el archivo .obl (se cargan con una sola consulta)
+CAMPOS_OBL = (
+    'numero_factura', 'fecha_factura', 'total',
+    'cliente__clienteversat', 'cliente__cuentaversat',
+    'area_venta__nombre', 'area_venta__centrocosto',
+)
+
+
+def lineas_obl(factura):
+    """Líneas del archivo .obl de VERSAT para una factura"""
+    cliente = factura.cliente
+    area_venta = factura.area_venta
+    total_importe = factura.total  # Importe total guardado en la factura
+    fecha = factura.fecha_factura.strftime('%d/%m/%Y') if factura.fecha_factura else ''
+
+    return [
+        "[Obligacion]",  # Línea 1
+        "Concepto=Obligacion por Factura Emitida",  # Línea 2
+        "Tipo={7DE34F15-C9BA-4FE0-AEE6-B5E85ADB84DC}",  # Línea 3
+        f"Unidad={area_venta.centrocosto}",  # Línea 4: Centro de costo del área de venta
+        f"Entidad={cliente.clienteversat}",  # Línea 5: Código Versat del cliente
+        f"Numero={factura.numero_factura}",  # Línea 6: Número de factura
+        f"Fechaemi={fecha}",  # Línea 7: Fecha de factura formateada
+        f"Descripcion={area_venta.nombre}",  # Línea 8: Nombre del área de venta
+        "Fecharec=",  # Línea 9: Fecha de recepción (vacía)
+        f"ImporteMC={total_importe}",  # Línea 10: Importe total
+        f"CuentaMC={cliente.cuentaversat}",  # Línea 11: Cuenta Versat del cliente
+        "[Contrapartidas]",  # Línea 12
+        "Concepto=107",  # Línea 13
+        f"Importe={total_importe}",  # Línea 14
+        "{",  # Línea 15
+        f"900011008  |CUP|{total_importe}",  # Línea 16
+        "}",  # Línea 17
+    ]
+
+
+def contenido_obl(factura):
+    """Contenido del archivo .obl de una factura"""
+    return "\n".join(lineas_obl(factura))
+
+
+def nombre_obl(factura):
+    """Nombre del archivo .obl de una factura"""
+    return f'{factura.numero_factura}.obl'
+
+
+def facturas_para_obl(facturas):
+    """Itera las facturas con los datos del .obl usando una sola consulta
+
+    Une cliente y área de venta en la misma consulta, toma el total guardado (sin
+    sumar ítems) y recorre el resultado con un cursor para no cargarlo entero.
+    """
+    return facturas.select_related('cliente', 'area_venta').only(*CAMPOS_OBL).order_by(
+        'fecha_factura', 'numero_factura', 'pk'
+    ).iterator(chunk_size=BLOQUE_CONSULTA * 10)
+
+
+def obl_concatenado(facturas):
+    """Genera un único archivo .obl con todas las facturas, una tras otra"""
+    for factura in facturas_para_obl(facturas):
+        yield contenido_obl(factura) + "\n\n"
+
+
+def obl_zip(facturas):
+    """Genera un ZIP con un archivo .obl por factura"""
+    return zip_en_flujo(
+        (nombre_obl(factura), contenido_obl(factura)) for factura in facturas_para_obl(facturas)
+    )
@@ -0,0 +1,50 @@
+# Filtros compartidos del listado de facturas
+#
+# Los usan el listado (lista_facturas) y las exportaciones masivas, de modo que
+# todas respeten exactamente los mismos parámetros: q, estado, fecha_inicial y
+# fecha_final.
+from core import busqueda  # Búsqueda de texto indexada
+from . import estados  # Estados de factura por código
+from .models import Factura  # Modelo de facturas
+
+
+def parametros_facturas(datos):
+    """Extrae los parámetros de filtrado de un QueryDict (request.GET)"""
+    return {
+        'query': datos.get('q', ''),  # Búsqueda general
+        'estado_id': datos.get('estado', ''),  # Filtro por estado (id, código o nombre)
+        'fecha_inicial': datos.get('fecha_inicial', ''),  # Fecha desde
+        'fecha_final': datos.get('fecha_final', ''),  # Fecha hasta
+    }
+
+
+def filtrar_facturas(datos, facturas=None):
+    """Aplica a un queryset de facturas los filtros del listado"""
+    parametros = parametros_facturas(datos)
+    if facturas is None:
+        facturas = Factura.objects.all()
+
+    # Aplicar filtro de búsqueda si existe
+    query = parametros['query']
+    if query:
+        # Número, nombre de cliente o área de venta, con los índices de core.busqueda
+        facturas = busqueda.buscar(facturas, query)
+
+    # Filtrar por estado si se especifica. `estado` puede ser id o nombre.
+    estado_id = parametros['estado_id']
+    if estado_id:
+        # Si es dígitos, tratarlo como ID
+        if estado_id.isdigit():
+            facturas = facturas.filter(estado_id=int(estado_id))
+        else:
+            # Código o nombre: se resuelve en memoria y se filtra por ID, sin unir estados
+            estado = estados.buscar(estado_id)
+            facturas = facturas.filter(estado_id=estado.pk) if estado else facturas.none()
+
+    # Filtrar por rango de fechas
+    if parametros['fecha_inicial']:
+        facturas = facturas.filter(fecha_factura__gte=parametros['fecha_inicial'])  # Desde fecha inicial
+    if parametros['fecha_final']:
+        facturas = facturas.filter(fecha_factura__lte=parametros['fecha_final'])  # Hasta fecha final
+
+    return facturas
@@ -1,9 +1,11 @@
 # Importar módulos necesarios de Django y modelos relacionados
 from django import forms  # Funcionalidades de formularios
+from django.urls import reverse_lazy  # URLs de los endpoints de autocompletado
 from .models import Factura, FacturaItem, Estado  # Modelos de facturas
 from core.models import AreaVenta  # Modelo de áreas de venta
 from clientes.models import Cliente  # Modelo de clientes
 from actividades.models import Actividad  # Modelo de actividades
+from core.autocompletar import SelectAutocompletar  # Select que carga las opciones por JSON
 
 # Formulario para crear una nueva factura
 class FacturaForm(forms.ModelForm):
@@ -20,7 +22,7 @@ class FacturaForm(forms.ModelForm):
             'area_venta': forms.Select(attrs={
                 'class': 'form-control'  # Estilo Bootstrap
             }),
-            'cliente': forms.Select(attrs={
+            'cliente': SelectAutocompletar(reverse_lazy('autocompletar_clientes'), attrs={
                 'class': 'form-control'  # Estilo Bootstrap
             }),
             'observaciones': forms.Textarea(attrs={
@@ -68,7 +70,7 @@ class FacturaItemForm(forms.ModelForm):
         ]
         # Configuración de los widgets
         widgets = {
-            'actividad': forms.Select(attrs={
+            'actividad': SelectAutocompletar(reverse_lazy('autocompletar_actividades'), attrs={
                 'class': 'form-control'  # Estilo Bootstrap
             }),
             'cantidad': forms.NumberInput(attrs={
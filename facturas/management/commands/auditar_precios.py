@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from actividades.historial import fuera_de_tarifa
+from facturas.filtros import filtrar_facturas
+from facturas.models import FacturaItem
+
+
+class Command(BaseCommand):
+    help = 'Lista los ítems de factura cuyo precio no coincide con la tarifa vigente en la fecha de la factura'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', default='', help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', default='', help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--estado', default='', help='ID o nombre del estado')
+        parser.add_argument('--limite', type=int, default=50, help='Ítems que se muestran como máximo')
+
+    def handle(self, *args, **options):
+        # Los mismos filtros que el listado de facturas
+        facturas = filtrar_facturas({
+            'estado': options['estado'],
+            'fecha_inicial': options['desde'],
+            'fecha_final': options['hasta'],
+        })
+        items = fuera_de_tarifa(
+            FacturaItem.objects.filter(factura__in=facturas.values('pk')), 'factura__fecha_factura',
+        )
+        filas = items.order_by('factura__fecha_factura', 'pk').values_list(
+            'factura__numero_factura', 'factura__fecha_factura', 'actividad__codigo', 'precio', 'tarifa',
+        )
+        total = 0
+        for numero, fecha, codigo, precio, tarifa in filas.iterator():
+            total += 1
+            if total <= options['limite']:
+                self.stdout.write(f'{numero} ({fecha}) {codigo}: facturado a {precio}, tarifa {tarifa}')
+        if total:
+            raise CommandError(f'{total} ítems con precio distinto de la tarifa')
+        self.stdout.write(self.style.SUCCESS('Todos los ítems coinciden con la tarifa de su fecha'))
@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from facturas.exportacion import obl_concatenado, obl_zip
+from facturas.filtros import filtrar_facturas
+
+
+class Command(BaseCommand):
+    help = 'Exporta a VERSAT (.obl) las facturas de un rango de fechas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', default='', help='Fecha inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', default='', help='Fecha final (AAAA-MM-DD)')
+        parser.add_argument('--estado', default='', help='ID o nombre del estado')
+        parser.add_argument('--buscar', default='', help='Texto a buscar (número, cliente o área)')
+        parser.add_argument(
+            '--zip',
+            action='store_true',
+            help='Genera un ZIP con un .obl por factura en lugar de un único .obl',
+        )
+        parser.add_argument(
+            '--salida',
+            default='-',
+            help='Archivo de destino (por defecto, la salida estándar)',
+        )
+
+    def handle(self, *args, **options):
+        # Los mismos filtros que el listado de facturas
+        facturas = filtrar_facturas({
+            'q': options['buscar'],
+            'estado': options['estado'],
+            'fecha_inicial': options['desde'],
+            'fecha_final': options['hasta'],
+        })
+
+        if options['zip']:
+            trozos = obl_zip(facturas)
+        else:
+            trozos = (trozo.encode('utf-8') for trozo in obl_concatenado(facturas))
+
+        # Escribir a medida que se generan, sin cargar todo en memoria
+        if options['salida'] == '-':
+            destino = sys.stdout.buffer
+            for trozo in trozos:
+                destino.write(trozo)
+            destino.flush()
+        else:
+            with open(options['salida'], 'wb') as destino:
+                for trozo in trozos:
+                    destino.write(trozo)
+            self.stderr.write(self.style.SUCCESS(f'Exportación guardada en {options["salida"]}'))
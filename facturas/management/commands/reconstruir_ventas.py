@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import cache
+from facturas.resumen import diferencias_ventas, reconstruir_ventas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el resumen mensual de ventas (VentaMensual) a partir de las facturas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--comprobar',
+            action='store_true',
+            help='Solo informa de las celdas con diferencias, sin corregirlas',
+        )
+
+    def handle(self, *args, **options):
+        if options['comprobar']:
+            diferencias = diferencias_ventas()
+            for (area_id, anno, mes, estado_id), (guardado, real) in sorted(diferencias.items())[:20]:
+                self.stdout.write(
+                    f'Área {area_id}, {mes:02d}/{anno}, estado {estado_id}: '
+                    f'guardado {guardado[0]} ({guardado[1]} facturas), real {real[0]} ({real[1]} facturas)'
+                )
+            if diferencias:
+                raise CommandError(f'Se encontraron {len(diferencias)} celdas desactualizadas')
+            self.stdout.write(self.style.SUCCESS('El resumen mensual está al día'))
+            return
+
+        filas = reconstruir_ventas()
+        cache.invalidar(cache.DASHBOARD)
+        self.stdout.write(self.style.SUCCESS(f'Resumen mensual reconstruido: {filas} filas'))
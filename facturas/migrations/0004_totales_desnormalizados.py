@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+def calcular_totales(apps, schema_editor):
+    # Rellenar los totales de los documentos existentes a partir de sus ítems
+    from core.totales import recalcular_totales
+    recalcular_totales(apps.get_model('facturas', 'Factura'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facturas', '0003_alter_factura_fecha_factura'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
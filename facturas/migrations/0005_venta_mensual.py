@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:39
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def llenar_ventas(apps, schema_editor):
+    # Generar el resumen mensual a partir de las facturas existentes
+    Factura = apps.get_model('facturas', 'Factura')
+    VentaMensual = apps.get_model('facturas', 'VentaMensual')
+    filas = Factura.objects.filter(fecha_factura__isnull=False).values_list(
+        'area_venta_id', 'fecha_factura__year', 'fecha_factura__month', 'estado_id'
+    ).annotate(suma=Sum('total'), cantidad=Count('pk')).order_by()
+    VentaMensual.objects.bulk_create([
+        VentaMensual(area_venta_id=area_id, anno=anno, mes=mes, estado_id=estado_id, total=suma or 0, cantidad=cantidad)
+        for area_id, anno, mes, estado_id, suma, cantidad in filas
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_secuencia'),
+        ('facturas', '0004_totales_desnormalizados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anno', models.IntegerField()),
+                ('mes', models.PositiveSmallIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('area_venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.areaventa')),
+                ('estado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='facturas.estado')),
+            ],
+            options={
+                'verbose_name': 'Venta mensual',
+                'verbose_name_plural': 'Ventas mensuales',
+                'indexes': [models.Index(fields=['anno', 'mes'], name='facturas_ve_anno_ed45fa_idx')],
+                'unique_together': {('area_venta', 'anno', 'mes', 'estado')},
+            },
+        ),
+        migrations.RunPython(llenar_ventas, migrations.RunPython.noop),
+    ]
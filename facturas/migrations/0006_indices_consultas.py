@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facturas', '0005_venta_mensual'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha_factura', 'id'], name='facturas_fa_fecha_f_5a6ce7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['area_venta', 'fecha_factura'], name='facturas_fa_area_ve_6ee60e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['estado', 'fecha_factura'], name='facturas_fa_estado__7abe19_idx'),
+        ),
+    ]
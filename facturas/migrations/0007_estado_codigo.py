@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:53
+#
+# En SQLite cambiar la columna estado reconstruye la tabla de facturas y se pierden
+# sus triggers, así que se restaura el índice de búsqueda al aplicarla y al revertirla.
+
+from django.db import migrations, models
+import django.db.models.deletion
+import facturas.models
+
+# Estados base: código → (nombre, cuenta como venta, pendiente de cobro)
+ESTADOS_BASE = {
+    'no_firmada': ('NO FIRMADA', False, False),
+    'firmada': ('FIRMADA', True, True),
+    'pagada': ('PAGADA', True, False),
+}
+
+
+def asignar_codigos(apps, schema_editor):
+    # Los reportes contaban como venta todo estado salvo "NO FIRMADA"
+    Estado = apps.get_model('facturas', 'Estado')
+    por_nombre = {nombre: codigo for codigo, (nombre, _, _) in ESTADOS_BASE.items()}
+    asignados = set()
+    for estado in Estado.objects.order_by('pk'):
+        codigo = por_nombre.get(estado.nombre.strip().upper())
+        estado.codigo = codigo if codigo not in asignados else None
+        asignados.add(codigo)
+        estado.cuenta_como_venta = estado.nombre.strip().upper() != 'NO FIRMADA'
+        estado.pendiente_cobro = estado.codigo == 'firmada'
+        estado.save()
+    # Crear los estados base que falten
+    for codigo, (nombre, venta, cobro) in ESTADOS_BASE.items():
+        if not Estado.objects.filter(codigo=codigo).exists():
+            Estado.objects.create(nombre=nombre, codigo=codigo, cuenta_como_venta=venta, pendiente_cobro=cobro)
+
+
+# Índice de búsqueda de la tabla (copia fija del SQL de core.busqueda.sentencias_sqlite:
+# las migraciones no deben depender del código actual de la aplicación)
+BUSQUEDA_SQLITE = [
+    'DROP TRIGGER IF EXISTS fts_facturas_factura_ai',
+    'DROP TRIGGER IF EXISTS fts_facturas_factura_au',
+    'DROP TRIGGER IF EXISTS fts_facturas_factura_ad',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS fts_facturas_factura USING fts5(texto, tokenize='trigram')",
+    'DELETE FROM fts_facturas_factura',
+    "INSERT INTO fts_facturas_factura (rowid, texto) SELECT id, coalesce(numero_factura, '') FROM facturas_factura",
+    "CREATE TRIGGER fts_facturas_factura_ai AFTER INSERT ON facturas_factura BEGIN "
+    "INSERT INTO fts_facturas_factura (rowid, texto) VALUES (new.id, coalesce(new.numero_factura, '')); END",
+    "CREATE TRIGGER fts_facturas_factura_au AFTER UPDATE ON facturas_factura BEGIN "
+    "DELETE FROM fts_facturas_factura WHERE rowid = old.id; "
+    "INSERT INTO fts_facturas_factura (rowid, texto) VALUES (new.id, coalesce(new.numero_factura, '')); END",
+    "CREATE TRIGGER fts_facturas_factura_ad AFTER DELETE ON facturas_factura BEGIN "
+    "DELETE FROM fts_facturas_factura WHERE rowid = old.id; END",
+]
+
+
+def restaurar_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sentencia in BUSQUEDA_SQLITE:
+            schema_editor.execute(sentencia)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facturas', '0006_indices_consultas'),
+        ('core', '0004_busqueda'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restaurar_busqueda),
+        migrations.AddField(
+            model_name='estado',
+            name='codigo',
+            field=models.CharField(blank=True, choices=[('no_firmada', 'No firmada'), ('firmada', 'Firmada'), ('pagada', 'Pagada')], max_length=20, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='estado',
+            name='cuenta_como_venta',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='estado',
+            name='pendiente_cobro',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(asignar_codigos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='factura',
+            name='estado',
+            field=models.ForeignKey(default=facturas.models.estado_inicial, on_delete=django.db.models.deletion.CASCADE, to='facturas.estado'),
+        ),
+        migrations.RunPython(restaurar_busqueda, migrations.RunPython.noop),
+    ]
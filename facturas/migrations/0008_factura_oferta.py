@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:54
+#
+# Cada factura recuerda la oferta de la que se generó, para que una misma oferta
+# (servicios que se cobran cada mes) se pueda facturar una vez por mes. Las facturas
+# ya enlazadas desde Oferta.factura reciben su oferta.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def enlazar_ofertas(apps, schema_editor):
+    Factura = apps.get_model('facturas', 'Factura')
+    Oferta = apps.get_model('ofertas', 'Oferta')
+    for oferta_id, factura_id in Oferta.objects.filter(factura__isnull=False).values_list('pk', 'factura_id'):
+        Factura.objects.filter(pk=factura_id).update(oferta_id=oferta_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ofertas', '0007_oferta_factura'),
+        ('facturas', '0007_estado_codigo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='oferta',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='facturas', to='ofertas.oferta'),
+        ),
+        migrations.RunPython(enlazar_ofertas, migrations.RunPython.noop),
+    ]
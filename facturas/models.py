@@ -4,16 +4,34 @@ from django.contrib.auth.models import User  # Para la relación con usuarios
 from core.models import AreaVenta  # Importamos el modelo de áreas de venta
 from clientes.models import Cliente  # Importamos el modelo de clientes
 from actividades.models import Actividad  # Importamos el modelo de actividades
+from core.totales import DocumentoConTotalesMixin, ItemDocumentoQuerySet  # Mantienen los totales desnormalizados
 
 class Estado(models.Model):
+    # Códigos estables de los estados que usa la aplicación (el nombre puede cambiar)
+    class Codigo(models.TextChoices):
+        NO_FIRMADA = 'no_firmada', 'No firmada'
+        FIRMADA = 'firmada', 'Firmada'
+        PAGADA = 'pagada', 'Pagada'
+
     # Nombre único del estado de la factura (ej: "NO FIRMADA", "FIRMADA", etc.)
     nombre = models.CharField(max_length=50, unique=True)
+    # Código del estado (vacío en los estados creados por el usuario)
+    codigo = models.CharField(max_length=20, choices=Codigo.choices, unique=True, null=True, blank=True)
+    # Las facturas en este estado suman a las ventas de los reportes
+    cuenta_como_venta = models.BooleanField(default=False)
+    # Las facturas en este estado están pendientes de cobro (cuentas por cobrar)
+    pendiente_cobro = models.BooleanField(default=False)
 
     # Representación en texto del estado
     def __str__(self):
         return self.nombre
 
-class Factura(models.Model):
+def estado_inicial():
+    """ID del estado con el que nace una factura (NO FIRMADA)"""
+    from .estados import id_de
+    return id_de(Estado.Codigo.NO_FIRMADA)
+
+class Factura(DocumentoConTotalesMixin, models.Model):
     # Número único que identifica la factura (formato: AAAANNNNN)
     numero_factura = models.CharField(max_length=20, unique=True)
     # Fecha de la factura (por defecto la fecha actual, pero permite cambios)
@@ -25,14 +43,37 @@ class Factura(models.Model):
     # Campo opcional para añadir notas o comentarios a la factura
     observaciones = models.TextField(max_length=500, blank=True, null=True)
     # Estado actual de la factura (por defecto "NO FIRMADA")
-    estado = models.ForeignKey(Estado, on_delete=models.CASCADE, default=1)
+    estado = models.ForeignKey(Estado, on_delete=models.CASCADE, default=estado_inicial)
     # Usuario que creó la factura
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Oferta de la que se generó la factura (vacío si se creó directamente)
+    oferta = models.ForeignKey(
+        'ofertas.Oferta', related_name='facturas', on_delete=models.SET_NULL,
+        null=True, blank=True, editable=False,
+    )
+    # Total de la factura (suma de importes de sus ítems, se mantiene al escribir ítems)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    # Cantidad de ítems de la factura
+    num_items = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Listado paginado por (fecha_factura, id) y filtros por rango de fechas
+            models.Index(fields=['fecha_factura', 'id']),
+            # Facturas de un área en un rango de fechas (resumen mensual)
+            models.Index(fields=['area_venta', 'fecha_factura']),
+            # Facturas de un estado por fecha (listado filtrado y pendientes de cobro)
+            models.Index(fields=['estado', 'fecha_factura']),
+        ]
 
     # Representación en texto de la factura
     def __str__(self):
         return f"Factura {self.numero_factura}"
 
+class FacturaItemQuerySet(ItemDocumentoQuerySet):
+    # Recalcula el total de la factura tras operaciones masivas sobre sus ítems
+    campo_documento = 'factura'
+
 class FacturaItem(models.Model):
     # Relación con la factura a la que pertenece este ítem
     factura = models.ForeignKey(Factura, related_name='items', on_delete=models.CASCADE)
@@ -45,6 +86,9 @@ class FacturaItem(models.Model):
     # Importe total (cantidad * precio)
     importe = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # Manager que mantiene el total de la factura en bulk_create() y update()
+    objects = FacturaItemQuerySet.as_manager()
+
     # Calcula automáticamente el importe antes de guardar
     def save(self, *args, **kwargs):
         self.importe = self.cantidad * self.precio
@@ -53,3 +97,27 @@ class FacturaItem(models.Model):
     # Representación en texto del ítem
     def __str__(self):
         return f"{self.actividad} - {self.cantidad}"
+
+class VentaMensual(models.Model):
+    # Resumen de lo facturado por área de venta, mes y estado (se mantiene con señales)
+    area_venta = models.ForeignKey(AreaVenta, on_delete=models.CASCADE)
+    # Año y mes de la fecha de las facturas
+    anno = models.IntegerField()
+    mes = models.PositiveSmallIntegerField()
+    # Estado de las facturas resumidas
+    estado = models.ForeignKey(Estado, on_delete=models.CASCADE)
+    # Suma de los totales de las facturas
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Cantidad de facturas
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Una fila por área, mes y estado
+        unique_together = ['area_venta', 'anno', 'mes', 'estado']
+        indexes = [models.Index(fields=['anno', 'mes'])]
+        verbose_name = 'Venta mensual'
+        verbose_name_plural = 'Ventas mensuales'
+
+    # Representación en texto del resumen
+    def __str__(self):
+        return f"{self.area_venta} {self.mes:02d}/{self.anno} {self.estado}: {self.total}"
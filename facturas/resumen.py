@@ -0,0 +1,123 @@
+# Resumen mensual de ventas (VentaMensual)
+#
+# Los reportes de cumplimiento del plan leen de VentaMensual, una tabla pequeña con
+# una fila por área de venta, mes y estado, en lugar de recorrer todas las facturas.
+# Las señales de la app actualizan solo las celdas (área, año, mes, estado) que
+# toca cada cambio; `reconstruir_ventas` la rehace completa desde las facturas.
+from collections import defaultdict  # Diccionarios con valor por defecto
+
+from django.db import transaction  # Transacciones
+from django.db.models import Count, Q, Sum  # Expresiones de consulta
+
+from core import periodos  # Periodos como rangos de fechas
+from .models import Factura, VentaMensual  # Modelos de facturas
+
+CAMPOS_CELDA = ('area_venta_id', 'fecha_factura__year', 'fecha_factura__month', 'estado_id')
+
+
+def celda(factura):
+    """Celda (área, año, mes, estado) a la que suma una factura, o None si no tiene fecha"""
+    if factura.fecha_factura is None:
+        return None
+    return (factura.area_venta_id, factura.fecha_factura.year, factura.fecha_factura.month, factura.estado_id)
+
+
+def celdas_de_facturas(ids):
+    """Celdas a las que suman las facturas indicadas"""
+    return set(
+        Factura.objects.filter(pk__in=ids, fecha_factura__isnull=False)
+        .values_list(*CAMPOS_CELDA).distinct().order_by()
+    )
+
+
+def _agregado(facturas):
+    """Total y cantidad de facturas agrupados por celda"""
+    return {
+        fila[:4]: (fila[4] or 0, fila[5])
+        for fila in facturas.filter(fecha_factura__isnull=False)
+        .values_list(*CAMPOS_CELDA)
+        .annotate(suma=Sum('total'), cantidad=Count('pk'))
+        .order_by()
+    }
+
+
+def _filtro_facturas(celdas):
+    """Q que selecciona las facturas de las celdas indicadas, agrupadas por mes
+
+    Puede traer facturas de otras celdas del mismo mes; se descartan al agregar.
+    """
+    por_mes = defaultdict(lambda: (set(), set()))
+    for area_id, anno, mes, estado_id in celdas:
+        areas, estados = por_mes[(anno, mes)]
+        areas.add(area_id)
+        estados.add(estado_id)
+    filtro = Q(pk__in=[])
+    for (anno, mes), (areas, estados) in por_mes.items():
+        filtro |= periodos.filtro('fecha_factura', anno, mes) & Q(area_venta_id__in=areas, estado_id__in=estados)
+    return filtro
+
+
+def _guardar(filas):
+    """Inserta o actualiza filas de VentaMensual a partir de {celda: (total, cantidad)}"""
+    VentaMensual.objects.bulk_create(
+        [
+            VentaMensual(area_venta_id=area_id, anno=anno, mes=mes, estado_id=estado_id, total=total, cantidad=cantidad)
+            for (area_id, anno, mes, estado_id), (total, cantidad) in filas.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['area_venta', 'anno', 'mes', 'estado'],
+        update_fields=['total', 'cantidad'],
+    )
+
+
+def actualizar_celdas(celdas):
+    """Recalcula desde las facturas solo las celdas indicadas"""
+    celdas = {c for c in celdas if c is not None}
+    if not celdas:
+        return
+
+    with transaction.atomic():
+        # Totales actuales de las facturas de esas celdas (una consulta agrupada)
+        facturas = Factura.objects.filter(_filtro_facturas(celdas))
+        filas = {c: valores for c, valores in _agregado(facturas).items() if c in celdas}
+        if filas:
+            _guardar(filas)
+
+        # Las celdas que se quedaron sin facturas se eliminan
+        vacias = celdas - filas.keys()
+        if vacias:
+            filtro = Q(pk__in=[])
+            for area_id, anno, mes, estado_id in vacias:
+                filtro |= Q(area_venta_id=area_id, anno=anno, mes=mes, estado_id=estado_id)
+            VentaMensual.objects.filter(filtro).delete()
+
+
+def reconstruir_ventas():
+    """Rehace VentaMensual completa a partir de las facturas
+
+    Devuelve la cantidad de filas generadas.
+    """
+    filas = _agregado(Factura.objects.all())
+    with transaction.atomic():
+        VentaMensual.objects.all().delete()
+        if filas:
+            _guardar(filas)
+    return len(filas)
+
+
+def diferencias_ventas():
+    """Celdas en las que VentaMensual no coincide con las facturas
+
+    Devuelve {celda: (guardado, real)} con pares (total, cantidad).
+    """
+    reales = _agregado(Factura.objects.all())
+    guardadas = {
+        fila[:4]: (fila[4], fila[5])
+        for fila in VentaMensual.objects.values_list('area_venta_id', 'anno', 'mes', 'estado_id', 'total', 'cantidad')
+    }
+    vacio = (0, 0)
+    return {
+        c: (guardadas.get(c, vacio), reales.get(c, vacio))
+        for c in reales.keys() | guardadas.keys()
+        if guardadas.get(c, vacio) != reales.get(c, vacio)
+    }
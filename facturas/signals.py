@@ -0,0 +1,75 @@
+# Señales de la aplicación de facturas
+from django.db.models.signals import post_delete, post_save, pre_save  # Señales de modelos
+from django.dispatch import receiver  # Decorador para conectar señales
+
+from core import cache, pdf  # Caché de datos y de PDFs
+from core.totales import recalcular_totales, totales_recalculados  # Totales desnormalizados
+from .models import Estado, Factura, FacturaItem  # Modelos de facturas
+from .resumen import actualizar_celdas, celda, celdas_de_facturas, reconstruir_ventas  # Resumen mensual
+
+
+@receiver(post_save, sender=FacturaItem)
+@receiver(post_delete, sender=FacturaItem)
+def actualizar_total_factura(sender, instance, **kwargs):
+    """Mantiene el total y la cantidad de ítems de la factura al escribir un ítem"""
+    recalcular_totales(Factura, [instance.factura_id])
+
+
+@receiver(post_save, sender=Factura)
+@receiver(post_delete, sender=Factura)
+def invalidar_pdf_factura(sender, instance, **kwargs):
+    """Descarta los PDFs en caché de la factura cuando cambia"""
+    pdf.invalidar('factura', instance.pk)
+
+
+@receiver(post_save, sender=FacturaItem)
+@receiver(post_delete, sender=FacturaItem)
+def invalidar_pdf_item_factura(sender, instance, **kwargs):
+    """Descarta los PDFs en caché de la factura cuando cambia uno de sus ítems"""
+    pdf.invalidar('factura', instance.factura_id)
+
+
+@receiver(pre_save, sender=Factura)
+def recordar_celda_factura(sender, instance, raw=False, **kwargs):
+    """Guarda la celda de VentaMensual en la que sumaba la factura antes del cambio"""
+    instance._celda_anterior = None
+    if instance.pk and not raw:
+        instance._celda_anterior = next(iter(celdas_de_facturas([instance.pk])), None)
+
+
+@receiver(post_save, sender=Factura)
+def actualizar_ventas_factura(sender, instance, raw=False, **kwargs):
+    """Actualiza las celdas de VentaMensual que dejó y a las que pasa la factura"""
+    if not raw:
+        actualizar_celdas({getattr(instance, '_celda_anterior', None), celda(instance)})
+
+
+@receiver(post_delete, sender=Factura)
+def descontar_ventas_factura(sender, instance, **kwargs):
+    """Actualiza la celda de VentaMensual de una factura eliminada"""
+    actualizar_celdas({celda(instance)})
+
+
+@receiver(totales_recalculados, sender=Factura)
+def actualizar_ventas_totales(sender, ids=None, **kwargs):
+    """Lleva a VentaMensual los totales recalculados (al escribir ítems)"""
+    if ids is None:
+        reconstruir_ventas()
+    else:
+        actualizar_celdas(celdas_de_facturas(ids))
+
+
+# Se conectan después de las anteriores para invalidar con el resumen ya actualizado
+@receiver(post_save, sender=Factura)
+@receiver(post_delete, sender=Factura)
+@receiver(totales_recalculados, sender=Factura)
+def invalidar_dashboard(sender, **kwargs):
+    """Los agregados del dashboard dependen de las facturas y sus totales"""
+    cache.invalidar_al_confirmar(cache.DASHBOARD)
+
+
+@receiver(post_save, sender=Estado)
+@receiver(post_delete, sender=Estado)
+def invalidar_estados(sender, **kwargs):
+    """Descarta la lista de estados y los agregados que se agrupan por estado"""
+    cache.invalidar_al_confirmar(cache.ESTADOS, cache.DASHBOARD)
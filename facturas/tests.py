@@ -1,3 +1,500 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from actividades.models import Actividad
+from core import cache, datos_prueba, pdf
+from core.descargas import zip_en_flujo
+from core.models import AreaVenta
+from planes.models import Plan
+from core.pruebas import PEQUENO, ConsultasTestCase
+from core.totales import documentos_con_diferencias, recalcular_totales
+from . import estados, exportacion
+from .agregaciones import matriz_plan_real
+from .filtros import filtrar_facturas
+from .models import Estado, Factura, FacturaItem, VentaMensual
+from .resumen import diferencias_ventas
+
+
+def ultima_factura():
+    return [Factura.objects.latest('pk').pk]
+
+
+class ConsultasFacturasTests(ConsultasTestCase):
+    vistas = (
+        'facturas:dashboard',
+        'facturas:lista_facturas',
+        'facturas:exportar_facturas_pdf',
+        'facturas:exportar_facturas',
+        'facturas:exportar_items_facturas',
+        'facturas:exportar_facturas_obl',
+        'facturas:crear_factura',
+        'facturas:editar_factura',
+        'facturas:agregar_items',
+        'facturas:ver_factura',
+        'facturas:factura_pdf',
+        'facturas:exportar_factura_obl',
+        'facturas:tabla_areas_por_mes',
+    )
+
+    def test_dashboard(self):
+        self.assertConsultas(9, 'facturas:dashboard')
+
+    def test_tabla_areas_por_mes(self):
+        self.assertConsultas(4, 'facturas:tabla_areas_por_mes', datos={'mes': '3'})
+
+    def test_lista_facturas(self):
+        self.assertConsultas(4, 'facturas:lista_facturas')
+
+    def test_lista_facturas_filtrada(self):
+        self.assertConsultas(5, 'facturas:lista_facturas', datos={'estado': 'firmada', 'q': 'cliente'})
+
+    def test_exportar_facturas_pdf(self):
+        self.assertConsultas(6, 'facturas:exportar_facturas_pdf', datos={'limite': '5'})
+
+    def test_exportar_facturas_obl(self):
+        self.assertConsultas(3, 'facturas:exportar_facturas_obl')
+
+    def test_exportar_facturas_obl_zip(self):
+        self.assertConsultas(3, 'facturas:exportar_facturas_obl', datos={'formato': 'zip'})
+
+    def test_crear_factura(self):
+        self.assertConsultas(4, 'facturas:crear_factura')
+
+    def test_crear_factura_post(self):
+        def datos():
+            factura = Factura.objects.latest('pk')
+            return {'area_venta': factura.area_venta_id, 'cliente': factura.cliente_id, 'observaciones': ''}
+
+        self.assertConsultas(13, 'facturas:crear_factura', datos=datos, metodo='post', estado=302)
+
+    def test_editar_factura(self):
+        self.assertConsultas(8, 'facturas:editar_factura', args=ultima_factura)
+
+    def test_editar_factura_post(self):
+        def datos():
+            return {'estado': Estado.objects.get(codigo=Estado.Codigo.FIRMADA).pk, 'observaciones': 'Firmada'}
+
+        self.assertConsultas(12, 'facturas:editar_factura', args=ultima_factura, datos=datos, metodo='post', estado=302)
+
+    def test_editar_factura_agregar_item(self):
+        def datos():
+            usadas = FacturaItem.objects.filter(factura=Factura.objects.latest('pk')).values('actividad')
+            return {'agregar_item': '1', 'actividad': str(Actividad.objects.exclude(pk__in=usadas).latest('pk').pk), 'cantidad': '2'}
+
+        self.assertConsultas(11, 'facturas:editar_factura', args=ultima_factura, datos=datos, metodo='post', estado=302)
+
+    def test_agregar_items(self):
+        self.assertConsultas(6, 'facturas:agregar_items', args=ultima_factura)
+
+    def test_agregar_items_post(self):
+        def datos():
+            usadas = FacturaItem.objects.filter(factura=Factura.objects.latest('pk')).values('actividad')
+            return {'agregar': '1', 'actividad': Actividad.objects.exclude(pk__in=usadas).latest('pk').pk, 'cantidad': '2'}
+
+        self.assertConsultas(13, 'facturas:agregar_items', args=ultima_factura, datos=datos, metodo='post', estado=302)
+
+    def test_ver_factura(self):
+        self.assertConsultas(7, 'facturas:ver_factura', args=ultima_factura)
+
+    def test_factura_pdf(self):
+        self.assertConsultas(5, 'facturas:factura_pdf', args=ultima_factura)
+
+    def test_exportar_factura_obl(self):
+        self.assertConsultas(3, 'facturas:exportar_factura_obl', args=ultima_factura)
+
+    def test_exportar_facturas(self):
+        self.assertConsultas(4, 'facturas:exportar_facturas', datos={'estado': 'firmada', 'q': 'cliente'})
+
+    def test_exportar_facturas_xlsx(self):
+        self.assertConsultas(3, 'facturas:exportar_facturas', datos={'formato': 'xlsx'})
+
+    def test_exportar_items_facturas(self):
+        self.assertConsultas(3, 'facturas:exportar_items_facturas')
+
+    def test_exportar_items_facturas_xlsx(self):
+        self.assertConsultas(4, 'facturas:exportar_items_facturas', datos={'formato': 'xlsx', 'estado': 'firmada'})
+
+
+class BusquedaFacturasTests(TestCase):
+    """Búsqueda del listado sobre el esquema que dejan las migraciones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+
+    def test_buscar_por_numero_cliente_y_area(self):
+        factura = Factura.objects.select_related('cliente', 'area_venta').earliest('pk')
+        for texto in (factura.numero_factura, factura.cliente.nombre, factura.area_venta.nombre):
+            with self.subTest(texto=texto):
+                encontradas = filtrar_facturas({'q': texto})
+                self.assertIn(factura, encontradas)
+                self.assertEqual(
+                    set(encontradas), set(Factura.objects.filter(
+                        Q(numero_factura__icontains=texto) | Q(cliente__nombre__icontains=texto)
+                        | Q(cliente__numero_contrato__icontains=texto) | Q(area_venta__nombre__icontains=texto)
+                    )),
+                )
+
+    def test_buscar_numero_modificado(self):
+        factura = Factura.objects.earliest('pk')
+        Factura.objects.filter(pk=factura.pk).update(numero_factura='ZQX-0001')
+        self.assertEqual(list(filtrar_facturas({'q': 'ZQX-0001'})), [factura])
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class FacturasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('pruebas', 'pruebas@ejemplo.cu', 'pruebas')
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_agregar_item_usa_el_precio_de_la_base(self):
+        factura = Factura.objects.latest('pk')
+        actividad = Actividad.objects.latest('pk')
+        cache.actividades_activas()  # Catálogo en la caché del proceso
+        # Cambio sin señales ni invalidación (como en otro proceso o un cambio masivo)
+        Actividad.objects.filter(pk=actividad.pk).update(precio=Decimal('123.45'))
+        self.client.post(
+            reverse('facturas:editar_factura', args=[factura.pk]),
+            {'agregar_item': '1', 'actividad': actividad.pk, 'cantidad': '2'},
+        )
+        item = factura.items.latest('pk')
+        self.assertEqual((item.actividad_id, item.precio), (actividad.pk, Decimal('123.45')))
+
+    def test_agregar_items_usa_el_precio_de_la_base(self):
+        factura = Factura.objects.latest('pk')
+        actividad = Actividad.objects.filter(activo=True).exclude(
+            pk__in=factura.items.values('actividad')
+        ).latest('pk')
+        Actividad.objects.filter(pk=actividad.pk).update(precio=Decimal('67.89'))
+        self.client.post(
+            reverse('facturas:agregar_items', args=[factura.pk]),
+            {'agregar': '1', 'actividad': actividad.pk, 'cantidad': '1'},
+        )
+        item = factura.items.latest('pk')
+        self.assertEqual((item.actividad_id, item.precio), (actividad.pk, Decimal('67.89')))
+
+    def test_dashboard_se_invalida_al_confirmar(self):
+        factura = Factura.objects.latest('pk')
+        version = cache.version(cache.DASHBOARD)
+        with self.captureOnCommitCallbacks(execute=True):
+            factura.observaciones = 'Cambiada'
+            factura.save()
+            FacturaItem.objects.filter(factura=factura).update(cantidad=1)
+            # Otras peticiones no deben guardar en la versión nueva datos aún sin confirmar
+            self.assertEqual(cache.version(cache.DASHBOARD), version)
+        self.assertNotEqual(cache.version(cache.DASHBOARD), version)
+
+    def test_estados_no_quedan_desactualizados(self):
+        cache.invalidar(cache.ESTADOS)
+        firmada = Estado.objects.get(codigo='firmada')
+        self.assertIn(firmada.pk, estados.ids_ventas())
+        # Guardar un estado invalida la caché (señales) al confirmar la transacción
+        firmada.cuenta_como_venta = False
+        with self.captureOnCommitCallbacks(execute=True):
+            firmada.save()
+        self.assertNotIn(firmada.pk, estados.ids_ventas())
+        # Un cambio que este proceso no ve (otro worker) se lee al caducar la entrada
+        Estado.objects.filter(pk=firmada.pk).update(cuenta_como_venta=True)
+        self.assertNotIn(firmada.pk, estados.ids_ventas())
+        cache.cache.delete(cache.clave(cache.ESTADOS, 'por_id'))
+        self.assertIn(firmada.pk, estados.ids_ventas())
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class TotalesTests(TestCase):
+    """Totales desnormalizados (core.totales) mantenidos al escribir ítems"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+        cls.actividades = list(Actividad.objects.order_by('pk')[:3])
+
+    def nueva_factura(self, numero):
+        base = Factura.objects.earliest('pk')
+        return Factura.objects.create(
+            numero_factura=numero, fecha_factura=base.fecha_factura, area_venta_id=base.area_venta_id,
+            cliente_id=base.cliente_id, created_by_id=base.created_by_id,
+        )
+
+    def totales(self, factura):
+        return Factura.objects.values_list('total', 'num_items').get(pk=factura.pk)
+
+    def test_operaciones_masivas_sobre_items(self):
+        factura = self.nueva_factura('T-0001')
+        a, b, c = self.actividades
+        FacturaItem.objects.bulk_create([
+            FacturaItem(factura=factura, actividad=a, cantidad=2, precio=Decimal('10.00')),
+            FacturaItem(factura=factura, actividad=b, cantidad=1, precio=Decimal('5.50')),
+        ])
+        self.assertEqual(self.totales(factura), (Decimal('25.50'), 2))
+
+        # El importe se recalcula en la misma sentencia UPDATE
+        factura.items.filter(actividad=a).update(cantidad=3)
+        self.assertEqual(factura.items.get(actividad=a).importe, Decimal('30.00'))
+        factura.items.filter(actividad=b).update(precio=Decimal('1.25'))
+        self.assertEqual(self.totales(factura), (Decimal('31.25'), 2))
+
+        FacturaItem.objects.create(factura=factura, actividad=c, cantidad=4, precio=Decimal('0.75'))
+        self.assertEqual(self.totales(factura), (Decimal('34.25'), 3))
+
+        factura.items.filter(actividad__in=[a, c]).delete()
+        self.assertEqual(self.totales(factura), (Decimal('1.25'), 1))
+        factura.items.get().delete()
+        self.assertEqual(self.totales(factura), (Decimal('0.00'), 0))
+
+    def test_mover_items_a_otra_factura(self):
+        origen = self.nueva_factura('T-0004')
+        destino = self.nueva_factura('T-0005')
+        a, b, c = self.actividades
+        FacturaItem.objects.bulk_create([
+            FacturaItem(factura=origen, actividad=a, cantidad=2, precio=Decimal('10.00')),
+            FacturaItem(factura=origen, actividad=b, cantidad=1, precio=Decimal('5.50')),
+            FacturaItem(factura=destino, actividad=c, cantidad=1, precio=Decimal('1.00')),
+        ])
+        # Con la instancia del documento o con su id
+        origen.items.filter(actividad=a).update(factura=destino)
+        self.assertEqual(self.totales(origen), (Decimal('5.50'), 1))
+        self.assertEqual(self.totales(destino), (Decimal('21.00'), 2))
+        origen.items.update(factura_id=destino.pk)
+        self.assertEqual(self.totales(origen), (Decimal('0.00'), 0))
+        self.assertEqual(self.totales(destino), (Decimal('26.50'), 3))
+        self.assertFalse(documentos_con_diferencias(Factura).exists())
+        self.assertEqual(diferencias_ventas(), {})
+
+    def test_copiar_de(self):
+        origen = Factura.objects.filter(num_items__gt=1).earliest('pk')
+        destino = self.nueva_factura('T-0002')
+        FacturaItem.objects.copiar_de(origen.items.all(), factura=destino)
+        self.assertEqual(self.totales(destino), self.totales(origen))
+        self.assertEqual(
+            list(destino.items.order_by('pk').values_list('actividad_id', 'cantidad', 'precio', 'importe')),
+            list(origen.items.order_by('pk').values_list('actividad_id', 'cantidad', 'precio', 'importe')),
+        )
+
+    def test_guardar_documento_no_pisa_los_totales(self):
+        factura = self.nueva_factura('T-0003')
+        desactualizada = Factura.objects.get(pk=factura.pk)
+        FacturaItem.objects.create(factura=factura, actividad=self.actividades[0], cantidad=1, precio=Decimal('9.99'))
+        # La copia en memoria aún tiene total 0: guardarla no debe borrar el total real
+        desactualizada.observaciones = 'Editada'
+        desactualizada.save()
+        self.assertEqual(self.totales(factura), (Decimal('9.99'), 1))
+        self.assertEqual(Factura.objects.get(pk=factura.pk).observaciones, 'Editada')
+
+    def test_sin_diferencias(self):
+        self.assertFalse(documentos_con_diferencias(Factura).exists())
+        Factura.objects.filter(pk=Factura.objects.earliest('pk').pk).update(total=0)
+        self.assertEqual(documentos_con_diferencias(Factura).count(), 1)
+        recalcular_totales(Factura)
+        self.assertFalse(documentos_con_diferencias(Factura).exists())
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class VentaMensualTests(TestCase):
+    """Celdas del resumen mensual actualizadas por las señales de facturas e ítems"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+        cls.area, cls.otra_area = AreaVenta.objects.order_by('pk')[:2]
+        cls.no_firmada = Estado.objects.get(codigo=Estado.Codigo.NO_FIRMADA)
+        cls.firmada = Estado.objects.get(codigo=Estado.Codigo.FIRMADA)
+        cls.actividad = Actividad.objects.earliest('pk')
+
+    def setUp(self):
+        base = Factura.objects.earliest('pk')
+        self.factura = Factura.objects.create(
+            numero_factura='V-0001', fecha_factura=date(2001, 1, 15), area_venta=self.area,
+            cliente_id=base.cliente_id, created_by_id=base.created_by_id, estado=self.no_firmada,
+        )
+        FacturaItem.objects.create(factura=self.factura, actividad=self.actividad, cantidad=2, precio=Decimal('10.00'))
+        self.factura.refresh_from_db()
+
+    def ventas(self):
+        """Celdas de 2001: {(área, mes, estado): (total, cantidad)}"""
+        return {
+            (area_id, mes, estado_id): (total, cantidad)
+            for area_id, mes, estado_id, total, cantidad in VentaMensual.objects.filter(anno=2001).values_list(
+                'area_venta_id', 'mes', 'estado_id', 'total', 'cantidad'
+            )
+        }
+
+    def tearDown(self):
+        # Tras cada cambio incremental el resumen coincide con una reconstrucción completa
+        self.assertEqual(diferencias_ventas(), {})
+
+    def test_alta_de_factura_e_items(self):
+        self.assertEqual(self.ventas(), {(self.area.pk, 1, self.no_firmada.pk): (Decimal('20.00'), 1)})
+        FacturaItem.objects.bulk_create([
+            FacturaItem(factura=self.factura, actividad=self.actividad, cantidad=1, precio=Decimal('5.00')),
+        ])
+        self.factura.items.filter(precio=Decimal('10.00')).update(cantidad=3)
+        self.assertEqual(self.ventas(), {(self.area.pk, 1, self.no_firmada.pk): (Decimal('35.00'), 1)})
+
+    def test_cambio_de_estado_area_y_fecha(self):
+        self.factura.estado = self.firmada
+        self.factura.save()
+        self.assertEqual(self.ventas(), {(self.area.pk, 1, self.firmada.pk): (Decimal('20.00'), 1)})
+        self.factura.area_venta = self.otra_area
+        self.factura.save()
+        self.assertEqual(self.ventas(), {(self.otra_area.pk, 1, self.firmada.pk): (Decimal('20.00'), 1)})
+        self.factura.fecha_factura = date(2001, 2, 1)
+        self.factura.save()
+        self.assertEqual(self.ventas(), {(self.otra_area.pk, 2, self.firmada.pk): (Decimal('20.00'), 1)})
+        # Sin fecha la factura no suma a ningún mes
+        self.factura.fecha_factura = None
+        self.factura.save()
+        self.assertEqual(self.ventas(), {})
+
+    def test_celda_compartida(self):
+        base = Factura.objects.earliest('pk')
+        otra = Factura.objects.create(
+            numero_factura='V-0002', fecha_factura=date(2001, 1, 31), area_venta=self.area,
+            cliente_id=base.cliente_id, created_by_id=base.created_by_id, estado=self.no_firmada,
+        )
+        FacturaItem.objects.create(factura=otra, actividad=self.actividad, cantidad=1, precio=Decimal('1.50'))
+        self.assertEqual(self.ventas(), {(self.area.pk, 1, self.no_firmada.pk): (Decimal('21.50'), 2)})
+        # Quitar una factura de la celda no borra la de la otra
+        self.factura.estado = self.firmada
+        self.factura.save()
+        self.assertEqual(self.ventas(), {
+            (self.area.pk, 1, self.no_firmada.pk): (Decimal('1.50'), 1),
+            (self.area.pk, 1, self.firmada.pk): (Decimal('20.00'), 1),
+        })
+        otra.items.all().delete()
+        self.assertEqual(self.ventas()[(self.area.pk, 1, self.no_firmada.pk)], (Decimal('0.00'), 1))
+        otra.delete()
+        self.assertEqual(self.ventas(), {(self.area.pk, 1, self.firmada.pk): (Decimal('20.00'), 1)})
+
+    def test_baja_de_factura(self):
+        self.factura.delete()
+        self.assertEqual(self.ventas(), {})
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class MatrizPlanRealTests(TestCase):
+    """Valores de la matriz plan vs. real con un año de datos calculados a mano"""
+
+    ANNO = 2001  # Año sin datos de prueba sembrados
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+        cls.norte = AreaVenta.objects.create(nombre='Área Norte')
+        cls.sur = AreaVenta.objects.create(nombre='Área Sur')  # Sin plan
+        for mes, plan in ((1, '100.00'), (2, '200.00'), (12, '50.00')):  # Marzo sin plan
+            Plan.objects.create(area_venta=cls.norte, anno=cls.ANNO, mes=mes, plan=Decimal(plan))
+        facturas = [
+            (cls.norte, 1, 'firmada', 2, '30.00'),
+            (cls.norte, 1, 'no_firmada', 1, '40.00'),  # No cuenta como venta
+            (cls.norte, 2, 'pagada', 1, '250.00'),
+            (cls.norte, 3, 'firmada', 1, '10.00'),
+            (cls.sur, 2, 'firmada', 1, '80.00'),
+        ]
+        base = Factura.objects.earliest('pk')
+        actividad = Actividad.objects.earliest('pk')
+        for numero, (area, mes, estado, cantidad, precio) in enumerate(facturas, 1):
+            factura = Factura.objects.create(
+                numero_factura=f'M-{numero:04d}', fecha_factura=date(cls.ANNO, mes, 15), area_venta=area,
+                cliente_id=base.cliente_id, created_by_id=base.created_by_id, estado=Estado.objects.get(codigo=estado),
+            )
+            FacturaItem.objects.create(factura=factura, actividad=actividad, cantidad=cantidad, precio=Decimal(precio))
+
+    def fila(self, filas, nombre):
+        return next(fila for fila in filas if fila['area_venta__nombre'] == nombre)
+
+    def test_real_y_plan(self):
+        matriz = matriz_plan_real(self.ANNO)
+        norte = self.norte.pk
+        self.assertEqual(matriz.cobrado_por_mes(norte)[:4], [Decimal('60.00'), Decimal('250.00'), Decimal('10.00'), 0])
+        self.assertEqual(matriz.real(norte, 1, 1), Decimal('100.00'))  # Con la no firmada
+        self.assertEqual(matriz.ventas(norte), Decimal('320.00'))
+        self.assertEqual(matriz.plan(norte), Decimal('350.00'))
+        self.assertEqual(matriz.plan(norte, 3, 3), 0)
+        self.assertEqual(matriz.plan(self.sur.pk), 0)
+
+    def test_tabla_areas(self):
+        filas = matriz_plan_real(self.ANNO).tabla_areas(2)
+        norte = self.fila(filas, 'Área Norte')
+        self.assertEqual(
+            [norte[clave] for clave in ('plan_mensual', 'real_mes', 'plan_acumulado', 'real_acumulado', 'plan_anual', 'real_anual')],
+            [Decimal('200.00'), Decimal('250.00'), Decimal('300.00'), Decimal('310.00'), Decimal('350.00'), Decimal('320.00')],
+        )
+        self.assertEqual(norte['cumplimiento'], Decimal('125'))
+        # Como en el cálculo original: real del año sobre plan acumulado hasta el mes
+        self.assertEqual(round(norte['cumplimiento_acum'], 2), Decimal('106.67'))
+        self.assertEqual(round(norte['cumplimiento_anual'], 2), Decimal('91.43'))
+
+        sur = self.fila(filas, 'Área Sur')
+        self.assertEqual((sur['real_mes'], sur['real_anual']), (Decimal('80.00'), Decimal('80.00')))
+        self.assertEqual((sur['cumplimiento'], sur['cumplimiento_acum'], sur['cumplimiento_anual']), (0, 0, 0))
+
+        total = filas[-1]
+        self.assertTrue(total['is_total'])
+        self.assertEqual((total['real_mes'], total['real_anual']), (Decimal('330.00'), Decimal('400.00')))
+        self.assertEqual(total['cumplimiento'], Decimal('165'))
+        self.assertEqual(round(total['cumplimiento_acum'], 2), Decimal('133.33'))
+        self.assertEqual(round(total['cumplimiento_anual'], 2), Decimal('114.29'))
+
+    def test_mes_sin_plan(self):
+        matriz = matriz_plan_real(self.ANNO)
+        norte = self.fila(matriz.tabla_areas(3), 'Área Norte')
+        self.assertEqual((norte['plan_mensual'], norte['real_mes'], norte['cumplimiento']), (0, Decimal('10.00'), 0))
+        self.assertEqual(round(norte['cumplimiento_acum'], 2), Decimal('106.67'))
+        # Columna "Real Año" hasta el mes (tabla por mes del dashboard)
+        hasta_febrero = self.fila(matriz.tabla_areas(2, real_anual_hasta=2), 'Área Norte')
+        self.assertEqual(hasta_febrero['real_anual'], Decimal('310.00'))
+        self.assertEqual(round(hasta_febrero['cumplimiento_acum'], 2), Decimal('103.33'))
+
+
+@skipUnless(pdf.disponible(), 'Requiere xhtml2pdf')
+@override_settings(METRICAS_ACTIVAS=False, PDF_EJECUTOR='thread')
+class ExportacionPdfTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+
+    def setUp(self):
+        media = override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='facil-pruebas-'))
+        media.enable()
+        self.addCleanup(shutil.rmtree, settings.MEDIA_ROOT, ignore_errors=True)
+        self.addCleanup(media.disable)
+
+    def test_pdf_eliminado_antes_de_leerlo_se_regenera(self):
+        ids = list(Factura.objects.order_by('pk').values_list('pk', flat=True)[:3])
+        list(exportacion.pdfs_facturas(exportacion.facturas_para_imprimir(ids)))  # PDFs en caché
+        leer = exportacion._leer
+        eliminados = []
+
+        def invalidado_antes_de_leer(ruta):
+            # Otra petición cambia la factura y borra su PDF (pdf.invalidar) antes de la lectura
+            if not eliminados:
+                eliminados.append(ruta)
+                Path(ruta).unlink()
+            return leer(ruta)
+
+        with mock.patch.object(exportacion, '_leer', side_effect=invalidado_antes_de_leer):
+            archivos = list(exportacion.pdfs_facturas(exportacion.facturas_para_imprimir(ids)))
+        self.assertEqual(len(eliminados), 1)
+        self.assertEqual(len(archivos), 3)
+        for nombre, contenido in archivos:
+            self.assertTrue(nombre.endswith('.pdf'))
+            self.assertTrue(contenido.startswith(b'%PDF'))
+        with zipfile.ZipFile(io.BytesIO(b''.join(zip_en_flujo(archivos)))) as libro:
+            self.assertEqual(sorted(libro.namelist()), sorted(nombre for nombre, _ in archivos))
@@ -13,6 +13,16 @@ urlpatterns = [
     # Lista de todas las facturas
     path('facturas/', views.lista_facturas, name='lista_facturas'),
     
+    # Descargar en un ZIP los PDFs de las facturas filtradas
+    path('facturas/exportar-pdf/', views.exportar_facturas_pdf, name='exportar_facturas_pdf'),
+    
+    # Descargar en CSV o XLSX las facturas filtradas y sus ítems
+    path('facturas/exportar/', views.exportar_facturas, name='exportar_facturas'),
+    path('facturas/exportar-items/', views.exportar_items_facturas, name='exportar_items_facturas'),
+    
+    # Exportar a VERSAT (.obl) las facturas filtradas
+    path('facturas/exportar-obl/', views.exportar_facturas_obl, name='exportar_facturas_obl'),
+    
     # Crear una nueva factura
     path('facturas/crear/', views.crear_factura, name='crear_factura'),
     
@@ -1,43 +1,38 @@
 # Importaciones necesarias de Django y otros módulos
 from django.shortcuts import render, get_object_or_404, redirect  # Funciones útiles de Django
 from django.contrib.auth.decorators import login_required, permission_required  # Para proteger vistas
-from django.http import HttpResponse, JsonResponse  # Para respuestas HTTP
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse  # Para respuestas HTTP
 from django.template.loader import get_template  # Para cargar plantillas
 from django.contrib import messages  # Para mensajes flash
-from django.db import models  # Para operaciones de base de datos
-from django.db.models import Sum, Count  # Para agregaciones
 from django.utils import timezone  # Para manejo de fechas
 from datetime import datetime  # Para operaciones con fechas
 from decimal import Decimal
-
-# Importación condicional para generación de PDFs
-try:
-    from xhtml2pdf import pisa  # Para generar PDFs
-    from io import BytesIO  # Para manejo de bytes en memoria
-except ImportError:
-    pisa = None
-    BytesIO = None
+from itertools import chain  # Para encadenar iteradores
 
 # Importación de modelos y formularios
 from .models import Factura, FacturaItem, Estado  # Modelos de facturas
 from .forms import FacturaForm, FacturaItemForm, FacturaEditForm  # Formularios
-from core.models import Empresa, AreaVenta  # Modelos del núcleo
+from core.models import AreaVenta  # Modelos del núcleo
 from clientes.models import Cliente  # Modelo de clientes
-from actividades.models import Actividad  # Modelo de actividades
-from planes.models import Plan  # Modelo de planes
+from actividades import historial  # Precio actual de las actividades
+from core.paginacion import paginar  # Paginación por cursor
+from core import cache, pdf, secuencias  # Caché, generación de PDFs y numeración de documentos
+from . import estados as estados_factura  # Estados de factura por código
+from .agregaciones import matriz_en_cache, resumen_en_cache  # Matriz plan vs. real y conteos
+from .filtros import filtrar_facturas, parametros_facturas  # Filtros del listado
+from .exportacion import (  # Exportaciones de facturas
+    COLUMNAS_FACTURAS, COLUMNAS_ITEMS, LOTE_MAXIMO, contenido_obl, facturas_para_imprimir, html_factura,
+    lote_facturas, nombre_obl, nombre_pdf, obl_concatenado, obl_zip, pdfs_facturas,
+)
+from core.descargas import formato_tabla, respuesta_tabla, zip_en_flujo  # Descargas en flujo
 
 @login_required
 @permission_required('facturas.view_factura', raise_exception=True)
 def dashboard(request):
     """Vista del panel de control principal"""
     
-    # Obtener estadísticas básicas
-    total_clients = Cliente.objects.filter(activo=True).count()  # Total de clientes activos
-    total_invoices = Factura.objects.filter(fecha_factura__year=datetime.now().year).count()  # Facturas del año
-    invoices_this_month = Factura.objects.filter(
-        fecha_factura__year=datetime.now().year, 
-        fecha_factura__month=datetime.now().month
-    ).count()  # Facturas del mes actual
+    # Total de clientes activos
+    total_clients = Cliente.objects.filter(activo=True).count()
     
     # Información de mes y año actual
     current_year = datetime.now().year
@@ -46,147 +41,23 @@ def dashboard(request):
     year_start = datetime(current_year, 1, 1).date()
     dias_transcurridos = (current_date - year_start).days
 
-    # Obtener todas las áreas de venta
-    todas_areas = AreaVenta.objects.all().order_by('nombre')
-    
-    # Construir tabla con datos por área de venta
-    invoices_by_area = []
-    plan_mensual_total = Decimal('0')
-    real_mes_total = Decimal('0')
-    plan_acumulado_total = Decimal('0')
-    plan_anual_total = Decimal('0')
-    real_anual_total = Decimal('0')
-    
-    for area in todas_areas:
-        # Plan mensual (mes actual)
-        plan_mes = Plan.objects.filter(
-            area_venta=area,
-            anno=current_year,
-            mes=current_month
-        ).aggregate(total=Sum('plan'))['total'] or Decimal('0')
-        
-        # Real del mes actual (firmadas + pagadas)
-        real_mes = Factura.objects.filter(
-            area_venta=area,
-            fecha_factura__year=current_year,
-            fecha_factura__month=current_month
-        ).exclude(
-            estado__nombre__iexact='no firmada'
-        ).aggregate(total=Sum('items__importe'))['total'] or Decimal('0')
-        
-        # % de cumplimiento (real_mes / plan_mes * 100)
-        cumplimiento = Decimal('0')
-        if plan_mes > 0:
-            cumplimiento = (real_mes / plan_mes) * 100
-        
-        # Plan acumulado (suma de planes desde enero hasta mes actual)
-        plan_acum = Plan.objects.filter(
-            area_venta=area,
-            anno=current_year,
-            mes__lte=current_month
-        ).aggregate(total=Sum('plan'))['total'] or Decimal('0')
-        
-        # Plan anual (suma de todos los planes del año)
-        plan_anual = Plan.objects.filter(
-            area_venta=area,
-            anno=current_year
-        ).aggregate(total=Sum('plan'))['total'] or Decimal('0')
-        
-        # Real anual (sum de facturas del año)
-        real_anual = Factura.objects.filter(
-            area_venta=area,
-            fecha_factura__year=current_year
-        ).exclude(
-            estado__nombre__iexact='no firmada'
-        ).aggregate(total=Sum('items__importe'))['total'] or Decimal('0')
-        
-        # % cumplimiento acumulado (real_anual / plan_acum * 100)
-        cumplimiento_acum = Decimal('0')
-        if plan_acum > 0:
-            cumplimiento_acum = (real_anual / plan_acum) * 100
-        
-        # % cumplimiento anual (real_anual / plan_anual * 100)
-        cumplimiento_anual = Decimal('0')
-        if plan_anual > 0:
-            cumplimiento_anual = (real_anual / plan_anual) * 100
-        
-        invoices_by_area.append({
-            'area_venta__nombre': area.nombre,
-            'plan_mensual': plan_mes,
-            'real_mes': real_mes,
-            'cumplimiento': cumplimiento,
-            'plan_acumulado': plan_acum,
-            'plan_anual': plan_anual,
-            'real_anual': real_anual,
-            'cumplimiento_acum': cumplimiento_acum,
-            'cumplimiento_anual': cumplimiento_anual
-        })
-        
-        # Acumular totales
-        plan_mensual_total += plan_mes
-        real_mes_total += real_mes
-        plan_acumulado_total += plan_acum
-        plan_anual_total += plan_anual
-        real_anual_total += real_anual
-    
-    # Agregar fila de totales
-    cumplimiento_total = Decimal('0')
-    if plan_mensual_total > 0:
-        cumplimiento_total = (real_mes_total / plan_mensual_total) * 100
-    
-    cumplimiento_acum_total = Decimal('0')
-    if plan_acumulado_total > 0:
-        cumplimiento_acum_total = (real_anual_total / plan_acumulado_total) * 100
-    
-    cumplimiento_anual_total = Decimal('0')
-    if plan_anual_total > 0:
-        cumplimiento_anual_total = (real_anual_total / plan_anual_total) * 100
-    
-    invoices_by_area.append({
-        'area_venta__nombre': 'TOTAL',
-        'plan_mensual': plan_mensual_total,
-        'real_mes': real_mes_total,
-        'cumplimiento': cumplimiento_total,
-        'plan_acumulado': plan_acumulado_total,
-        'plan_anual': plan_anual_total,
-        'real_anual': real_anual_total,
-        'cumplimiento_acum': cumplimiento_acum_total,
-        'cumplimiento_anual': cumplimiento_anual_total,
-        'is_total': True
-    })
-
-    # Preparar datos para gráficos
-    invoices_per_month = Factura.objects.filter(
-        fecha_factura__year=datetime.now().year
-    ).values('fecha_factura__month').annotate(
-        count=Count('id')  # Contar facturas por mes
-    ).order_by('fecha_factura__month')
-
-    # Obtener datos de montos por mes (solo facturas FIRMADA o PAGADA)
-    from django.db.models import Q
-    amount_data = Factura.objects.filter(
-        fecha_factura__year=datetime.now().year
-    ).filter(
-        Q(estado__nombre__iexact='FIRMADA') | Q(estado__nombre__iexact='PAGADA')
-    ).values('fecha_factura__month').annotate(
-        total=Sum('items__importe')  # Suma de importes por mes
-    ).order_by('fecha_factura__month')
-    
-    # Crear diccionario de meses para búsqueda rápida
-    amount_dict = {item['fecha_factura__month']: float(item['total'] or 0) for item in amount_data}
-    
-    # Crear lista con todos los 12 meses (incluyendo los que no tienen datos)
+    # Matriz plan vs. real y conteos de facturas del año (desde la caché si no hubo cambios)
+    matriz = matriz_en_cache(current_year)
+    resumen = resumen_en_cache(current_year, current_month)
+
+    # Construir tabla con datos por área de venta (la última fila contiene los totales)
+    invoices_by_area = matriz.tabla_areas(current_month)
+
+    # Montos por mes (solo facturas FIRMADA o PAGADA), tomados de la matriz
     amount_per_month = [
-        {'fecha_factura__month': mes, 'total': float(amount_dict.get(mes, 0))}
-        for mes in range(1, 13)
+        {'fecha_factura__month': mes, 'total': float(total)}
+        for mes, total in zip(range(1, 13), matriz.cobrado_por_mes())
     ]
 
     # Facturas que están en estado "FIRMADA" (pendientes por cobrar según lo solicitado)
-    signed_qs = Factura.objects.filter(estado__nombre__iexact='firmada')
-    signed_count = signed_qs.count()
-    signed_total = signed_qs.aggregate(total=Sum('items__importe'))['total'] or Decimal('0')
+    signed_total = resumen['signed_total']
     # ID del estado 'FIRMADA' para construir enlaces desde el dashboard
-    signed_estado = Estado.objects.filter(nombre__iexact='firmada').first()
+    signed_estado = estados_factura.por_codigo(Estado.Codigo.FIRMADA)
     signed_estado_id = signed_estado.id if signed_estado else None
     # Param usable en URL: si existe id, usarlo; si no, pasar el nombre para filtrar por nombre
     signed_estado_param = signed_estado_id if signed_estado_id else 'firmada'
@@ -203,11 +74,7 @@ def dashboard(request):
     cuentas_por_cobrar = signed_total  # Ya calculado arriba
     
     # Ventas del año (firmadas + pagadas)
-    ventas_del_anio = Factura.objects.filter(
-        fecha_factura__year=current_year
-    ).exclude(
-        estado__nombre__iexact='no firmada'
-    ).aggregate(total=Sum('items__importe'))['total'] or Decimal('0')
+    ventas_del_anio = sum((matriz.ventas(area_id) for area_id, _ in matriz.areas), Decimal('0'))
     
     # Calcular ciclo de cobro
     if ventas_del_anio > 0 and dias_transcurridos > 0:
@@ -218,35 +85,13 @@ def dashboard(request):
 
     # Datos de facturado por área de venta (con detalles por mes)
     amount_by_area = []
-    for area in todas_areas:
-        # Total anual del área
-        area_total = Factura.objects.filter(
-            area_venta=area,
-            fecha_factura__year=current_year
-        ).filter(
-            Q(estado__nombre__iexact='FIRMADA') | Q(estado__nombre__iexact='PAGADA')
-        ).aggregate(total=Sum('items__importe'))['total'] or 0
-        
-        # Datos por mes para esta área
-        monthly_data = Factura.objects.filter(
-            area_venta=area,
-            fecha_factura__year=current_year
-        ).filter(
-            Q(estado__nombre__iexact='FIRMADA') | Q(estado__nombre__iexact='PAGADA')
-        ).values('fecha_factura__month').annotate(
-            total=Sum('items__importe')
-        ).order_by('fecha_factura__month')
-        
-        # Crear diccionario de meses para esta área
-        monthly_dict = {item['fecha_factura__month']: float(item['total'] or 0) for item in monthly_data}
-        
-        # Crear lista de 12 meses para esta área
-        months_list = [float(monthly_dict.get(mes, 0)) for mes in range(1, 13)]
-        
+    for area_id, area_nombre in matriz.areas:
+        # Lista de 12 valores (uno por mes) para esta área
+        months_list = [float(total) for total in matriz.cobrado_por_mes(area_id)]
         amount_by_area.append({
-            'area_venta__nombre': area.nombre,
-            'total': float(area_total) if area_total else 0,
-            'monthly_data': months_list  # Lista de 12 valores (uno por mes)
+            'area_venta__nombre': area_nombre,
+            'total': sum(months_list),
+            'monthly_data': months_list
         })
 
     # Nombre del mes actual
@@ -257,17 +102,13 @@ def dashboard(request):
     # Preparar datos para la plantilla
     context = {
         'total_clients': total_clients,  # Total de clientes activos
-        'total_invoices': total_invoices,  # Total de facturas del año
-        'invoices_this_month': invoices_this_month,  # Facturas del mes actual
-        'signed_count': signed_count,
-        'signed_total': signed_total,
+        **resumen,  # Facturas del año, del mes, por mes y firmadas (cantidad e importe)
         'signed_estado_id': signed_estado_id,
         'signed_estado_param': signed_estado_param,
         'ciclo_cobro': ciclo_cobro,  # Ciclo de cobro en días
         'total_facturado': total_facturado,  # Monto total facturado en el año
         'invoices_by_area': invoices_by_area,  # Totales por área de venta
         'amount_by_area': amount_by_area,  # Montos facturados por área de venta
-        'invoices_per_month': invoices_per_month,  # Facturas por mes para gráfico
         'amount_per_month': amount_per_month,  # Montos por mes para gráfico
         'current_month_name': current_month_name,  # Nombre del mes actual
         'current_month': current_month,  # Número del mes actual (1-12)
@@ -279,53 +120,23 @@ def dashboard(request):
 def lista_facturas(request):
     """Vista para mostrar y filtrar la lista de facturas"""
     
-    # Obtener parámetros de filtrado
-    query = request.GET.get('q', '')  # Búsqueda general
-    estado_id = request.GET.get('estado', '')  # Filtro por estado (id o nombre)
-    fecha_inicial = request.GET.get('fecha_inicial', '')  # Fecha desde
-    fecha_final = request.GET.get('fecha_final', '')  # Fecha hasta
-
-    # Obtener todas las facturas ordenadas por fecha descendente
-    facturas = Factura.objects.all().order_by('-fecha_factura')
-
-    # Aplicar filtro de búsqueda si existe
-    if query:
-        facturas = facturas.filter(
-            models.Q(numero_factura__icontains=query) |  # Buscar en número
-            models.Q(cliente__nombre__icontains=query) |  # Buscar en nombre de cliente
-            models.Q(area_venta__nombre__icontains=query)  # Buscar en área de venta
-        )
-
-    # Filtrar por estado si se especifica. `estado` puede ser id o nombre.
-    if estado_id:
-        # Si es dígitos, tratarlo como ID
-        if estado_id.isdigit():
-            facturas = facturas.filter(estado_id=int(estado_id))
-        else:
-            # Filtrar por nombre (case-insensitive)
-            facturas = facturas.filter(estado__nombre__iexact=estado_id)
+    # Obtener parámetros de filtrado (q, estado, fecha_inicial, fecha_final)
+    parametros = parametros_facturas(request.GET)
 
-    # Filtrar por rango de fechas
-    if fecha_inicial:
-        facturas = facturas.filter(fecha_factura__gte=fecha_inicial)  # Desde fecha inicial
-    if fecha_final:
-        facturas = facturas.filter(fecha_factura__lte=fecha_final)  # Hasta fecha final
+    # Obtener las facturas filtradas con sus relaciones (cliente, área y estado) en la misma consulta
+    facturas = filtrar_facturas(request.GET, Factura.objects.select_related('cliente', 'area_venta', 'estado'))
 
-    # Calcular el total para cada factura
-    for factura in facturas:
-        items = factura.items.all()  # Obtener items de la factura
-        factura.total = sum(item.importe for item in items)  # Calcular suma total
+    # Paginar por cursor en orden descendente de (fecha_factura, id)
+    pagina = paginar(request, facturas, 'fecha_factura')
 
     # Obtener todos los estados posibles para el filtro
-    estados = Estado.objects.all()
+    estados = cache.estados()
 
     # Preparar contexto para la plantilla
     context = {
-        'facturas': facturas,  # Lista de facturas filtradas
-        'query': query,  # Término de búsqueda
-        'estado_id': estado_id,  # Estado seleccionado
-        'fecha_inicial': fecha_inicial,  # Fecha inicial del filtro
-        'fecha_final': fecha_final,  # Fecha final del filtro
+        'facturas': pagina,  # Página actual de facturas filtradas
+        'pagina': pagina,  # Cursores de navegación entre páginas
+        **parametros,  # Término de búsqueda, estado y fechas seleccionados
         'estados': estados,  # Lista de estados posibles
     }
     return render(request, 'facturas/lista_facturas.html', context)
@@ -342,21 +153,12 @@ def crear_factura(request):
             factura = form.save(commit=False)
             factura.created_by = request.user  # Asignar usuario creador
             
-            # Generar número único de factura (formato: AAAA-NNNN)
-            year = datetime.now().year
-            # Buscar última factura del año para continuar la numeración
-            last_factura = Factura.objects.filter(fecha_factura__year=year).order_by('-numero_factura').first()
-            if last_factura:
-                numero = int(last_factura.numero_factura.split('-')[1]) + 1  # Incrementar último número
-            else:
-                numero = 1  # Primera factura del año
-                
-            # Asignar número de factura con formato año-número
-            factura.numero_factura = f"{year}-{numero:04d}"
+            # Asignar número único de factura (formato: AAAA-NNNN) desde la secuencia del año
+            factura.numero_factura = secuencias.siguiente_numero(secuencias.FACTURA)
             factura.save()  # Guardar la factura
             
             messages.success(request, 'Factura creada exitosamente.')  # Mensaje de éxito
-            return redirect('agregar_items', factura_id=factura.id)  # Ir a agregar items
+            return redirect('facturas:agregar_items', factura_id=factura.id)  # Ir a agregar items
     else:
         # Si es GET, mostrar formulario vacío
         form = FacturaForm()
@@ -377,17 +179,19 @@ def editar_factura(request, factura_id):
             cantidad = request.POST.get('cantidad')  # Cantidad solicitada
             
             if actividad_id and cantidad:
-                # Obtener la actividad o devolver 404
-                actividad = get_object_or_404(Actividad, id=actividad_id)
+                # Precio actual de la actividad o 404 si no existe
+                precio = historial.precio_actual(actividad_id) if actividad_id.isdigit() else None
+                if precio is None:
+                    raise Http404('Actividad no encontrada')
                 # Crear nuevo ítem de factura
                 item = FacturaItem.objects.create(
                     factura=factura,
-                    actividad=actividad,
+                    actividad_id=actividad_id,
                     cantidad=int(cantidad),
-                    precio=actividad.precio  # Usar precio actual de la actividad
+                    precio=precio  # Usar precio actual de la actividad
                 )
                 messages.success(request, 'Item agregado exitosamente.')
-                return redirect('editar_factura', factura_id=factura.id)
+                return redirect('facturas:editar_factura', factura_id=factura.id)
                 
         # Procesar solicitud para eliminar un ítem
         elif 'eliminar_item' in request.POST:
@@ -397,7 +201,7 @@ def editar_factura(request, factura_id):
                 item = get_object_or_404(FacturaItem, id=item_id, factura=factura)
                 item.delete()
                 messages.success(request, 'Item eliminado exitosamente.')
-                return redirect('editar_factura', factura_id=factura.id)
+                return redirect('facturas:editar_factura', factura_id=factura.id)
         # Procesar solicitud para actualizar cantidad de un ítem
         elif 'actualizar_cantidad' in request.POST:
             item_id = request.POST.get('item_id')  # ID del ítem
@@ -408,7 +212,7 @@ def editar_factura(request, factura_id):
                 item.cantidad = int(nueva_cantidad)
                 item.save()  # Guardar cambios (recalcula importe automáticamente)
                 messages.success(request, 'Cantidad actualizada exitosamente.')
-                return redirect('editar_factura', factura_id=factura.id)
+                return redirect('facturas:editar_factura', factura_id=factura.id)
                 
         # Procesar actualización general de la factura
         else:
@@ -416,15 +220,14 @@ def editar_factura(request, factura_id):
             if form.is_valid():
                 form.save()  # Guardar cambios en la factura
                 messages.success(request, 'Factura actualizada exitosamente.')
-                return redirect('ver_factura', factura_id=factura.id)
+                return redirect('facturas:ver_factura', factura_id=factura.id)
     else:
         # Si es GET, mostrar formulario con datos actuales
         form = FacturaEditForm(instance=factura)
 
     # Obtener datos relacionados
     items = factura.items.select_related('actividad').all()  # Items con sus actividades
-    total = sum(item.importe for item in items)  # Calcular total
-    actividades = Actividad.objects.filter(activo=True)  # Lista de actividades disponibles
+    total = factura.total  # Total guardado en la factura
 
     # Preparar contexto para la plantilla
     context = {
@@ -432,7 +235,6 @@ def editar_factura(request, factura_id):
         'form': form,  # Formulario de edición
         'items': items,  # Items de la factura
         'total': total,  # Total calculado
-        'actividades': actividades,  # Actividades disponibles
     }
     return render(request, 'facturas/editar_factura.html', context)
 
@@ -452,14 +254,14 @@ def agregar_items(request, factura_id):
                 # Crear ítem sin guardar
                 item = form.save(commit=False)
                 item.factura = factura  # Asignar factura
-                item.precio = item.actividad.precio  # Usar precio actual de la actividad
+                item.precio = historial.precio_actual(item.actividad_id)  # Precio actual leído de la base de datos
                 item.save()  # Guardar ítem
                 messages.success(request, 'Item agregado exitosamente.')
-                return redirect('agregar_items', factura_id=factura.id)
+                return redirect('facturas:agregar_items', factura_id=factura.id)
                 
         # Procesar solicitud para finalizar y ver factura
         elif 'terminar' in request.POST:
-            return redirect('ver_factura', factura_id=factura.id)
+            return redirect('facturas:ver_factura', factura_id=factura.id)
             
         # Procesar solicitud para eliminar ítem
         elif 'eliminar' in request.POST:
@@ -469,14 +271,14 @@ def agregar_items(request, factura_id):
                 item = get_object_or_404(FacturaItem, id=item_id, factura=factura)
                 item.delete()
                 messages.success(request, 'Item eliminado exitosamente.')
-                return redirect('agregar_items', factura_id=factura.id)
+                return redirect('facturas:agregar_items', factura_id=factura.id)
     else:
         # Si es GET, mostrar formulario vacío
         form = FacturaItemForm()
 
-    # Obtener ítems actuales y calcular total
-    items = factura.items.all()
-    total = sum(item.importe for item in items)
+    # Obtener ítems actuales con sus actividades y calcular total
+    items = factura.items.select_related('actividad')
+    total = factura.total  # Total guardado en la factura
 
     # Preparar contexto para la plantilla
     context = {
@@ -495,12 +297,12 @@ def ver_factura(request, factura_id):
     # Obtener la factura o devolver 404 si no existe
     factura = get_object_or_404(Factura, id=factura_id)
     
-    # Obtener ítems y calcular total
-    items = factura.items.all()
-    total = sum(item.importe for item in items)
+    # Obtener ítems con sus actividades y calcular total
+    items = factura.items.select_related('actividad')
+    total = factura.total  # Total guardado en la factura
     
     # Obtener datos de la empresa
-    empresa = Empresa.objects.first()  # Obtener configuración de la empresa
+    empresa = cache.empresa()  # Obtener configuración de la empresa
     
     # Preparar contexto para la plantilla
     context = {
@@ -514,68 +316,115 @@ def ver_factura(request, factura_id):
 @login_required
 @permission_required('facturas.view_factura', raise_exception=True)
 def factura_pdf(request, factura_id):
-    """Vista para generar el PDF de una factura"""
+    """Vista para generar el PDF de una factura (en caché hasta que la factura cambie)"""
     
-    # Obtener la factura y datos relacionados
-    factura = get_object_or_404(Factura, id=factura_id)
-    items = factura.items.all()  # Obtener ítems
-    total = sum(item.importe for item in items)  # Calcular total
-    empresa = Empresa.objects.first()  # Datos de la empresa
+    # Obtener la factura y renderizar su HTML con los ítems y los datos de la empresa
+    factura = get_object_or_404(Factura.objects.select_related('cliente'), id=factura_id)
+    html = html_factura(factura, cache.empresa())
 
-    # Preparar contexto para la plantilla PDF
-    context = {
-        'factura': factura,  # Factura actual
-        'items': items,  # Lista de ítems
-        'total': total,  # Total calculado
-        'empresa': empresa,  # Datos de la empresa
-    }
-    return render(request, 'facturas/factura_pdf.html', context)
+    # Servir el PDF desde la caché o generarlo en segundo plano
+    return pdf.respuesta_pdf(request, 'factura', factura.id, html, nombre_pdf(factura))
+
+@login_required
+@permission_required('facturas.view_factura', raise_exception=True)
+def exportar_facturas_pdf(request):
+    """Vista para descargar en un ZIP los PDFs de las facturas filtradas
+
+    Acepta los mismos filtros que lista_facturas. Los PDFs se generan en paralelo
+    y el ZIP se envía a medida que terminan. Cada descarga incluye como máximo
+    `limite` facturas; si quedan más, el ZIP trae un archivo continuar.txt (y la
+    cabecera X-Siguiente-Lote) con la URL del siguiente lote (`despues_de`).
+    """
+    facturas = filtrar_facturas(request.GET)
+
+    # Lote a exportar: a partir del último ID exportado, con un máximo de facturas
+    despues_de = request.GET.get('despues_de', '')
+    try:
+        limite = min(int(request.GET.get('limite') or LOTE_MAXIMO), LOTE_MAXIMO)
+    except ValueError:
+        limite = LOTE_MAXIMO
+    ids, hay_mas = lote_facturas(facturas, int(despues_de) if despues_de.isdigit() else None, max(limite, 1))
+
+    archivos = pdfs_facturas(facturas_para_imprimir(ids))
+    siguiente = None
+    if hay_mas:
+        # Agregar al final del ZIP la URL para continuar con el siguiente lote
+        parametros = request.GET.copy()
+        parametros['despues_de'] = ids[-1]
+        siguiente = request.build_absolute_uri(f'{request.path}?{parametros.urlencode()}')
+        archivos = chain(archivos, [('continuar.txt', f'Quedan facturas por exportar. Siguiente lote:\n{siguiente}\n')])
+
+    nombre = f'facturas_{ids[0]}-{ids[-1]}.zip' if ids else 'facturas.zip'
+    response = StreamingHttpResponse(zip_en_flujo(archivos), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    if siguiente:
+        response['X-Siguiente-Lote'] = siguiente
+    return response
 
 @login_required
 @permission_required('facturas.view_factura', raise_exception=True)
 def exportar_factura_obl(request, factura_id):
     """Vista para exportar una factura a formato .obl"""
     
-    # Obtener la factura y datos relacionados
-    factura = get_object_or_404(Factura, id=factura_id)
-    cliente = factura.cliente
-    area_venta = factura.area_venta
-    items = factura.items.all()
-    
-    # Calcular el importe total de la factura
-    total_importe = sum(item.importe for item in items)
-    
-    # Construir el contenido del archivo .obl línea por línea
-    lineas = []
-    lineas.append("[Obligacion]")  # Línea 1
-    lineas.append("Concepto=Obligacion por Factura Emitida")  # Línea 2
-    lineas.append("Tipo={7DE34F15-C9BA-4FE0-AEE6-B5E85ADB84DC}")  # Línea 3
-    lineas.append(f"Unidad={area_venta.centrocosto}")  # Línea 4: Centro de costo del área de venta
-    lineas.append(f"Entidad={cliente.clienteversat}")  # Línea 5: Código Versat del cliente
-    lineas.append(f"Numero={factura.numero_factura}")  # Línea 6: Número de factura
-    lineas.append(f"Fechaemi={factura.fecha_factura.strftime('%d/%m/%Y')}")  # Línea 7: Fecha de factura formateada
-    lineas.append(f"Descripcion={area_venta.nombre}")  # Línea 8: Nombre del área de venta
-    lineas.append("Fecharec=")  # Línea 9: Fecha de recepción (vacía)
-    lineas.append(f"ImporteMC={total_importe}")  # Línea 10: Importe total
-    lineas.append(f"CuentaMC={cliente.cuentaversat}")  # Línea 11: Cuenta Versat del cliente
-    lineas.append("[Contrapartidas]")  # Línea 12
-    lineas.append("Concepto=107")  # Línea 13
-    lineas.append(f"Importe={total_importe}")  # Línea 14
-    lineas.append("{")  # Línea 15
-    lineas.append(f"900011008  |CUP|{total_importe}")  # Línea 16
-    lineas.append("}")  # Línea 17
-    
-    # Unir todas las líneas con saltos de línea
-    contenido = "\n".join(lineas)
-    
+    # Obtener la factura con su cliente y área de venta
+    factura = get_object_or_404(Factura.objects.select_related('cliente', 'area_venta'), id=factura_id)
+
     # Crear la respuesta HTTP con el archivo de texto
-    response = HttpResponse(contenido, content_type='text/plain; charset=utf-8')
+    response = HttpResponse(contenido_obl(factura), content_type='text/plain; charset=utf-8')
     # Asignar el nombre del archivo (número de factura + extensión .obl)
-    response['Content-Disposition'] = f'attachment; filename="{factura.numero_factura}.obl"'
+    response['Content-Disposition'] = f'attachment; filename="{nombre_obl(factura)}"'
     
     return response
 
 
+@login_required
+@permission_required('facturas.view_factura', raise_exception=True)
+def exportar_facturas(request):
+    """Vista para descargar en CSV o XLSX (`formato`) las facturas filtradas
+
+    Acepta los mismos filtros que lista_facturas. El archivo se escribe fila a
+    fila mientras se envía, sin cargar todas las facturas en memoria.
+    """
+    facturas = filtrar_facturas(request.GET)
+    return respuesta_tabla(
+        'facturas', COLUMNAS_FACTURAS, facturas, formato_tabla(request.GET),
+        orden=('fecha_factura', 'pk'), hoja='Facturas',
+    )
+
+@login_required
+@permission_required('facturas.view_factura', raise_exception=True)
+def exportar_items_facturas(request):
+    """Vista para descargar en CSV o XLSX (`formato`) los ítems de las facturas filtradas
+
+    Acepta los mismos filtros que lista_facturas; una fila por ítem con los datos
+    de su factura y su actividad.
+    """
+    facturas = filtrar_facturas(request.GET)
+    items = FacturaItem.objects.filter(factura__in=facturas.values('pk'))
+    return respuesta_tabla(
+        'items_facturas', COLUMNAS_ITEMS, items, formato_tabla(request.GET),
+        orden=('factura_id', 'pk'), hoja='Ítems',
+    )
+
+@login_required
+@permission_required('facturas.view_factura', raise_exception=True)
+def exportar_facturas_obl(request):
+    """Vista para exportar a VERSAT las facturas filtradas
+
+    Acepta los mismos filtros que lista_facturas. Con `formato=zip` se descarga
+    un ZIP con un .obl por factura; si no, un único .obl con todas las facturas.
+    """
+    facturas = filtrar_facturas(request.GET)
+
+    if request.GET.get('formato') == 'zip':
+        response = StreamingHttpResponse(obl_zip(facturas), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="facturas_obl.zip"'
+    else:
+        response = StreamingHttpResponse(obl_concatenado(facturas), content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="facturas.obl"'
+    return response
+
+
 def tabla_areas_por_mes(request):
     """API endpoint para obtener datos de la tabla de áreas por mes seleccionado"""
     
@@ -595,103 +444,17 @@ def tabla_areas_por_mes(request):
             9: 'Septiembre', 10: 'Octubre', 11: 'Noviembre', 12: 'Diciembre'
         }
         
-        # Obtener todas las áreas de venta
-        todas_areas = AreaVenta.objects.all().order_by('nombre')
-        invoices_by_area = []
-        
-        for area in todas_areas:
-            # 1. Plan Mensual para el mes seleccionado
-            plan_obj = Plan.objects.filter(
-                area_venta=area,
-                anno=anno_actual,
-                mes=mes
-            ).first()
-            plan_mensual = float(plan_obj.plan) if plan_obj else 0
-            
-            # 2. Real del Mes - Facturas del mes seleccionado (excluye no firmadas)
-            real_mes = Factura.objects.filter(
-                area_venta=area,
-                fecha_factura__year=anno_actual,
-                fecha_factura__month=mes
-            ).exclude(
-                estado__nombre__iexact='no firmada'
-            ).aggregate(total=Sum('items__importe'))['total'] or 0
-            real_mes = float(real_mes) if real_mes else 0
-            
-            # 3. % Cumplimiento del mes = Real / Plan * 100
-            cumplimiento = (real_mes / plan_mensual * 100) if plan_mensual > 0 else 0
-            
-            # 4. Plan Acumulado - Suma de planes desde enero hasta mes seleccionado
-            plan_acumulado = Plan.objects.filter(
-                area_venta=area,
-                anno=anno_actual,
-                mes__lte=mes
-            ).aggregate(total=Sum('plan'))['total'] or 0
-            plan_acumulado = float(plan_acumulado) if plan_acumulado else 0
-            
-            # 4b. Real Acumulado - Suma de facturas pagadas/firmadas desde enero hasta mes seleccionado
-            real_acumulado = Factura.objects.filter(
-                area_venta=area,
-                fecha_factura__year=anno_actual,
-                fecha_factura__month__lte=mes
-            ).exclude(
-                estado__nombre__iexact='no firmada'
-            ).aggregate(total=Sum('items__importe'))['total'] or 0
-            real_acumulado = float(real_acumulado) if real_acumulado else 0
-            
-            # 5. Plan Anual - Suma de todos los planes del año
-            plan_anual = Plan.objects.filter(
-                area_venta=area,
-                anno=anno_actual
-            ).aggregate(total=Sum('plan'))['total'] or 0
-            plan_anual = float(plan_anual) if plan_anual else 0
-            
-            # 6. Real Año Actual - Facturas desde enero hasta mes seleccionado (excluye no firmadas)
-            real_anual = Factura.objects.filter(
-                area_venta=area,
-                fecha_factura__year=anno_actual,
-                fecha_factura__month__lte=mes
-            ).exclude(
-                estado__nombre__iexact='no firmada'
-            ).aggregate(total=Sum('items__importe'))['total'] or 0
-            real_anual = float(real_anual) if real_anual else 0
-            
-            # 7. % Cumplimiento Acumulado = Real Año / Plan Acumulado * 100
-            cumplimiento_acum = (real_anual / plan_acumulado * 100) if plan_acumulado > 0 else 0
-            
-            # 8. % Cumplimiento Anual = Real Año / Plan Anual * 100
-            cumplimiento_anual = (real_anual / plan_anual * 100) if plan_anual > 0 else 0
-            
-            invoices_by_area.append({
-                'area_venta__nombre': area.nombre,
-                'plan_mensual': plan_mensual,
-                'real_mes': real_mes,
-                'cumplimiento': cumplimiento,
-                'plan_acumulado': plan_acumulado,
-                'real_acumulado': real_acumulado,
-                'plan_anual': plan_anual,
-                'real_anual': real_anual,
-                'cumplimiento_acum': cumplimiento_acum,
-                'cumplimiento_anual': cumplimiento_anual,
-                'is_total': False
-            })
-        
-        # Agregar fila de totales
-        totales = {
-            'area_venta__nombre': 'TOTAL',
-            'plan_mensual': sum(a['plan_mensual'] for a in invoices_by_area),
-            'real_mes': sum(a['real_mes'] for a in invoices_by_area),
-            'plan_acumulado': sum(a['plan_acumulado'] for a in invoices_by_area),
-            'real_acumulado': sum(a['real_acumulado'] for a in invoices_by_area),
-            'plan_anual': sum(a['plan_anual'] for a in invoices_by_area),
-            'real_anual': sum(a['real_anual'] for a in invoices_by_area),
-            'is_total': True
-        }
-        totales['cumplimiento'] = (totales['real_mes'] / totales['plan_mensual'] * 100) if totales['plan_mensual'] > 0 else 0
-        totales['cumplimiento_acum'] = (totales['real_anual'] / totales['plan_acumulado'] * 100) if totales['plan_acumulado'] > 0 else 0
-        totales['cumplimiento_anual'] = (totales['real_anual'] / totales['plan_anual'] * 100) if totales['plan_anual'] > 0 else 0
-        
-        invoices_by_area.append(totales)
+        # Matriz plan vs. real del año (consultas constantes, sin importar el número de áreas)
+        matriz = matriz_en_cache(anno_actual)
+
+        # Tabla por área; el "Real Año Actual" suma desde enero hasta el mes seleccionado
+        invoices_by_area = [
+            {
+                clave: float(valor) if isinstance(valor, Decimal) else valor
+                for clave, valor in fila.items()
+            }
+            for fila in matriz.tabla_areas(mes, real_anual_hasta=mes)
+        ]
         
         return JsonResponse({
             'success': True,
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class OfertasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ofertas'
+
+    def ready(self):
+        # Registrar las señales de la aplicación
+        from . import signals  # noqa: F401
@@ -0,0 +1,73 @@
+# Borradores de oferta (paso 2 de crear_oferta)
+#
+# Los ítems de una oferta en preparación se guardan en OfertaBorradorItem en lugar
+# de la sesión: cada clic inserta o borra una sola fila, el total se actualiza con
+# un incremento y la restricción única (borrador, actividad) detecta los duplicados.
+# El borrador sobrevive al cierre de sesión y se elimina al convertirlo en oferta.
+from django.db import IntegrityError, transaction  # Transacciones y errores de integridad
+from django.db.models import F  # Expresiones de consulta
+
+from actividades import historial  # Precio actual de las actividades
+from core import secuencias  # Numeración de documentos
+from .models import Oferta, OfertaBorrador, OfertaBorradorItem, OfertaItem  # Modelos de ofertas
+
+
+def borrador_de(usuario):
+    """Borrador de oferta del usuario con su cliente y área (o None si no tiene)"""
+    return OfertaBorrador.objects.select_related('cliente', 'area_venta').filter(usuario=usuario).first()
+
+
+def guardar_datos(usuario, area_venta, cliente, observaciones=''):
+    """Crea el borrador del usuario o actualiza sus datos básicos (conserva los ítems)"""
+    borrador, _ = OfertaBorrador.objects.update_or_create(
+        usuario=usuario,
+        defaults={'area_venta': area_venta, 'cliente': cliente, 'observaciones': observaciones},
+    )
+    return borrador
+
+
+def agregar_item(borrador, actividad, cantidad):
+    """Agrega una actividad al borrador con su precio actual
+
+    Devuelve el ítem creado, o None si la actividad ya estaba en el borrador.
+    """
+    precio = historial.precio_actual(actividad.pk)  # No el de la instancia recibida, que puede estar desfasada
+    item = OfertaBorradorItem(borrador=borrador, actividad=actividad, cantidad=cantidad, precio=precio)
+    try:
+        with transaction.atomic():
+            item.save()
+            OfertaBorrador.objects.filter(pk=borrador.pk).update(
+                total=F('total') + item.importe, num_items=F('num_items') + 1
+            )
+    except IntegrityError:
+        return None
+    return item
+
+
+def quitar_item(borrador, item_id):
+    """Quita un ítem del borrador; devuelve False si no existía"""
+    with transaction.atomic():
+        item = OfertaBorradorItem.objects.select_for_update().filter(borrador=borrador, pk=item_id).first()
+        if item is None:
+            return False
+        item.delete()
+        OfertaBorrador.objects.filter(pk=borrador.pk).update(
+            total=F('total') - item.importe, num_items=F('num_items') - 1
+        )
+    return True
+
+
+def convertir_en_oferta(borrador, usuario):
+    """Crea la oferta con los ítems del borrador y elimina el borrador"""
+    with transaction.atomic():
+        oferta = Oferta.objects.create(
+            numero_oferta=secuencias.siguiente_numero(secuencias.OFERTA),  # Año actual + 5 dígitos
+            area_venta_id=borrador.area_venta_id,
+            cliente_id=borrador.cliente_id,
+            observaciones=borrador.observaciones,
+            created_by=usuario,
+        )
+        # Un solo INSERT para todos los ítems; el total de la oferta se calcula al final
+        OfertaItem.objects.copiar_de(borrador.items.all(), oferta=oferta)
+        borrador.delete()
+    return oferta
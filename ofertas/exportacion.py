@@ -0,0 +1,14 @@
+# Exportación del listado de ofertas a CSV/XLSX (core.descargas)
+
+# Columnas de la exportación: (encabezado, campo)
+COLUMNAS_OFERTAS = (
+    ('Número', 'numero_oferta'),
+    ('Fecha', 'fecha_oferta'),
+    ('Cliente', 'cliente__nombre'),
+    ('Contrato', 'cliente__numero_contrato'),
+    ('Área de venta', 'area_venta__nombre'),
+    ('Ítems', 'num_items'),
+    ('Total', 'total'),
+    ('Factura', 'factura__numero_factura'),
+    ('Observaciones', 'observaciones'),
+)
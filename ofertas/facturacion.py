@@ -0,0 +1,146 @@
+# Conversión de ofertas en facturas
+#
+# La factura y todos sus ítems se crean en una sola transacción: o se crea la
+# factura completa o no se crea nada. Los ítems se copian con un solo INSERT,
+# sin cargar las actividades, y el total de la factura se calcula una vez al final.
+# La facturación por lotes hace lo mismo para muchas ofertas a la vez: reserva
+# todos los números de factura juntos y crea facturas e ítems con bulk_create.
+#
+# Una oferta puede ser un servicio que se cobra cada mes, así que se factura una vez
+# por mes: cada factura guarda su oferta (Factura.oferta) y se rechaza una segunda
+# factura de la misma oferta con fecha en el mismo mes (doble clic, petición repetida).
+from datetime import date  # Fecha de la factura
+
+from django.db import transaction  # Transacciones
+
+from core import periodos, secuencias  # Periodos y numeración de documentos
+from facturas.models import Factura, FacturaItem, estado_inicial  # Modelos de facturas y estado inicial
+from .models import Oferta, OfertaItem  # Modelos de ofertas
+
+# Resultados posibles de cada oferta en una facturación por lotes
+FACTURADA = 'facturada'
+YA_FACTURADA = 'ya facturada este mes'
+SIN_ITEMS = 'sin ítems'
+
+# Filas por sentencia INSERT en la facturación por lotes
+TAMANO_LOTE = 500
+
+
+class OfertaYaFacturada(Exception):
+    """La oferta ya tiene una factura (`factura_id`) en el mes: no se vuelve a facturar"""
+
+    def __init__(self, factura_id):
+        super().__init__('La oferta ya está facturada este mes')
+        self.factura_id = factura_id
+
+
+def facturas_del_mes(fecha):
+    """Facturas generadas desde ofertas con fecha en el mes de `fecha`"""
+    return Factura.objects.filter(periodos.filtro('fecha_factura', fecha.year, fecha.month), oferta__isnull=False)
+
+
+def facturar_oferta(oferta, usuario, numero_factura=None, fecha=None):
+    """Crea una factura con los datos e ítems de la oferta
+
+    Si no se indica `numero_factura` se toma el siguiente de la secuencia del año.
+    La oferta se bloquea mientras se factura, como en facturar_ofertas: si ya tiene
+    una factura en el mes de `fecha` (por ejemplo, al repetir la petición) se lanza
+    OfertaYaFacturada.
+    """
+    fecha = fecha or date.today()
+    with transaction.atomic():
+        # Bloquear la oferta para que dos peticiones simultáneas no la facturen dos veces
+        bloqueada = Oferta.objects.select_for_update().get(pk=oferta.pk)
+        existente = facturas_del_mes(fecha).filter(oferta=bloqueada).values_list('pk', flat=True).first()
+        if existente:
+            raise OfertaYaFacturada(existente)
+        factura = Factura.objects.create(
+            numero_factura=numero_factura or secuencias.siguiente_numero(secuencias.FACTURA, fecha.year),
+            fecha_factura=fecha,
+            area_venta_id=bloqueada.area_venta_id,
+            cliente_id=bloqueada.cliente_id,
+            observaciones=bloqueada.observaciones,
+            estado_id=estado_inicial(),  # Estado por defecto "NO FIRMADA"
+            created_by=usuario,
+            oferta=bloqueada,
+        )
+        FacturaItem.objects.copiar_de(oferta.items.all(), factura=factura)
+        Oferta.objects.filter(pk=oferta.pk).update(factura=factura)
+    oferta.factura = factura
+    return factura
+
+
+def facturar_ofertas(ofertas, usuario, fecha=None):
+    """Factura todas las ofertas del queryset en una sola transacción
+
+    Las ofertas ya facturadas en el mes de `fecha` o sin ítems se omiten. Devuelve
+    un informe con un diccionario por oferta: {'oferta', 'factura', 'resultado'},
+    donde `factura` es None si la oferta se omitió.
+    """
+    fecha = fecha or date.today()
+    with transaction.atomic():
+        # Bloquear las ofertas para que dos lotes simultáneos no facturen la misma
+        ofertas = list(ofertas.select_for_update().order_by('pk'))
+        if not ofertas:
+            return []
+
+        # Ítems de todas las ofertas en una consulta (sin cargar actividades)
+        items = {}
+        filas = OfertaItem.objects.filter(oferta__in=ofertas).order_by('oferta_id', 'pk').values_list(
+            'oferta_id', 'actividad_id', 'cantidad', 'precio'
+        )
+        for oferta_id, actividad_id, cantidad, precio in filas:
+            items.setdefault(oferta_id, []).append((actividad_id, cantidad, precio))
+
+        # Ofertas que ya tienen factura en el mes
+        facturadas = set(facturas_del_mes(fecha).filter(oferta__in=ofertas).values_list('oferta_id', flat=True))
+
+        informe = []
+        a_facturar = []
+        for oferta in ofertas:
+            if oferta.pk in facturadas:
+                informe.append({'oferta': oferta, 'factura': None, 'resultado': YA_FACTURADA})
+            elif oferta.pk not in items:
+                informe.append({'oferta': oferta, 'factura': None, 'resultado': SIN_ITEMS})
+            else:
+                a_facturar.append(oferta)
+                informe.append({'oferta': oferta, 'factura': None, 'resultado': FACTURADA})
+        if not a_facturar:
+            return informe
+
+        # Números de factura consecutivos reservados en un solo bloque
+        numeros = secuencias.reservar_numeros(secuencias.FACTURA, len(a_facturar), anno=fecha.year)
+
+        # Facturas (un INSERT por cada TAMANO_LOTE facturas), todas en el estado inicial
+        estado_id = estado_inicial()
+        facturas = Factura.objects.bulk_create([
+            Factura(
+                numero_factura=numero,
+                fecha_factura=fecha,
+                area_venta_id=oferta.area_venta_id,
+                cliente_id=oferta.cliente_id,
+                observaciones=oferta.observaciones,
+                estado_id=estado_id,  # Estado por defecto "NO FIRMADA"
+                created_by=usuario,
+                oferta=oferta,
+            )
+            for oferta, numero in zip(a_facturar, numeros)
+        ], batch_size=TAMANO_LOTE)
+
+        # Ítems de todas las facturas; al final se recalculan sus totales y el resumen mensual
+        FacturaItem.objects.bulk_create([
+            FacturaItem(factura=factura, actividad_id=actividad_id, cantidad=cantidad, precio=precio)
+            for oferta, factura in zip(a_facturar, facturas)
+            for actividad_id, cantidad, precio in items[oferta.pk]
+        ], batch_size=TAMANO_LOTE)
+
+        # Enlazar cada oferta con su última factura
+        for oferta, factura in zip(a_facturar, facturas):
+            oferta.factura = factura
+        Oferta.objects.bulk_update(a_facturar, ['factura'], batch_size=TAMANO_LOTE)
+
+    # Completar el informe con las facturas creadas
+    for fila in informe:
+        if fila['resultado'] == FACTURADA:
+            fila['factura'] = fila['oferta'].factura
+    return informe
@@ -0,0 +1,40 @@
+# Filtros compartidos del listado de ofertas
+#
+# Los usan el listado (lista_ofertas) y la facturación por lotes, de modo que
+# "facturar todas las filtradas" toma exactamente las ofertas que se ven en la
+# lista: q, fecha_inicial y fecha_final.
+from django.db.models import Q  # Consultas complejas
+
+from .models import Oferta  # Modelo de ofertas
+
+
+def parametros_ofertas(datos):
+    """Extrae los parámetros de filtrado de un QueryDict (request.GET o request.POST)"""
+    return {
+        'query': datos.get('q', ''),  # Búsqueda general
+        'fecha_inicial': datos.get('fecha_inicial', ''),  # Fecha desde
+        'fecha_final': datos.get('fecha_final', ''),  # Fecha hasta
+    }
+
+
+def filtrar_ofertas(datos, ofertas=None):
+    """Aplica a un queryset de ofertas los filtros del listado"""
+    parametros = parametros_ofertas(datos)
+    if ofertas is None:
+        ofertas = Oferta.objects.all()
+
+    # Aplicar filtro de búsqueda si existe
+    query = parametros['query']
+    if query:
+        ofertas = ofertas.filter(
+            Q(numero_oferta__icontains=query) |  # Buscar en número
+            Q(cliente__nombre__icontains=query)  # Buscar en nombre de cliente
+        )
+
+    # Filtrar por rango de fechas
+    if parametros['fecha_inicial']:
+        ofertas = ofertas.filter(fecha_oferta__gte=parametros['fecha_inicial'])  # Desde fecha inicial
+    if parametros['fecha_final']:
+        ofertas = ofertas.filter(fecha_oferta__lte=parametros['fecha_final'])  # Hasta fecha final
+
+    return ofertas
@@ -1,5 +1,7 @@
 # Importar módulos necesarios de Django
 from django import forms  # Funcionalidades de formularios
+from django.urls import reverse_lazy  # URLs de los endpoints de autocompletado
+from core.autocompletar import SelectAutocompletar  # Select que carga las opciones por JSON
 from .models import Oferta, OfertaItem  # Modelos de ofertas
 
 # Formulario para crear/editar una oferta
@@ -17,7 +19,7 @@ class OfertaForm(forms.ModelForm):
             'area_venta': forms.Select(attrs={
                 'class': 'form-control'  # Estilo Bootstrap
             }),
-            'cliente': forms.Select(attrs={
+            'cliente': SelectAutocompletar(reverse_lazy('autocompletar_clientes'), attrs={
                 'class': 'form-control'  # Estilo Bootstrap
             }),
             'observaciones': forms.Textarea(attrs={
@@ -38,7 +40,7 @@ class OfertaItemForm(forms.ModelForm):
         ]
         # Configuración de los widgets
         widgets = {
-            'actividad': forms.Select(attrs={
+            'actividad': SelectAutocompletar(reverse_lazy('autocompletar_actividades'), attrs={
                 'class': 'form-control'  # Estilo Bootstrap
             }),
             'cantidad': forms.NumberInput(attrs={
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from ofertas.facturacion import facturar_ofertas
+from ofertas.filtros import filtrar_ofertas
+from ofertas.models import Oferta
+
+
+class Command(BaseCommand):
+    help = 'Convierte en facturas las ofertas indicadas (por ID o por filtros) en una sola transacción'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='IDs de las ofertas a facturar')
+        parser.add_argument('--desde', default='', help='Fecha inicial de las ofertas (AAAA-MM-DD)')
+        parser.add_argument('--hasta', default='', help='Fecha final de las ofertas (AAAA-MM-DD)')
+        parser.add_argument('--buscar', default='', help='Texto a buscar (número o cliente)')
+        parser.add_argument('--usuario', required=True, help='Usuario que figura como creador de las facturas')
+        parser.add_argument('--fecha', type=date.fromisoformat, help='Fecha de las facturas (por defecto, hoy)')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f'No existe el usuario {options["usuario"]}')
+
+        if options['ids']:
+            ofertas = Oferta.objects.filter(pk__in=options['ids'])
+        elif options['desde'] or options['hasta'] or options['buscar']:
+            # Los mismos filtros que el listado de ofertas
+            ofertas = filtrar_ofertas({
+                'q': options['buscar'],
+                'fecha_inicial': options['desde'],
+                'fecha_final': options['hasta'],
+            })
+        else:
+            raise CommandError('Indique los IDs de las ofertas o al menos un filtro (--desde, --hasta, --buscar)')
+
+        informe = facturar_ofertas(ofertas, usuario, fecha=options['fecha'])
+        for fila in informe:
+            factura = fila['factura'].numero_factura if fila['factura'] else '-'
+            self.stdout.write(f'{fila["oferta"].numero_oferta}\t{fila["resultado"]}\t{factura}')
+
+        facturadas = sum(1 for fila in informe if fila['factura'])
+        self.stdout.write(self.style.SUCCESS(f'{facturadas} de {len(informe)} ofertas facturadas'))
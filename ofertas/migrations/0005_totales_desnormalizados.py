@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+def calcular_totales(apps, schema_editor):
+    # Rellenar los totales de los documentos existentes a partir de sus ítems
+    from core.totales import recalcular_totales
+    recalcular_totales(apps.get_model('ofertas', 'Oferta'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ofertas', '0004_remove_fecha_vencimiento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='num_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='oferta',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
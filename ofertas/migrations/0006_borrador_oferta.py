@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('actividades', '0001_initial'),
+        ('clientes', '0004_cliente_clienteversat_cliente_cuentaversat'),
+        ('core', '0003_secuencia'),
+        ('ofertas', '0005_totales_desnormalizados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfertaBorrador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observaciones', models.TextField(blank=True, max_length=500, null=True)),
+                ('total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12)),
+                ('num_items', models.PositiveIntegerField(default=0, editable=False)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('area_venta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.areaventa')),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='clientes.cliente')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='borrador_oferta', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Borrador de Oferta',
+                'verbose_name_plural': 'Borradores de Oferta',
+            },
+        ),
+        migrations.CreateModel(
+            name='OfertaBorradorItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.PositiveIntegerField()),
+                ('precio', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('importe', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('actividad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='actividades.actividad')),
+                ('borrador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='ofertas.ofertaborrador')),
+            ],
+            options={
+                'verbose_name': 'Item de Borrador de Oferta',
+                'verbose_name_plural': 'Items de Borrador de Oferta',
+                'unique_together': {('borrador', 'actividad')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facturas', '0005_venta_mensual'),
+        ('ofertas', '0006_borrador_oferta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='oferta',
+            name='factura',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ofertas', to='facturas.factura'),
+        ),
+    ]
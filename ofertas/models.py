@@ -4,8 +4,9 @@ from django.contrib.auth.models import User  # Para la relación con usuarios
 from core.models import AreaVenta  # Importamos el modelo de áreas de venta
 from clientes.models import Cliente  # Importamos el modelo de clientes
 from actividades.models import Actividad  # Importamos el modelo de actividades
+from core.totales import DocumentoConTotalesMixin, ItemDocumentoQuerySet  # Mantienen los totales desnormalizados
 
-class Oferta(models.Model):
+class Oferta(DocumentoConTotalesMixin, models.Model):
     # Número único que identifica la oferta (formato: AAAANNNNN)
     numero_oferta = models.CharField(max_length=20, unique=True)
     # Fecha automática cuando se crea la oferta
@@ -18,6 +19,15 @@ class Oferta(models.Model):
     observaciones = models.TextField(max_length=500, blank=True, null=True)
     # Usuario que creó la oferta
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Total de la oferta (suma de importes de sus ítems, se mantiene al escribir ítems)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    # Cantidad de ítems de la oferta
+    num_items = models.PositiveIntegerField(default=0, editable=False)
+    # Última factura generada a partir de la oferta (vacío si no se ha facturado)
+    factura = models.ForeignKey(
+        'facturas.Factura', related_name='ofertas', on_delete=models.SET_NULL,
+        null=True, blank=True, editable=False,
+    )
 
     # Representación en texto de la oferta
     def __str__(self):
@@ -29,6 +39,10 @@ class Oferta(models.Model):
         verbose_name_plural = 'Ofertas'  # Nombre en plural
         ordering = ['-fecha_oferta']  # Ordenar por fecha descendente
 
+class OfertaItemQuerySet(ItemDocumentoQuerySet):
+    # Recalcula el total de la oferta tras operaciones masivas sobre sus ítems
+    campo_documento = 'oferta'
+
 class OfertaItem(models.Model):
     # Relación con la oferta a la que pertenece este ítem
     oferta = models.ForeignKey(Oferta, related_name='items', on_delete=models.CASCADE)
@@ -41,6 +55,9 @@ class OfertaItem(models.Model):
     # Importe total (cantidad * precio)
     importe = models.DecimalField(max_digits=10, decimal_places=2)
 
+    # Manager que mantiene el total de la oferta en bulk_create() y update()
+    objects = OfertaItemQuerySet.as_manager()
+
     # Calcula automáticamente el importe antes de guardar
     def save(self, *args, **kwargs):
         self.importe = self.cantidad * self.precio
@@ -54,3 +71,53 @@ class OfertaItem(models.Model):
     class Meta:
         verbose_name = 'Item de Oferta'  # Nombre en singular
         verbose_name_plural = 'Items de Oferta'  # Nombre en plural
+
+class OfertaBorrador(DocumentoConTotalesMixin, models.Model):
+    # Oferta en preparación (paso 2 de crear_oferta); una por usuario
+    usuario = models.OneToOneField(User, on_delete=models.CASCADE, related_name='borrador_oferta')
+    # Datos básicos capturados en el paso 1
+    area_venta = models.ForeignKey(AreaVenta, on_delete=models.CASCADE)
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    observaciones = models.TextField(max_length=500, blank=True, null=True)
+    # Total y cantidad de ítems (se actualizan al agregar o quitar ítems)
+    total = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    num_items = models.PositiveIntegerField(default=0, editable=False)
+    # Última modificación del borrador
+    actualizado = models.DateTimeField(auto_now=True)
+
+    # Representación en texto del borrador
+    def __str__(self):
+        return f"Borrador de oferta de {self.usuario}"
+
+    # Configuración adicional del modelo
+    class Meta:
+        verbose_name = 'Borrador de Oferta'  # Nombre en singular
+        verbose_name_plural = 'Borradores de Oferta'  # Nombre en plural
+
+class OfertaBorradorItem(models.Model):
+    # Borrador al que pertenece este ítem
+    borrador = models.ForeignKey(OfertaBorrador, related_name='items', on_delete=models.CASCADE)
+    # Actividad que se está ofertando
+    actividad = models.ForeignKey(Actividad, on_delete=models.CASCADE)
+    # Cantidad de unidades de la actividad
+    cantidad = models.PositiveIntegerField()
+    # Precio unitario de la actividad al momento de agregarla
+    precio = models.DecimalField(max_digits=10, decimal_places=2)
+    # Importe total (cantidad * precio)
+    importe = models.DecimalField(max_digits=10, decimal_places=2)
+
+    # Calcula automáticamente el importe antes de guardar
+    def save(self, *args, **kwargs):
+        self.importe = self.cantidad * self.precio
+        super().save(*args, **kwargs)
+
+    # Representación en texto del ítem
+    def __str__(self):
+        return f"{self.actividad} - {self.cantidad}"
+
+    # Configuración adicional del modelo
+    class Meta:
+        # Una actividad solo puede aparecer una vez en el borrador
+        unique_together = ['borrador', 'actividad']
+        verbose_name = 'Item de Borrador de Oferta'  # Nombre en singular
+        verbose_name_plural = 'Items de Borrador de Oferta'  # Nombre en plural
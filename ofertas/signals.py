@@ -0,0 +1,28 @@
+# Señales de la aplicación de ofertas
+from django.db.models.signals import post_delete, post_save  # Señales de modelos
+from django.dispatch import receiver  # Decorador para conectar señales
+
+from core import pdf  # Caché de PDFs
+from core.totales import recalcular_totales  # Recalcula totales desnormalizados
+from .models import Oferta, OfertaItem  # Modelos de ofertas
+
+
+@receiver(post_save, sender=OfertaItem)
+@receiver(post_delete, sender=OfertaItem)
+def actualizar_total_oferta(sender, instance, **kwargs):
+    """Mantiene el total y la cantidad de ítems de la oferta al escribir un ítem"""
+    recalcular_totales(Oferta, [instance.oferta_id])
+
+
+@receiver(post_save, sender=Oferta)
+@receiver(post_delete, sender=Oferta)
+def invalidar_pdf_oferta(sender, instance, **kwargs):
+    """Descarta los PDFs en caché de la oferta cuando cambia"""
+    pdf.invalidar('oferta', instance.pk)
+
+
+@receiver(post_save, sender=OfertaItem)
+@receiver(post_delete, sender=OfertaItem)
+def invalidar_pdf_item_oferta(sender, instance, **kwargs):
+    """Descarta los PDFs en caché de la oferta cuando cambia uno de sus ítems"""
+    pdf.invalidar('oferta', instance.oferta_id)
@@ -1,3 +1,224 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from actividades.models import Actividad
+from clientes.models import Cliente
+from core import datos_prueba
+from core.models import AreaVenta
+from core.pruebas import PEQUENO, ConsultasTestCase
+from core.totales import documentos_con_diferencias
+from facturas.models import Factura
+from facturas.resumen import diferencias_ventas
+from . import borradores, facturacion
+from .models import Oferta
+
+
+def ultima_oferta():
+    return [Oferta.objects.filter(factura__isnull=True).latest('pk').pk]
+
+
+def oferta_facturada():
+    oferta = Oferta.objects.filter(factura__isnull=True).latest('pk')
+    facturacion.facturar_oferta(oferta, User.objects.get(username='pruebas'))
+    return [oferta.pk]
+
+
+class ConsultasOfertasTests(ConsultasTestCase):
+    vistas = (
+        'ofertas:lista_ofertas',
+        'ofertas:exportar_ofertas',
+        'ofertas:crear_oferta',
+        'ofertas:editar_oferta',
+        'ofertas:ver_oferta',
+        'ofertas:agregar_items_oferta',
+        'ofertas:eliminar_item_oferta',
+        'ofertas:oferta_pdf',
+        'ofertas:facturar_oferta',
+        'ofertas:facturar_ofertas_lote',
+    )
+
+    def crecer(self):
+        super().crecer()
+        self.llenar_borrador(5)
+
+    def llenar_borrador(self, items):
+        """Borrador de oferta del usuario con `items` actividades"""
+        borrador = borradores.guardar_datos(
+            self.usuario, AreaVenta.objects.latest('pk'), Cliente.objects.filter(activo=True).latest('pk')
+        )
+        for actividad in Actividad.objects.order_by('-pk')[:items]:
+            borradores.agregar_item(borrador, actividad, 1)
+        return borrador
+
+    def test_lista_ofertas(self):
+        self.assertConsultas(3, 'ofertas:lista_ofertas')
+
+    def test_crear_oferta(self):
+        self.assertConsultas(3, 'ofertas:crear_oferta')
+
+    def test_crear_oferta_post(self):
+        def datos():
+            return {
+                'area_venta': AreaVenta.objects.latest('pk').pk,
+                'cliente': Cliente.objects.filter(activo=True).latest('pk').pk,
+                'observaciones': '',
+            }
+
+        self.llenar_borrador(0)  # Actualiza el borrador existente en las dos medidas
+        self.assertConsultas(10, 'ofertas:crear_oferta', datos=datos, metodo='post', estado=302)
+
+    def test_editar_oferta(self):
+        self.assertConsultas(4, 'ofertas:editar_oferta', args=ultima_oferta)
+
+    def test_editar_oferta_agregar_item(self):
+        def datos():
+            usadas = Oferta.objects.filter(factura__isnull=True).latest('pk').items.values('actividad')
+            return {'agregar_item': '1', 'actividad': Actividad.objects.exclude(pk__in=usadas).latest('pk').pk, 'cantidad': '2'}
+
+        self.assertConsultas(7, 'ofertas:editar_oferta', args=ultima_oferta, datos=datos, metodo='post', estado=302)
+
+    def test_ver_oferta(self):
+        self.assertConsultas(7, 'ofertas:ver_oferta', args=ultima_oferta)
+
+    def test_ver_oferta_impresion(self):
+        self.assertConsultas(6, 'ofertas:ver_oferta', args=ultima_oferta, datos={'print': 'true'})
+
+    def test_agregar_items_oferta(self):
+        self.llenar_borrador(2)
+        self.assertConsultas(5, 'ofertas:agregar_items_oferta')
+
+    def test_agregar_items_oferta_terminar(self):
+        self.llenar_borrador(2)
+        self.assertConsultas(16, 'ofertas:agregar_items_oferta', datos={'terminar': '1'}, metodo='post', estado=302)
+
+    def test_eliminar_item_oferta(self):
+        self.llenar_borrador(2)
+
+        def datos():
+            return {'item_id': borradores.borrador_de(self.usuario).items.latest('pk').pk}
+
+        self.assertConsultas(8, 'ofertas:eliminar_item_oferta', datos=datos, metodo='post', estado=302)
+
+    def test_oferta_pdf(self):
+        self.assertConsultas(8, 'ofertas:oferta_pdf', args=ultima_oferta)
+
+    def test_facturar_oferta(self):
+        self.assertConsultas(27, 'ofertas:facturar_oferta', args=ultima_oferta, estado=302)
+
+    def test_facturar_oferta_ya_facturada(self):
+        self.assertConsultas(8, 'ofertas:facturar_oferta', args=oferta_facturada, estado=302)
+
+    def test_facturar_ofertas_lote(self):
+        def datos():
+            return {'ofertas': list(Oferta.objects.filter(factura__isnull=True).values_list('pk', flat=True))}
+
+        self.assertConsultas(22, 'ofertas:facturar_ofertas_lote', datos=datos, metodo='post')
+
+    def test_exportar_ofertas(self):
+        self.assertConsultas(3, 'ofertas:exportar_ofertas', datos={'q': 'cliente'})
+
+    def test_exportar_ofertas_xlsx(self):
+        self.assertConsultas(3, 'ofertas:exportar_ofertas', datos={'formato': 'xlsx'})
+
+
+@override_settings(METRICAS_ACTIVAS=False)
+class FacturacionOfertasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('pruebas', 'pruebas@ejemplo.cu', 'pruebas')
+        datos_prueba.sembrar(semilla=1, **PEQUENO)
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def test_facturar_dos_veces_no_duplica_la_factura(self):
+        oferta = Oferta.objects.filter(factura__isnull=True).earliest('pk')
+        ruta = reverse('ofertas:facturar_oferta', args=[oferta.pk])
+        facturas = Factura.objects.count()
+
+        primera = self.client.get(ruta)
+        oferta.refresh_from_db()
+        self.assertRedirects(primera, reverse('facturas:ver_factura', args=[oferta.factura_id]))
+        # Enlace repetido o doble clic: lleva a la misma factura sin crear otra
+        segunda = self.client.get(ruta)
+        self.assertRedirects(segunda, reverse('facturas:ver_factura', args=[oferta.factura_id]))
+        self.assertEqual(Factura.objects.count(), facturas + 1)
+        self.assertEqual(Oferta.objects.get(pk=oferta.pk).factura_id, oferta.factura_id)
+
+        # Con un objeto cargado antes de facturar también se detecta
+        desactualizada = Oferta.objects.get(pk=oferta.pk)
+        desactualizada.factura = None
+        with self.assertRaises(facturacion.OfertaYaFacturada) as error:
+            facturacion.facturar_oferta(desactualizada, self.usuario)
+        self.assertEqual(error.exception.factura_id, oferta.factura_id)
+        self.assertEqual(Factura.objects.count(), facturas + 1)
+
+    def test_facturar_la_misma_oferta_cada_mes(self):
+        # Servicios que se cobran cada mes: una factura por mes de la misma oferta
+        oferta = Oferta.objects.filter(factura__isnull=True, num_items__gt=0).earliest('pk')
+        enero = facturacion.facturar_oferta(oferta, self.usuario, fecha=date(2030, 1, 31))
+        febrero = facturacion.facturar_oferta(oferta, self.usuario, fecha=date(2030, 2, 1))
+        self.assertEqual(list(oferta.facturas.order_by('pk')), [enero, febrero])
+        self.assertEqual(Oferta.objects.get(pk=oferta.pk).factura_id, febrero.pk)  # Última factura
+        febrero.refresh_from_db()
+        self.assertEqual((febrero.total, febrero.num_items), (oferta.total, oferta.num_items))
+
+        # Una segunda factura en un mes ya facturado se rechaza
+        with self.assertRaises(facturacion.OfertaYaFacturada) as error:
+            facturacion.facturar_oferta(oferta, self.usuario, fecha=date(2030, 1, 15))
+        self.assertEqual(error.exception.factura_id, enero.pk)
+
+        # Por lotes igual: se factura marzo y se omite febrero
+        marzo = facturacion.facturar_ofertas(Oferta.objects.filter(pk=oferta.pk), self.usuario, fecha=date(2030, 3, 1))
+        self.assertEqual([fila['resultado'] for fila in marzo], [facturacion.FACTURADA])
+        repetido = facturacion.facturar_ofertas(Oferta.objects.filter(pk=oferta.pk), self.usuario, fecha=date(2030, 2, 28))
+        self.assertEqual([fila['resultado'] for fila in repetido], [facturacion.YA_FACTURADA])
+        self.assertEqual(oferta.facturas.count(), 3)
+
+    def test_factura_con_los_totales_de_la_oferta(self):
+        oferta = Oferta.objects.filter(factura__isnull=True, num_items__gt=0).earliest('pk')
+        factura = facturacion.facturar_oferta(oferta, self.usuario, numero_factura='T-0001')
+        factura.refresh_from_db()
+        self.assertEqual((factura.total, factura.num_items), (oferta.total, oferta.num_items))
+        self.assertEqual(
+            list(factura.items.order_by('pk').values_list('actividad_id', 'cantidad', 'precio', 'importe')),
+            list(oferta.items.order_by('pk').values_list('actividad_id', 'cantidad', 'precio', 'importe')),
+        )
+        self.assertFalse(documentos_con_diferencias(Factura).exists())
+        self.assertEqual(diferencias_ventas(), {})
+
+    def test_lote_con_los_totales_de_cada_oferta(self):
+        facturada = Oferta.objects.filter(factura__isnull=True).earliest('pk')
+        facturacion.facturar_oferta(facturada, self.usuario)
+        vacia = Oferta.objects.filter(factura__isnull=True).latest('pk')
+        vacia.items.all().delete()
+
+        informe = facturacion.facturar_ofertas(Oferta.objects.all(), self.usuario)
+        resultados = {fila['oferta'].pk: fila['resultado'] for fila in informe}
+        self.assertEqual(resultados[facturada.pk], facturacion.YA_FACTURADA)
+        self.assertEqual(resultados[vacia.pk], facturacion.SIN_ITEMS)
+        creadas = [fila for fila in informe if fila['resultado'] == facturacion.FACTURADA]
+        self.assertTrue(creadas)
+        for fila in creadas:
+            oferta = Oferta.objects.get(pk=fila['oferta'].pk)
+            factura = Factura.objects.get(pk=fila['factura'].pk)
+            self.assertEqual(oferta.factura_id, factura.pk)
+            self.assertEqual((factura.total, factura.num_items), (oferta.total, oferta.num_items))
+        self.assertFalse(documentos_con_diferencias(Factura).exists())
+        self.assertEqual(diferencias_ventas(), {})
+
+    def test_borrador_usa_el_precio_de_la_base(self):
+        borrador = borradores.guardar_datos(
+            self.usuario, AreaVenta.objects.latest('pk'), Cliente.objects.filter(activo=True).latest('pk')
+        )
+        actividad = Actividad.objects.latest('pk')
+        # La instancia recibida tiene un precio que ya cambió en la base de datos
+        Actividad.objects.filter(pk=actividad.pk).update(precio=Decimal('67.89'))
+        item = borradores.agregar_item(borrador, actividad, 2)
+        self.assertEqual(item.precio, Decimal('67.89'))
+        borrador.refresh_from_db()
+        self.assertEqual(borrador.total, Decimal('135.78'))
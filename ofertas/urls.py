@@ -10,6 +10,9 @@ urlpatterns = [
     # Lista de todas las ofertas
     path('', views.lista_ofertas, name='lista_ofertas'),
     
+    # Descargar en CSV o XLSX las ofertas filtradas
+    path('exportar/', views.exportar_ofertas, name='exportar_ofertas'),
+    
     # Crear una nueva oferta
     path('crear/', views.crear_oferta, name='crear_oferta'),
     
@@ -30,4 +33,7 @@ urlpatterns = [
     
     # Facturar una oferta específica
     path('facturar/<int:oferta_id>/', views.facturar_oferta, name='facturar_oferta'),
+    
+    # Facturar varias ofertas de una sola vez
+    path('facturar-lote/', views.facturar_ofertas_lote, name='facturar_ofertas_lote'),
 ]
\ No newline at end of file
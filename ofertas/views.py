@@ -5,27 +5,57 @@ from django.contrib import messages  # Sistema de mensajes
 from django.urls import reverse  # Para generación de URLs
 from django.http import JsonResponse, HttpResponse  # Tipos de respuesta HTTP
 from django.template.loader import get_template  # Carga de plantillas
-from django.db.models import Sum  # Agregación de base de datos
-from datetime import datetime  # Manejo de fechas
+from datetime import date, datetime  # Manejo de fechas
+from django.db.models import Exists, OuterRef  # Subconsultas
 from .models import Oferta, OfertaItem  # Modelos de ofertas
+from . import borradores, facturacion  # Borradores de oferta y conversión en facturas
+from .filtros import filtrar_ofertas, parametros_ofertas  # Filtros del listado
 from .forms import OfertaForm, OfertaItemForm  # Formularios
 from actividades.models import Actividad  # Modelo de actividades
-from facturas.models import Factura, FacturaItem, Estado  # Modelos de facturas
-from xhtml2pdf import pisa  # Generación de PDFs
+from actividades import historial  # Precio actual de las actividades
 from decimal import Decimal  # Para cálculos precisos
 from django.conf import settings  # Configuración del proyecto
+from core.paginacion import paginar  # Paginación por cursor
+from core import cache, pdf  # Caché y generación de PDFs
+from core.descargas import formato_tabla, respuesta_tabla  # Tablas CSV/XLSX en flujo
+from .exportacion import COLUMNAS_OFERTAS  # Columnas de la exportación
 import os  # Operaciones del sistema de archivos
 
 @login_required
 @permission_required('ofertas.view_oferta', raise_exception=True)
 def lista_ofertas(request):
-    """Vista para mostrar la lista de ofertas ordenada por fecha"""
-    # Obtener todas las ofertas ordenadas por fecha descendente
-    ofertas = Oferta.objects.all().order_by('-fecha_oferta')
+    """Vista para mostrar y filtrar la lista de ofertas ordenada por fecha"""
+    # Obtener parámetros de filtrado (q, fecha_inicial, fecha_final)
+    parametros = parametros_ofertas(request.GET)
+
+    # Obtener las ofertas filtradas con su cliente y área de venta en la misma consulta,
+    # indicando si ya se facturaron este mes
+    ofertas = filtrar_ofertas(request.GET, Oferta.objects.select_related('cliente', 'area_venta')).annotate(
+        facturada_mes=Exists(facturacion.facturas_del_mes(date.today()).filter(oferta=OuterRef('pk')))
+    )
+
+    # Paginar por cursor en orden descendente de (fecha_oferta, id)
+    pagina = paginar(request, ofertas, 'fecha_oferta')
+
     return render(request, 'ofertas/lista_ofertas.html', {
-        'ofertas': ofertas  # Pasar ofertas al contexto
+        'ofertas': pagina,  # Página actual de ofertas
+        'pagina': pagina,  # Cursores de navegación entre páginas
+        **parametros,  # Término de búsqueda y fechas del filtro
     })
 
+@login_required
+@permission_required('ofertas.view_oferta', raise_exception=True)
+def exportar_ofertas(request):
+    """Vista para descargar en CSV o XLSX (`formato`) las ofertas filtradas
+
+    Acepta los mismos filtros que lista_ofertas; las filas se envían a medida que se leen.
+    """
+    ofertas = filtrar_ofertas(request.GET)
+    return respuesta_tabla(
+        'ofertas', COLUMNAS_OFERTAS, ofertas, formato_tabla(request.GET),
+        orden=('fecha_oferta', 'pk'), hoja='Ofertas',
+    )
+
 @login_required
 @permission_required('ofertas.add_oferta', raise_exception=True)
 def crear_oferta(request):
@@ -38,14 +68,13 @@ def crear_oferta(request):
     if request.method == 'POST':
         form = OfertaForm(request.POST)
         if form.is_valid():
-            # Guardar datos del formulario en la sesión para el siguiente paso
-            request.session['oferta_data'] = {
-                'area_venta_id': form.cleaned_data['area_venta'].id,
-                'area_venta_nombre': form.cleaned_data['area_venta'].nombre,
-                'cliente_id': form.cleaned_data['cliente'].id,
-                'cliente_nombre': form.cleaned_data['cliente'].nombre,
-                'observaciones': form.cleaned_data.get('observaciones', ''),
-            }
+            # Guardar los datos básicos en el borrador del usuario para el siguiente paso
+            borradores.guardar_datos(
+                request.user,
+                form.cleaned_data['area_venta'],
+                form.cleaned_data['cliente'],
+                form.cleaned_data.get('observaciones', ''),
+            )
             
             # Redirigir al paso 2: agregar items
             return redirect('ofertas:agregar_items_oferta')
@@ -67,8 +96,8 @@ def editar_oferta(request, oferta_id):
     """
     # Obtener la oferta y sus items
     oferta = get_object_or_404(Oferta, id=oferta_id)
-    items = oferta.items.all()
-    total = items.aggregate(total=Sum('importe'))['total'] or Decimal('0')
+    items = oferta.items.select_related('actividad')  # Items con sus actividades
+    total = oferta.total  # Total guardado en la oferta
 
     if request.method == 'POST':
         # Procesar solicitud para agregar nuevo item
@@ -77,21 +106,25 @@ def editar_oferta(request, oferta_id):
             cantidad = request.POST.get('cantidad')
             
             try:
-                actividad = Actividad.objects.get(id=actividad_id)
+                # Precio actual de la actividad
+                actividad_id = int(actividad_id)
+                precio = historial.precio_actual(actividad_id)
+                if precio is None:
+                    raise Actividad.DoesNotExist
                 
                 # Verificar si la actividad ya existe en la oferta
-                if oferta.items.filter(actividad=actividad).exists():
+                if oferta.items.filter(actividad_id=actividad_id).exists():
                     messages.error(request, 'Esta actividad ya está incluida en la oferta.')
                 else:
                     # Crear nuevo item con la actividad y cantidad especificadas
                     OfertaItem.objects.create(
                         oferta=oferta,
-                        actividad=actividad,
+                        actividad_id=actividad_id,
                         cantidad=int(cantidad),
-                        precio=actividad.precio  # Usar precio actual de la actividad
+                        precio=precio  # Usar precio actual de la actividad
                     )
                     messages.success(request, 'Item agregado correctamente.')
-            except (ValueError, Actividad.DoesNotExist):
+            except (TypeError, ValueError, Actividad.DoesNotExist):
                 messages.error(request, 'Error al agregar el item.')
             
             return redirect('ofertas:editar_oferta', oferta_id=oferta.id)
@@ -142,7 +175,6 @@ def editar_oferta(request, oferta_id):
         'oferta': oferta,  # Oferta actual
         'items': items,  # Lista de items
         'total': total,  # Total calculado
-        'actividades': Actividad.objects.filter(activo=True)  # Solo actividades activas
     })
 
 @login_required
@@ -154,13 +186,11 @@ def ver_oferta(request, oferta_id):
     - Normal: muestra la oferta en el formato estándar
     - Impresión: usa una plantilla especial para impresión
     """
-    from core.models import Empresa  # Importar modelo de Empresa
-    
     # Obtener datos necesarios
     oferta = get_object_or_404(Oferta, id=oferta_id)  # Oferta solicitada
-    items = oferta.items.all()  # Items de la oferta
-    total = items.aggregate(total=Sum('importe'))['total'] or Decimal('0')  # Total
-    empresa = Empresa.objects.first()  # Datos de la empresa
+    items = oferta.items.select_related('actividad')  # Items de la oferta con sus actividades
+    total = oferta.total  # Total guardado en la oferta
+    empresa = cache.empresa()  # Datos de la empresa
     
     # Seleccionar plantilla según el modo (normal o impresión)
     template = 'ofertas/oferta_print.html' if request.GET.get('print') == 'true' else 'ofertas/ver_oferta.html'
@@ -182,54 +212,19 @@ def agregar_items_oferta(request):
     1. Crear oferta (datos básicos)
     2. Agregar items (esta vista)
     
-    Los datos se mantienen temporalmente en la sesión hasta que se completa el proceso.
+    Los datos se mantienen en el borrador del usuario (OfertaBorrador) hasta que se completa el proceso.
     """
-    # Verificar si hay datos de oferta en la sesión
-    oferta_data = request.session.get('oferta_data')
-    if not oferta_data:
+    # Verificar si el usuario tiene un borrador de oferta
+    borrador = borradores.borrador_de(request.user)
+    if not borrador:
         messages.error(request, 'No se encontraron datos de la oferta.')
         return redirect('ofertas:crear_oferta')
     
-    # Inicializar lista temporal de items en la sesión si no existe
-    if 'items_oferta' not in request.session:
-        request.session['items_oferta'] = []
-    
     if request.method == 'POST':
         if 'terminar' in request.POST:
             try:
-                # Generar número de oferta (año actual + 5 dígitos)
-                año_actual = datetime.now().year
-                ultimo_numero = Oferta.objects.filter(numero_oferta__startswith=str(año_actual)).order_by('-numero_oferta').first()
-                if ultimo_numero:
-                    try:
-                        num = int(ultimo_numero.numero_oferta[4:]) + 1
-                    except ValueError:
-                        num = 1
-                else:
-                    num = 1
-                nuevo_numero = f"{año_actual}{str(num).zfill(5)}"
-                
-                # Crear la oferta
-                oferta = Oferta.objects.create(
-                    numero_oferta=nuevo_numero,
-                    area_venta_id=oferta_data['area_venta_id'],
-                    cliente_id=oferta_data['cliente_id'],
-                    observaciones=oferta_data['observaciones'],
-                    created_by=request.user
-                )
-                
-                # Crear los items
-                for item_data in request.session['items_oferta']:
-                    OfertaItem.objects.create(
-                        oferta=oferta,
-                        actividad_id=item_data['actividad_id'],
-                        cantidad=item_data['cantidad'],
-                        precio=item_data['precio']
-                    )
-                
-                # Limpiar datos de la sesión
-                del request.session['oferta_data']
-                del request.session['items_oferta']
+                # Crear la oferta con sus items y eliminar el borrador
+                borradores.convertir_en_oferta(borrador, request.user)
                 
                 messages.success(request, 'Oferta creada exitosamente.')
                 return redirect('ofertas:lista_ofertas')
@@ -237,67 +232,59 @@ def agregar_items_oferta(request):
             except Exception as e:
                 messages.error(request, f'Error al crear la oferta: {str(e)}')
                 
+        elif 'eliminar' in request.POST:
+            # Quitar un item del borrador
+            try:
+                quitado = borradores.quitar_item(borrador, int(request.POST.get('item_id', 0)))
+            except ValueError:
+                quitado = False
+            if quitado:
+                messages.success(request, 'Item eliminado correctamente.')
+            else:
+                messages.error(request, 'Item no encontrado.')
+                
         elif 'actividad' in request.POST and 'cantidad' in request.POST:
             actividad_id = request.POST.get('actividad')
             cantidad = request.POST.get('cantidad')
             
             try:
                 actividad = Actividad.objects.get(id=actividad_id)
-                items_list = request.session['items_oferta']
-                
-                # Verificar si la actividad ya existe en la lista
-                actividad_existe = False
-                for item in items_list:
-                    if item['actividad_id'] == actividad.id:
-                        actividad_existe = True
-                        break
                 
-                if actividad_existe:
+                # La restricción única del borrador detecta si la actividad ya está incluida
+                if borradores.agregar_item(borrador, actividad, int(cantidad)) is None:
                     messages.error(request, 'Esta actividad ya está incluida en la oferta.')
                 else:
-                    item_data = {
-                        'actividad_id': actividad.id,
-                        'actividad_codigo': actividad.codigo,
-                        'actividad_nombre': actividad.actividad,
-                        'cantidad': int(cantidad),
-                        'precio': float(actividad.precio),
-                        'importe': float(actividad.precio) * int(cantidad)
-                    }
-                    items_list.append(item_data)
-                    request.session['items_oferta'] = items_list
                     messages.success(request, 'Item añadido correctamente.')
             except (ValueError, Actividad.DoesNotExist):
                 messages.error(request, 'Error al agregar el item. Por favor, verifique los datos.')
     
-    # Calcular total
-    total = sum(item['importe'] for item in request.session['items_oferta'])
+    # Items del borrador con sus actividades; el total se guarda en el borrador
+    borrador.refresh_from_db(fields=['total', 'num_items'])
+    items = borrador.items.select_related('actividad').order_by('id')
     
     return render(request, 'ofertas/agregar_items_oferta.html', {
-        'actividades': Actividad.objects.all(),
-        'items': request.session['items_oferta'],
-        'total': total,
-        'oferta_data': oferta_data
+        'items': items,
+        'total': borrador.total,
+        'borrador': borrador
     })
 
 @login_required
 @permission_required('ofertas.change_oferta', raise_exception=True)
 def eliminar_item_oferta(request):
-    """Vista para eliminar un item de la lista temporal de items
+    """Vista para eliminar un item del borrador de oferta
     
     Esta vista se usa durante el proceso de creación de una oferta,
     antes de que la oferta sea guardada en la base de datos.
     """
-    # Verificar si existe la lista de items en la sesión
-    if 'items_oferta' in request.session:
+    borrador = borradores.borrador_de(request.user)
+    if borrador:
         # Obtener el ID del item a eliminar
-        item_id = int(request.POST.get('item_id', 0))
-        items_list = request.session['items_oferta']
+        try:
+            item_id = int(request.POST.get('item_id', 0))
+        except ValueError:
+            item_id = 0
         
-        # Verificar que el índice sea válido
-        if 0 <= item_id < len(items_list):
-            # Eliminar el item de la lista
-            del items_list[item_id]
-            request.session['items_oferta'] = items_list
+        if borradores.quitar_item(borrador, item_id):
             messages.success(request, 'Item eliminado correctamente.')
         else:
             messages.error(request, 'Item no encontrado.')
@@ -308,16 +295,15 @@ def eliminar_item_oferta(request):
 def oferta_pdf(request, oferta_id):
     """Vista para generar un PDF de una oferta
     
-    Utiliza xhtml2pdf para convertir una plantilla HTML en un archivo PDF.
+    Utiliza xhtml2pdf (a través de core.pdf) para convertir una plantilla HTML en
+    un archivo PDF, que se guarda en caché hasta que la oferta cambie.
     El PDF incluirá todos los detalles de la oferta, items y datos de la empresa.
     """
-    from core.models import Empresa  # Importar modelo de Empresa
-    
     # Obtener datos necesarios
     oferta = get_object_or_404(Oferta, id=oferta_id)  # Oferta solicitada
-    items = oferta.items.all()  # Items de la oferta
-    total = items.aggregate(total=Sum('importe'))['total'] or Decimal('0')  # Total
-    empresa = Empresa.objects.first()  # Datos de la empresa
+    items = oferta.items.select_related('actividad')  # Items de la oferta con sus actividades
+    total = oferta.total  # Total guardado en la oferta
+    empresa = cache.empresa()  # Datos de la empresa
     
     # Cargar y renderizar la plantilla HTML
     template = get_template('ofertas/oferta_pdf.html')
@@ -330,18 +316,8 @@ def oferta_pdf(request, oferta_id):
     }
     html = template.render(context)
     
-    # Configurar la respuesta HTTP para PDF
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'filename=oferta_{oferta.numero_oferta}.pdf'
-    
-    # Convertir HTML a PDF
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    
-    # Manejar errores de generación de PDF
-    if pisa_status.err:
-        return HttpResponse('Hubo un error al generar el PDF <pre>' + html + '</pre>')
-    
-    return response
+    # Servir el PDF desde la caché o generarlo en segundo plano
+    return pdf.respuesta_pdf(request, 'oferta', oferta.id, html, f'oferta_{oferta.numero_oferta}.pdf')
 
 @login_required
 @permission_required('facturas.add_factura', raise_exception=True)
@@ -351,38 +327,47 @@ def facturar_oferta(request, oferta_id):
     # Obtener la oferta
     oferta = get_object_or_404(Oferta, id=oferta_id)
     
-    # Generar número único de factura (formato: AAAA-NNNN)
-    year = datetime.now().year
-    # Buscar última factura del año para continuar la numeración
-    last_factura = Factura.objects.filter(fecha_factura__year=year).order_by('-numero_factura').first()
-    if last_factura:
-        numero = int(last_factura.numero_factura.split('-')[1]) + 1  # Incrementar último número
-    else:
-        numero = 1  # Primera factura del año
-        
-    # Asignar número de factura con formato año-número
-    numero_factura = f"{year}-{numero:04d}"
-    
-    # Crear la factura
-    factura = Factura.objects.create(
-        numero_factura=numero_factura,
-        fecha_factura=datetime.now().date(),
-        area_venta=oferta.area_venta,
-        cliente=oferta.cliente,
-        observaciones=oferta.observaciones,
-        estado=Estado.objects.get(id=1),  # Estado por defecto "NO FIRMADA"
-        created_by=request.user
-    )
-    
-    # Copiar los items de la oferta a la factura
-    for item in oferta.items.all():
-        FacturaItem.objects.create(
-            factura=factura,
-            actividad=item.actividad,
-            cantidad=item.cantidad,
-            precio=item.precio,
-            importe=item.importe
-        )
+    # Crear la factura con todos los items de la oferta en una sola transacción
+    try:
+        factura = facturacion.facturar_oferta(oferta, request.user)
+    except facturacion.OfertaYaFacturada as e:
+        # Enlace repetido o doble clic: mostrar la factura que ya existe
+        messages.warning(request, 'La oferta ya estaba facturada este mes.')
+        return redirect('facturas:ver_factura', factura_id=e.factura_id)
     
     messages.success(request, f'Factura {factura.numero_factura} creada exitosamente desde la oferta.')
     return redirect('facturas:ver_factura', factura_id=factura.id)
+
+@login_required
+@permission_required('facturas.add_factura', raise_exception=True)
+def facturar_ofertas_lote(request):
+    """Vista para convertir varias ofertas en facturas de una sola vez
+
+    Recibe por POST los IDs seleccionados (`ofertas`) o, con `todas`, los filtros
+    del listado. Muestra un informe con el resultado de cada oferta.
+    """
+    if request.method != 'POST':
+        return redirect('ofertas:lista_ofertas')
+
+    # Ofertas seleccionadas o todas las que cumplen los filtros del listado
+    ids = [valor for valor in request.POST.getlist('ofertas') if valor.isdigit()]
+    if ids:
+        ofertas = Oferta.objects.filter(pk__in=ids)
+    elif request.POST.get('todas'):
+        ofertas = filtrar_ofertas(request.POST)
+    else:
+        messages.error(request, 'No se seleccionó ninguna oferta.')
+        return redirect('ofertas:lista_ofertas')
+
+    try:
+        informe = facturacion.facturar_ofertas(ofertas.select_related('cliente'), request.user)
+    except Exception as e:
+        messages.error(request, f'Error al facturar las ofertas: {str(e)}')
+        return redirect('ofertas:lista_ofertas')
+
+    facturadas = sum(1 for fila in informe if fila['factura'])
+    messages.success(request, f'{facturadas} de {len(informe)} ofertas facturadas.')
+    return render(request, 'ofertas/facturar_lote.html', {
+        'informe': informe,  # Resultado de cada oferta
+        'facturadas': facturadas,  # Cantidad de facturas creadas
+    })
@@ -0,0 +1,43 @@
+# Plan anual en cuadrícula (áreas × meses)
+#
+# El plan de un año se lee con una sola consulta y se guarda con un solo
+# bulk_create(update_conflicts=True) sobre la clave única (área, año, mes): crea los
+# meses nuevos y actualiza los existentes sin consultar antes cuáles hay. También
+# se puede partir del plan de otro año con un ajuste en porcentaje.
+from decimal import Decimal  # Importes exactos
+
+from django.db import transaction  # Transacción del guardado
+
+from core import cache  # Caché del dashboard
+from .models import Plan  # Modelo de planes
+
+# Meses del año: (número, nombre)
+MESES = Plan._meta.get_field('mes').choices
+# Redondeo de los importes copiados
+CENTAVO = Decimal('0.01')
+
+
+def valores(anno):
+    """Planes del año: {(área, mes): importe}"""
+    return {
+        (area_id, mes): plan
+        for area_id, mes, plan in Plan.objects.filter(anno=anno).order_by().values_list('area_venta_id', 'mes', 'plan')
+    }
+
+
+def copiar(anno, porcentaje=0):
+    """Planes del año ajustados en `porcentaje` (negativo para bajarlos), sin guardar"""
+    factor = 1 + Decimal(porcentaje) / 100
+    return {clave: (plan * factor).quantize(CENTAVO) for clave, plan in valores(anno).items()}
+
+
+def guardar(anno, planes):
+    """Crea o actualiza los planes del año ({(área, mes): importe}) y devuelve cuántos son"""
+    objetos = [Plan(area_venta_id=area_id, anno=anno, mes=mes, plan=plan) for (area_id, mes), plan in planes.items()]
+    with transaction.atomic():
+        Plan.objects.bulk_create(
+            objetos, update_conflicts=True, unique_fields=['area_venta', 'anno', 'mes'], update_fields=['plan'],
+        )
+        # bulk_create no envía señales: descartar el dashboard en caché
+        cache.invalidar_al_confirmar(cache.DASHBOARD)
+    return len(objetos)
@@ -1,5 +1,6 @@
 from django import forms
 from datetime import datetime
+from .cuadricula import MESES
 from .models import Plan
 
 class PlanForm(forms.ModelForm):
@@ -31,4 +32,58 @@ class PlanEditForm(forms.ModelForm):
         self.fields['plan'].widget.attrs.update({
             'class': 'form-control',
             'step': '0.01'
-        })
\ No newline at end of file
+        })
+
+class PlanAnualSeleccionForm(forms.Form):
+    anno = forms.IntegerField(
+        label='Año', min_value=1900, max_value=9999,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    porcentaje = forms.DecimalField(
+        label='Ajuste (%)', required=False, max_digits=6, decimal_places=2,
+        help_text='Negativo para bajar el plan',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+    )
+
+    def clean_porcentaje(self):
+        porcentaje = self.cleaned_data['porcentaje'] or 0
+        if porcentaje <= -100:
+            raise forms.ValidationError('Un porcentaje de -100 o menos dejaría el plan en cero.')
+        return porcentaje
+
+class PlanAnualForm(forms.Form):
+    """Plan de un año en cuadrícula: una fila por área y una columna por mes
+
+    `valores` son los importes iniciales de las celdas: {(área, mes): importe}.
+    """
+    anno = forms.IntegerField(min_value=1900, max_value=9999, widget=forms.HiddenInput)
+
+    def __init__(self, areas, *args, valores=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.areas = areas
+        campo = Plan._meta.get_field('plan')
+        for area in areas:
+            for mes, nombre in MESES:
+                # Los campos del modelo validan dígitos y decimales sin consultar
+                self.fields[self.nombre(area.pk, mes)] = campo.formfield(
+                    label=f'{area} - {nombre}', required=False, min_value=0,
+                    widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm text-end', 'step': '0.01'}),
+                )
+        for (area_id, mes), plan in (valores or {}).items():
+            self.initial[self.nombre(area_id, mes)] = plan
+
+    @staticmethod
+    def nombre(area_id, mes):
+        return f'plan_{area_id}_{mes}'
+
+    def filas(self):
+        """Área y campos de sus doce meses, para la plantilla"""
+        return [(area, [self[self.nombre(area.pk, mes)] for mes, _ in MESES]) for area in self.areas]
+
+    def planes(self):
+        """Celdas con importe del formulario ya validado: {(área, mes): importe}"""
+        return {
+            (area.pk, mes): self.cleaned_data[self.nombre(area.pk, mes)]
+            for area in self.areas for mes, _ in MESES
+            if self.cleaned_data[self.nombre(area.pk, mes)] is not None
+        }
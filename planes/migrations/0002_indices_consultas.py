@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['anno', 'mes'], name='planes_plan_anno_242292_idx'),
+        ),
+    ]
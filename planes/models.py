@@ -46,6 +46,8 @@ class Plan(models.Model):
     class Meta:
         # Asegurar que no haya duplicados de área-año-mes
         unique_together = ['area_venta', 'anno', 'mes']
+        # Planes de un año (matriz plan vs. real); por área ya usa el índice único
+        indexes = [models.Index(fields=['anno', 'mes'])]
         # Ordenar por año, mes y área
         ordering = ['-anno', '-mes', 'area_venta']
         verbose_name = "Plan"
@@ -0,0 +1,13 @@
+# Señales de la aplicación de planes
+from django.db.models.signals import post_delete, post_save  # Señales de modelos
+from django.dispatch import receiver  # Decorador para conectar señales
+
+from core import cache  # Caché de datos de referencia y agregados
+from .models import Plan  # Modelo de planes
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def invalidar_dashboard(sender, **kwargs):
+    """Los planes forman parte de la tabla plan vs. real del dashboard"""
+    cache.invalidar_al_confirmar(cache.DASHBOARD)
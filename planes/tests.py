@@ -1,3 +1,80 @@
-from django.test import TestCase
+from datetime import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.urls import reverse
+
+from core.models import AreaVenta
+from core.pruebas import ConsultasTestCase
+from .models import Plan
+
+
+def ultimo_plan():
+    return [Plan.objects.latest('pk').pk]
+
+
+def plan_anual_completo():
+    # Todas las áreas y meses del año siguiente (nuevos) y uno del actual (existente)
+    anno = datetime.now().year
+    datos = {'anno': anno + 1}
+    for area_id in AreaVenta.objects.values_list('pk', flat=True):
+        for mes in range(1, 13):
+            datos[f'plan_{area_id}_{mes}'] = '1000.00'
+    return datos
+
+
+class ConsultasPlanesTests(ConsultasTestCase):
+    vistas = (
+        'lista_planes',
+        'crear_plan',
+        'editar_plan',
+        'plan_anual',
+    )
+
+    def test_lista_planes(self):
+        self.assertConsultas(5, 'lista_planes')
+
+    def test_lista_planes_filtrada(self):
+        self.assertConsultas(5, 'lista_planes', datos=lambda: {'area': Plan.objects.latest('pk').area_venta_id})
+
+    def test_crear_plan(self):
+        self.assertConsultas(3, 'crear_plan')
+
+    def test_editar_plan(self):
+        self.assertConsultas(4, 'editar_plan', args=ultimo_plan)
+
+    def test_editar_plan_post(self):
+        self.assertConsultas(6, 'editar_plan', args=ultimo_plan, datos={'plan': '1000.00'}, metodo='post', estado=302)
+
+    def test_plan_anual(self):
+        self.assertConsultas(4, 'plan_anual')
+
+    def test_plan_anual_copiar(self):
+        self.assertConsultas(
+            4, 'plan_anual', datos=lambda: {'anno': datetime.now().year + 1, 'copiar': '1', 'porcentaje': '10'},
+        )
+
+    def test_plan_anual_post(self):
+        self.assertConsultas(6, 'plan_anual', datos=plan_anual_completo, metodo='post', estado=302)
+
+    def test_plan_anual_guarda_y_copia(self):
+        anno = datetime.now().year
+        plan = Plan.objects.filter(anno=anno).earliest('pk')
+        celda = f'plan_{plan.area_venta_id}_{plan.mes}'
+
+        # Una celda inválida: no se guarda nada
+        datos = {'anno': anno + 1, celda: '500.00', f'plan_{plan.area_venta_id}_{plan.mes % 12 + 1}': '-1'}
+        respuesta = self.client.post(reverse('plan_anual'), datos)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(Plan.objects.filter(anno=anno + 1).exists())
+
+        # Crea el mes del año siguiente y actualiza el del año actual
+        self.client.post(reverse('plan_anual'), {'anno': anno + 1, celda: '500.00'})
+        self.client.post(reverse('plan_anual'), {'anno': anno, celda: '750.50'})
+        self.assertEqual(Plan.objects.get(anno=anno + 1, area_venta=plan.area_venta, mes=plan.mes).plan, Decimal('500.00'))
+        plan.refresh_from_db()
+        self.assertEqual(plan.plan, Decimal('750.50'))
+
+        # La copia llena la cuadrícula con el año anterior ajustado, sin guardar
+        respuesta = self.client.get(reverse('plan_anual'), {'anno': anno + 2, 'copiar': '1', 'porcentaje': '-10'})
+        self.assertEqual(respuesta.context['form'][celda].value(), Decimal('450.00'))
+        self.assertFalse(Plan.objects.filter(anno=anno + 2).exists())
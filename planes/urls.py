@@ -5,4 +5,5 @@ urlpatterns = [
     path('', views.lista_planes, name='lista_planes'),
     path('crear/', views.crear_plan, name='crear_plan'),
     path('editar/<int:pk>/', views.editar_plan, name='editar_plan'),
+    path('anual/', views.plan_anual, name='plan_anual'),
 ]
\ No newline at end of file
@@ -2,8 +2,11 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.db import IntegrityError
 from django.contrib.auth.decorators import permission_required
+from django.urls import reverse
+from datetime import datetime
+from . import cuadricula
 from .models import Plan
-from .forms import PlanForm, PlanEditForm
+from .forms import PlanForm, PlanEditForm, PlanAnualForm, PlanAnualSeleccionForm
 from core.models import AreaVenta
 
 @permission_required('planes.view_plan', raise_exception=True)
@@ -13,8 +16,8 @@ def lista_planes(request):
     anno = request.GET.get('anno')
     mes = request.GET.get('mes')
     
-    # Iniciar con todos los planes
-    planes = Plan.objects.all()
+    # Iniciar con todos los planes y su área de venta
+    planes = Plan.objects.select_related('area_venta')
     
     # Aplicar filtros si se proporcionan
     if area:
@@ -88,3 +91,36 @@ def editar_plan(request, pk):
         'form': form,
         'plan': plan
     })
+
+@permission_required(['planes.add_plan', 'planes.change_plan'], raise_exception=True)
+def plan_anual(request):
+    """Vista para cargar el plan de todas las áreas en un año, mes a mes
+
+    Todas las celdas se validan juntas y se guardan con una sola sentencia (ver
+    planes.cuadricula); las vacías no cambian. Con `copiar` la cuadrícula se llena
+    con el plan del año anterior ajustado en el porcentaje indicado, sin guardar.
+    """
+    seleccion = PlanAnualSeleccionForm(request.GET or None, initial={'anno': datetime.now().year})
+    anno = seleccion.cleaned_data['anno'] if seleccion.is_valid() else datetime.now().year
+    areas = list(AreaVenta.objects.order_by('nombre', 'pk'))
+
+    if request.method == 'POST':
+        form = PlanAnualForm(areas, request.POST)
+        if form.is_valid():
+            anno = form.cleaned_data['anno']
+            guardados = cuadricula.guardar(anno, form.planes())
+            messages.success(request, f'Plan {anno} guardado: {guardados} meses.')
+            return redirect(f"{reverse('plan_anual')}?anno={anno}")
+    elif 'copiar' in request.GET and seleccion.is_valid():
+        valores = cuadricula.copiar(anno - 1, seleccion.cleaned_data['porcentaje'])
+        form = PlanAnualForm(areas, initial={'anno': anno}, valores=valores)
+        messages.info(request, f'Plan de {anno - 1} copiado: revise los importes y guarde.')
+    else:
+        form = PlanAnualForm(areas, initial={'anno': anno}, valores=cuadricula.valores(anno))
+
+    return render(request, 'planes/plan_anual.html', {
+        'form': form,  # Cuadrícula de áreas y meses
+        'seleccion': seleccion,  # Año y ajuste de la copia
+        'anno': anno,  # Año que se edita
+        'meses': cuadricula.MESES,  # Encabezados de las columnas
+    })